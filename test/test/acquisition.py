@@ -0,0 +1,502 @@
+"""
+采集核心：串口行读取、校验、解析、减半回发、报警与上传
+不依赖任何GUI，上位机界面和无界面采集程序都只是它的订阅者
+"""
+import logging
+import time
+from dataclasses import dataclass
+
+from frame_decoder import (
+    CHANNEL_TEMP_HUMI, CHANNEL_FREQ, CHANNEL_DUAL, calculate_checksum, crc16, decode_frame, decode_binary_frame,
+    FRAME_SYNC, BINARY_FRAME_LEN, BINARY_BAUD_CODES, FORMAT_ACK_PREFIX, STATUS_LINE_PREFIXES,
+)
+from alarms import AlarmEngine, DEFAULT_THRESHOLDS
+from link_stats import LinkStats, OVERFLOW_THRESHOLD
+from serial_writer import PRIORITY_ALARM, PRIORITY_COMMAND
+
+
+@dataclass
+class Sample:
+    """一次有效采样"""
+    channel: int
+    values: tuple       # 温湿度通道为 (t, h)，频率通道为 (f,)
+    timestamp: int      # 毫秒时间戳（串口收到该帧的时刻）
+    source: str = ""    # 数据来源（多串口采集时为串口名）
+    received: float = 0.0  # 收到该帧时 time.monotonic() 的读数，用于时延统计
+
+    @property
+    def halves(self):
+        return tuple(v // 2 for v in self.values)
+
+    def to_server_data(self):
+        """转换为上传服务器的数据格式"""
+        if self.channel == CHANNEL_TEMP_HUMI:
+            t, h = self.values
+            half_t, half_h = self.halves
+            data = {
+                "type": "temperature_humidity",
+                "temperature": t,
+                "humidity": h,
+                "half_temperature": half_t,
+                "half_humidity": half_h,
+                "timestamp": self.timestamp
+            }
+        else:
+            f, = self.values
+            half_f, = self.halves
+            data = {
+                "type": "frequency",
+                "frequency": f,
+                "half_frequency": half_f,
+                "timestamp": self.timestamp
+            }
+        if self.source:
+            data["source"] = self.source
+        return data
+
+
+class LineReader:
+    """
+    串口行读取循环（阻塞在 readline），供 SerialThread 使用
+    on_line(line, received)，received 为读到该行时 time.monotonic() 的读数
+    只支持文本帧，协商二进制帧时请使用 ChunkReader
+    """
+    def __init__(self, ser, on_line):
+        self.ser = ser
+        self.on_line = on_line
+        self.running = True
+
+    def run(self):
+        while self.running:
+            if self.ser.is_open:
+                try:
+                    line = self.ser.readline().decode(errors='ignore').strip()
+                    if line:
+                        self.on_line(line, time.monotonic())
+                except Exception:
+                    pass
+
+    def stop(self):
+        self.running = False
+
+
+class FrameSplitter:
+    """
+    把串口字节流按行切分，缓冲区复用，残缺的行留到下次拼接
+
+    文本行中不会出现同步字节 0xA5，遇到它时按二进制帧截取固定长度，
+    所以协商前后、以及二进制帧和调试信息混在一起时都能正确切分
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """
+        追加新数据，返回已完整的行（已去掉首尾空白，跳过空行）
+        二进制帧以 bytes 原样返回，由 decode_binary_frame 校验
+        """
+        self.buffer += data
+        if FRAME_SYNC in self.buffer:
+            return self._feed_mixed()
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
+            return []
+        chunk = self.buffer[:end]
+        del self.buffer[:end + 1]
+        lines = []
+        for raw in chunk.split(b'\n'):
+            line = raw.decode(errors='ignore').strip()
+            if line:
+                lines.append(line)
+        return lines
+
+    def _feed_mixed(self):
+        buffer = self.buffer
+        items = []
+        pos = 0
+        size = len(buffer)
+        while pos < size:
+            sync = buffer.find(FRAME_SYNC, pos)
+            end = buffer.find(b'\n', pos, sync if sync >= 0 else size)
+            if end >= 0:
+                line = buffer[pos:end].decode(errors='ignore').strip()
+                if line:
+                    items.append(line)
+                pos = end + 1
+                continue
+            if sync < 0:
+                break  # 残缺的行
+            # 同步字节前没有行尾的文本（行被打断），单独作为一行
+            line = buffer[pos:sync].decode(errors='ignore').strip()
+            if line:
+                items.append(line)
+            if size - sync < BINARY_FRAME_LEN:
+                pos = sync
+                break  # 残缺的帧
+            frame = bytes(buffer[sync:sync + BINARY_FRAME_LEN])
+            resync = frame.find(FRAME_SYNC, 1)
+            if resync > 0 and crc16(frame[1:7]) != (frame[7] << 8 | frame[8]):
+                # 帧被截断，后面紧跟着下一帧：残片单独交给解码器计为错误帧，从下一个同步字节继续
+                frame = frame[:resync]
+            items.append(frame)
+            pos = sync + len(frame)
+        del buffer[:pos]
+        return items
+
+
+class ChunkReader:
+    """
+    批量读取模式：一次读完 in_waiting 中的全部字节，切分成行后成批回调
+
+    on_batch(lines, stamps)，stamps[i] 为读到 lines[i] 时 time.monotonic() 的读数
+    触发条件（满足其一）：
+        - 攒够 max_batch 行
+        - 第一行到达后超过 max_latency 秒
+        - 串口暂时没有更多数据
+    link 为 link_stats.LinkStats 时记录输入缓冲接近满（可能溢出）的次数
+    """
+    def __init__(self, ser, on_batch, max_batch=64, max_latency=0.05, link=None):
+        self.ser = ser
+        self.on_batch = on_batch
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.link = link
+        self.splitter = FrameSplitter()
+        self.running = True
+
+    def _flush(self, batch, stamps):
+        for i in range(0, len(batch), self.max_batch):
+            self.on_batch(batch[i:i + self.max_batch], stamps[i:i + self.max_batch])
+
+    def run(self):
+        batch = []
+        stamps = []
+        deadline = 0.0
+        while self.running:
+            if not self.ser.is_open:
+                time.sleep(0.01)
+                continue
+            try:
+                waiting = self.ser.in_waiting
+                if not waiting and batch:
+                    # 暂无后续数据，不再等待，立即发出已攒的行
+                    self._flush(batch, stamps)
+                    batch = []
+                    stamps = []
+                    continue
+                if waiting >= OVERFLOW_THRESHOLD and self.link is not None:
+                    self.link.record_overflow()
+                data = self.ser.read(waiting or 1)
+            except Exception:
+                continue
+            if data:
+                received = time.monotonic()
+                lines = self.splitter.feed(data)
+                if lines:
+                    if not batch:
+                        deadline = received + self.max_latency
+                    batch.extend(lines)
+                    stamps.extend([received] * len(lines))
+            if batch and (len(batch) >= self.max_batch or time.monotonic() >= deadline):
+                self._flush(batch, stamps)
+                batch = []
+                stamps = []
+        if batch:
+            self._flush(batch, stamps)
+
+    def stop(self):
+        self.running = False
+
+
+class AcquisitionEngine:
+    """
+    采集引擎：处理下位机发来的每一行数据
+
+    订阅者通过 subscribe(callback) 注册，回调形式为 callback(event, payload)：
+        "line"   - 原始行文本
+        "log"    - (级别, 日志文本)，级别沿用 logging 模块，逐采样的明细为 DEBUG
+        "sample" - Sample 对象
+        "upload" - 待上传的 Sample 对象（to_server_data() 为上传格式）
+
+    latency 为 latency.LatencyTracker 时记录每帧的校验、回发时延
+    alarms 为 alarms.AlarmEngine，多个串口可共用一个以便一次判断所有板子
+    writer 为 serial_writer.SerialWriter 时所有写串口的操作都放入其队列，由发送线程写出，
+    下位机的回发确认也交给它匹配；为 None 时在调用线程中直接写串口
+
+    帧格式：默认文本帧，request_binary() 协商二进制帧（可同时提高波特率），
+    下位机确认后才切换；旧固件不认识该命令时不回复，超时后继续使用文本帧
+
+    link 为 link_stats.LinkStats，按帧序号统计丢帧和各类坏帧
+
+    channel 为 CHANNEL_DUAL 时下位机交替测量温湿度和频率，两种帧都接受，
+    报警、回发、记录和上传都按每个采样自己的通道处理
+    """
+    def __init__(self, ser=None, channel=CHANNEL_TEMP_HUMI, name="", alarms=None):
+        self.ser = ser
+        self.channel = channel
+        self.name = name  # 多串口采集时用于区分数据来源，也是报警状态的板子名
+        self.upload_enabled = False
+        self.alarms = alarms if alarms is not None else AlarmEngine()
+        self.latency = None
+        self.writer = None
+        self.binary = False        # 下位机已切换到二进制帧
+        self.negotiation = None    # 正在等待确认的协商：(命令, 超时时刻)
+        self.negotiation_timeout = 2.0
+        self.link = LinkStats()
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _publish(self, event, payload):
+        for callback in list(self._subscribers):
+            callback(event, payload)
+
+    def log(self, message, level=logging.INFO):
+        self._publish("log", (level, message))
+
+    @property
+    def port_open(self):
+        return bool(self.ser and self.ser.is_open)
+
+    @property
+    def thresholds(self):
+        return self.alarms.thresholds(self.name)
+
+    def set_thresholds(self, name, low, high):
+        """设置本串口的阈值，无法解析时退回默认范围"""
+        self.alarms.set_thresholds(name, low, high, board=self.name)
+
+    # 报警状态标志
+    @property
+    def temp_alarm_on(self):
+        return self.alarms.is_active("temp", self.name)
+
+    @property
+    def humi_alarm_on(self):
+        return self.alarms.is_active("humi", self.name)
+
+    @property
+    def freq_alarm_on(self):
+        return self.alarms.is_active("freq", self.name)
+
+    # ---------- 下位机命令 ----------
+    def write(self, data, priority=PRIORITY_COMMAND):
+        if self.port_open:
+            if self.writer is not None:
+                self.writer.send(data, priority)
+            else:
+                self.ser.write(data)
+            return True
+        return False
+
+    def send_command(self, sig, priority=PRIORITY_COMMAND):
+        """统一发送带 CMD: 前缀的命令"""
+        if isinstance(sig, bytes):
+            sig_str = sig.decode(errors='ignore').strip()
+        else:
+            sig_str = str(sig).strip()
+        if self.write(f"CMD:{sig_str}\r\n".encode(), priority):
+            self.log(f"已发送调试信号: CMD:{sig_str}")
+            return True
+        return False
+
+    def link_stats(self):
+        """链路质量统计的快照（dict），可在任意线程调用"""
+        return self.link.snapshot()
+
+    def start_collect(self):
+        if self.write(b'CMD:S\r\n'):
+            self.link.expect_restart()
+            self.log("已发送启动命令")
+            return True
+        return False
+
+    def stop_collect(self):
+        if self.write(b'CMD:E\r\n'):
+            self.log("已发送停止命令")
+            return True
+        return False
+
+    def set_channel(self, channel):
+        self.channel = channel
+        self.send_channel_cmd()
+
+    def send_channel_cmd(self):
+        if self.channel == CHANNEL_TEMP_HUMI:
+            if self.write(b'CMD:A\r\n'):  # 温湿度
+                self.log("切换到温湿度通道")
+        elif self.channel == CHANNEL_DUAL:
+            if self.write(b'CMD:D\r\n'):  # 温湿度和频率交替
+                self.log("切换到双通道交替采集")
+        else:
+            if self.write(b'CMD:B\r\n'):  # 频率
+                self.log("切换到频率通道")
+
+    def request_binary(self, baud=None):
+        """请求下位机改用二进制帧，baud 为协商后的波特率（None 保持当前波特率）"""
+        if baud is None:
+            baud = self.ser.baudrate if self.ser else 9600
+        if baud not in BINARY_BAUD_CODES:
+            raise ValueError(f"不支持的波特率: {baud}，可选 {sorted(BINARY_BAUD_CODES)}")
+        if self.write(f"CMD:F{BINARY_BAUD_CODES[baud]}\r\n".encode()):
+            self.negotiation = ("BIN", time.monotonic() + self.negotiation_timeout)
+            self.log(f"请求二进制帧，波特率 {baud}")
+            return True
+        return False
+
+    def request_text(self):
+        """请求下位机恢复文本帧和 9600 波特率"""
+        if self.write(b'CMD:T\r\n'):
+            self.negotiation = ("TEXT", time.monotonic() + self.negotiation_timeout)
+            self.log("请求文本帧")
+            return True
+        return False
+
+    def _on_format_ack(self, line):
+        """处理下位机的 "[DEBUG] FORMAT BIN/TEXT <波特率>"，确认后主机端跟随切换波特率"""
+        parts = line[len(FORMAT_ACK_PREFIX):].split()
+        try:
+            mode, baud = parts[0], int(parts[1])
+        except (IndexError, ValueError):
+            self.log(f"⚠️ 无法解析帧格式确认: {line}", logging.WARNING)
+            return
+        self.negotiation = None
+        self.binary = mode == "BIN"
+        self.link.expect_restart()
+        if self.port_open and self.ser.baudrate != baud:
+            self.ser.baudrate = baud
+        self.log(f"下位机已切换到{'二进制' if self.binary else '文本'}帧，波特率 {baud}")
+
+    # ---------- 校验 ----------
+    @property
+    def expect(self):
+        """解码时期望的帧类型，双通道时两种都接受"""
+        return None if self.channel == CHANNEL_DUAL else self.channel
+
+    def decode(self, line):
+        """按当前通道解码一帧，返回 frame_decoder.Frame"""
+        return decode_frame(line, expect=self.expect)
+
+    def validate_data_with_checksum(self, line):
+        """带校验和的完整数据校验"""
+        frame = self.decode(line)
+        if not frame.ok:
+            return False, frame.error
+        return True, frame.describe()
+
+    # ---------- 数据处理 ----------
+    def process_lines(self, lines, stamps=None):
+        """批量处理多行数据，stamps 为各行的接收时刻（time.monotonic()），报警按批一次判断"""
+        samples = self.ingest(lines, stamps)
+        if samples and self.port_open:
+            self.respond(samples, self.alarms.evaluate(samples))
+        return samples
+
+    def process_line(self, line, received=None):
+        """处理一行数据，返回有效的 Sample 或 None；received 为接收时刻，缺省为现在"""
+        sample = self.ingest_line(line, received)
+        if sample is not None and self.port_open:
+            self.respond([sample], [self.alarms.evaluate_one(sample)])
+        return sample
+
+    def ingest(self, lines, stamps=None):
+        """校验解析多行数据并发布事件，返回有效的采样（尚未判断报警和回发）"""
+        samples = []
+        if stamps is None:
+            stamps = [time.monotonic()] * len(lines)
+        for line, received in zip(lines, stamps):
+            sample = self.ingest_line(line, received)
+            if sample is not None:
+                samples.append(sample)
+        return samples
+
+    def ingest_line(self, line, received=None):
+        """处理一行文本或一个二进制帧（bytes）"""
+        if received is None:
+            received = time.monotonic()
+        if isinstance(line, str):
+            self._publish("line", line)
+            if self.writer is not None and self.writer.on_line(line):
+                return None
+            if self.negotiation is not None:
+                if line.startswith(FORMAT_ACK_PREFIX):
+                    self._on_format_ack(line)
+                    return None
+                if received > self.negotiation[1]:
+                    self.log("⚠️ 下位机未确认帧格式切换（旧固件？），继续使用文本帧", logging.WARNING)
+                    self.negotiation = None
+
+            # 只处理包含校验和的数据，忽略调试信息
+            if "CHECKSUM:" not in line:
+                if line and not line.startswith(STATUS_LINE_PREFIXES):
+                    # 数据帧被截断或连同校验和一起损坏（如串口缓冲溢出、干扰），帧头不一定还在
+                    self.link.record_truncated()
+                    self.log(f"❌ 数据校验失败: 缺少校验和: {line}", logging.WARNING)
+                return None
+
+            # 数据校验（包含校验和），一次解码得到数值
+            frame = self.decode(line)
+        else:
+            self._publish("line", "BIN " + line.hex(" "))
+            frame = decode_binary_frame(line, expect=self.expect)
+        self.link.record_frame(frame)
+        latency = self.latency
+        if latency:
+            latency.record("validate", received)
+            latency.count("frames_ok" if frame.ok else "frames_bad")
+        if not frame.ok:
+            self.log(f"❌ 数据校验失败: {frame.error}", logging.WARNING)
+            return None
+        self.log(f"✅ {frame.describe()}", logging.DEBUG)
+
+        # 时间戳取串口收到该帧的时刻，而不是处理到这一行的时刻
+        timestamp = int((time.time() - (time.monotonic() - received)) * 1000)
+        sample = Sample(frame.kind, frame.values, timestamp, self.name, received)
+        self._publish("sample", sample)
+
+        # 向服务器发送数据
+        if self.upload_enabled:
+            self._publish("upload", sample)
+        return sample
+
+    def respond(self, samples, edges):
+        """
+        按报警判断结果回应下位机：有报警状态变化的采样发送报警命令，
+        其余采样回发减半数据
+        """
+        latency = self.latency
+        for sample, sample_edges in zip(samples, edges):
+            # 如果需要发送报警信号，则不回发减半数据
+            if sample_edges:
+                self.send_alarms(sample_edges)
+            else:
+                self.echo_half(sample)
+                if latency and self.writer is None:
+                    # 使用发送线程时由它在真正写出后记录
+                    latency.record("echo", sample.received)
+
+    def send_alarms(self, edges):
+        for rule, active in edges:
+            if active:
+                self.send_command(rule.raise_cmd, PRIORITY_ALARM)
+                self.log(f"{rule.title}超出阈值，已发送'{rule.raise_cmd.decode()}'")
+            else:
+                self.send_command(rule.clear_cmd, PRIORITY_ALARM)
+                self.log(f"{rule.title}恢复正常，已发送'{rule.clear_cmd.decode()}'")
+
+    def echo_half(self, sample):
+        """回发减半数据（带校验和）"""
+        half_data = " ".join(str(v) for v in sample.halves)
+        checksum = calculate_checksum(half_data)
+        data = f"{half_data} CHECKSUM:{checksum}\r\n".encode()
+        if self.writer is not None:
+            # 尚未写出的旧回发会被这一条替换
+            if self.port_open:
+                self.writer.send_echo(data, sample.received)
+        else:
+            self.write(data)
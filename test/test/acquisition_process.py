@@ -0,0 +1,425 @@
+"""
+进程隔离的采集：串口读取、校验解码、报警和回发在单独的采集进程中运行，
+有效采样写入 multiprocessing.shared_memory 环形缓冲区，界面进程按自己的节奏轮询
+
+界面卡顿（背景缩放、日志重排、折线图重绘）只会推迟显示，采集进程不受 GIL 和界面事件循环影响，
+串口输入缓冲不会因此溢出，报警和减半值回发也照常进行。
+
+进程间通信:
+    采样    - SampleRing（共享内存，单写多读，写满后覆盖最早的记录）
+    命令    - 控制队列：界面 -> 采集进程，("call", 方法名, 参数) / ("log_level", 级别) / None 表示退出
+    日志    - 事件队列：采集进程 -> 界面，队列满时丢弃，不阻塞采集
+    链路    - 采集进程每 LINK_INTERVAL 秒经事件队列发回链路质量快照（link_stats）
+    时延    - 界面设置了 latency 时，采集进程记录校验、回发时延，每 LINK_INTERVAL 秒发回增量并入界面的统计
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from acquisition import Sample, CHANNEL_TEMP_HUMI
+
+# 共享内存布局：64 字节头部（写入总数 u64），之后为定长记录
+HEADER_SIZE = 64
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<i8"),   # 毫秒时间戳
+    ("received", "<f8"),    # 收到该帧时 time.monotonic() 的读数（系统范围的单调时钟，跨进程可比）
+    ("channel", "u1"),
+    ("values", "<u2", (2,)),
+])
+DEFAULT_CAPACITY = 65536
+LINK_INTERVAL = 1.0  # 采集进程发回链路质量快照的间隔（秒）
+
+# 界面可以通过控制队列调用的采集引擎方法
+REMOTE_METHODS = (
+    "start_collect", "stop_collect", "set_channel", "send_channel_cmd", "set_thresholds",
+    "send_command", "request_binary", "request_text",
+)
+
+
+class SampleRing:
+    """
+    共享内存中的采样环形缓冲区，一个写入方（采集进程），读取方各自保存读到的位置
+
+    写入方先写记录再增加写入总数；读取方复制完记录后重新读取写入总数，
+    复制期间已被覆盖或正在被覆盖的记录计为丢失，不会读到写了一半的数据
+    """
+    def __init__(self, shm, capacity, owner):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self.head = np.ndarray((1,), dtype="<u8", buffer=shm.buf, offset=0)
+        self.records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+
+    @classmethod
+    def create(cls, capacity=DEFAULT_CAPACITY):
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * RECORD_DTYPE.itemsize)
+        ring = cls(shm, capacity, owner=True)
+        ring.head[0] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity):
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def written(self):
+        return int(self.head[0])
+
+    def write(self, sample):
+        total = int(self.head[0])
+        record = self.records[total % self.capacity]
+        record["timestamp"] = sample.timestamp
+        record["received"] = sample.received
+        record["channel"] = sample.channel
+        values = sample.values
+        record["values"] = (values[0], values[1] if len(values) > 1 else 0)
+        self.head[0] = total + 1
+
+    def read(self, cursor, limit=None):
+        """
+        读取 cursor 之后的记录，返回 (记录数组副本, 新的 cursor, 丢失的条数)
+        limit 为一次最多读取的条数，剩下的留到下次
+        """
+        total = int(self.head[0])
+        lost = 0
+        if total - cursor > self.capacity:
+            lost = total - self.capacity - cursor
+            cursor = total - self.capacity
+        end = total if limit is None else min(total, cursor + limit)
+        if end <= cursor:
+            return self.records[:0].copy(), cursor, lost
+        start_slot = cursor % self.capacity
+        end_slot = end % self.capacity
+        if start_slot < end_slot:
+            chunk = self.records[start_slot:end_slot].copy()
+        else:
+            chunk = np.concatenate([self.records[start_slot:], self.records[:end_slot]])
+        # 复制期间写入方可能已覆盖了最早的几条；写入总数为 n 时写入方可能正在写第 n 条所在的槽位，
+        # 它与第 n - capacity 条是同一个槽位，所以这一条也按已丢失处理
+        overwritten = min(int(self.head[0]) + 1 - self.capacity - cursor, end - cursor)
+        if overwritten > 0:
+            chunk = chunk[overwritten:]
+            lost += overwritten
+        return chunk, end, lost
+
+    def close(self):
+        self.head = self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _post(events, message):
+    try:
+        events.put_nowait(message)
+        return True
+    except queue.Full:
+        return False
+
+
+def run_acquisition(port, baud, ring_name, capacity, control, events, options):
+    """
+    采集进程入口：打开串口，运行 ChunkReader + AcquisitionEngine + SerialWriter，
+    直到控制队列收到 None
+    """
+    import serial
+    from acquisition import AcquisitionEngine, ChunkReader
+    from alarms import AlarmEngine
+    from latency import LatencyTracker
+    from serial_writer import SerialWriter
+
+    log_level = options.get("log_level", logging.DEBUG)
+    dropped = 0
+
+    def post(message):
+        nonlocal dropped
+        if not _post(events, message):
+            dropped += 1
+
+    try:
+        ser = serial.Serial(port, baud, timeout=0.05)
+    except Exception as e:
+        post(("error", f"打开串口失败: {e}"))
+        return
+    ring = SampleRing.attach(ring_name, capacity)
+    alarms = AlarmEngine(hysteresis=options.get("hysteresis"), dwell=options.get("dwell"))
+    engine = AcquisitionEngine(ser, channel=options.get("channel", CHANNEL_TEMP_HUMI),
+                               name=options.get("name", ""), alarms=alarms)
+    for name, (low, high) in options.get("thresholds", {}).items():
+        engine.set_thresholds(name, low, high)
+    latency = LatencyTracker() if options.get("latency") else None
+    engine.latency = latency
+
+    def on_event(event, payload):
+        if event == "sample":
+            ring.write(payload)
+        elif event == "line":
+            if log_level <= logging.DEBUG:
+                post(("log", (logging.DEBUG, payload)))
+        elif event == "log":
+            if payload[0] >= log_level:
+                post(("log", payload))
+    engine.subscribe(on_event)
+
+    writer = SerialWriter(ser, log=engine.log, latency=latency, **options.get("writer_options", {}))
+    writer_thread = threading.Thread(target=writer.run, name="writer", daemon=True)
+    writer_thread.start()
+    engine.writer = writer
+
+    lock = threading.Lock()  # 命令和数据处理互斥，报警状态和阈值只在持有锁时修改
+
+    def on_batch(lines, stamps):
+        with lock:
+            engine.process_lines(lines, stamps)
+
+    reader = ChunkReader(ser, on_batch, options.get("max_batch", 64), options.get("max_latency", 0.05),
+                         link=engine.link)
+
+    def post_stats():
+        post(("link", engine.link_stats()))
+        if latency:
+            post(("latency", latency.take()))
+
+    def control_loop():
+        nonlocal log_level
+        while True:
+            try:
+                message = control.get(timeout=LINK_INTERVAL)
+            except queue.Empty:
+                post_stats()
+                continue
+            if message is None:
+                break
+            kind, *args = message
+            if kind == "log_level":
+                log_level = args[0]
+            elif kind == "call" and args[0] in REMOTE_METHODS:
+                with lock:
+                    getattr(engine, args[0])(*args[1])
+        reader.stop()
+    control_thread = threading.Thread(target=control_loop, name="control", daemon=True)
+    control_thread.start()
+
+    post(("ready", None))
+    binary_baud = options.get("binary_baud")
+    if binary_baud is not None:
+        with lock:
+            engine.request_binary(binary_baud)
+    try:
+        reader.run()
+    finally:
+        writer.flush()
+        writer.stop()
+        writer_thread.join()
+        ser.close()
+        stats = writer.stats()
+        stats["events_dropped"] = dropped
+        post_stats()
+        post(("stats", stats))
+        ring.close()
+        post(("closed", None))
+
+
+class AcquisitionProcess:
+    """
+    界面进程中的采集进程代理，提供界面用到的 AcquisitionEngine 接口：
+    命令通过控制队列发给采集进程，poll() 从共享内存读取新采样、从事件队列读取日志，
+    再以 "sample" / "upload" / "log" 事件发布给订阅者（订阅者与 AcquisitionEngine 的相同）
+
+    hysteresis/dwell 为 AlarmEngine 的参数，writer_options 为 SerialWriter 的参数
+    capacity 为共享内存中保存的采样条数，界面落后超过该值时最早的采样不再显示，记为 overruns
+    """
+    def __init__(self, channel=CHANNEL_TEMP_HUMI, name="", capacity=DEFAULT_CAPACITY, hysteresis=None,
+                 dwell=None, writer_options=None, log_level=logging.DEBUG, max_events=10000):
+        self.channel = channel
+        self.name = name
+        self.capacity = capacity
+        self.hysteresis = hysteresis
+        self.dwell = dwell
+        self.writer_options = writer_options or {}
+        self.log_level = log_level
+        self.max_events = max_events
+        self.upload_enabled = False
+        self.latency = None  # latency.LatencyTracker，open() 前设置时并入采集进程的校验、回发时延
+        self.thresholds = {}  # 启动前设置的阈值，启动时交给采集进程
+        self.ring = None
+        self.cursor = 0
+        self.process = None
+        self.control = None
+        self.events = None
+        self.ready = False    # 收到采集进程的 "ready" 事件（串口已打开）后为 True
+        self.starting = False  # 采集进程已启动、尚未报告 ready 或 error
+        self.overruns = 0
+        self.received = 0  # 从共享内存读到的采样数
+        self.writer_stats = None  # 采集进程退出时发回的串口发送统计
+        self.link = None  # 采集进程最近发回的链路质量快照
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _publish(self, event, payload):
+        for callback in list(self._subscribers):
+            callback(event, payload)
+
+    def log(self, message, level=logging.INFO):
+        self._publish("log", (level, message))
+
+    @property
+    def port_open(self):
+        return bool(self.ready and self.process is not None and self.process.is_alive())
+
+    @property
+    def accepting(self):
+        """采集进程启动中或已就绪时命令可以入队，启动中入队的命令在串口打开后依次执行"""
+        return bool((self.ready or self.starting) and self.process is not None and self.process.is_alive())
+
+    # ---------- 生命周期 ----------
+    def open(self, port, baud=9600, binary_baud=None, max_batch=64, max_latency=0.05):
+        """启动采集进程（spawn 方式，不继承界面进程的 Qt 状态）"""
+        context = multiprocessing.get_context("spawn")
+        self.ring = SampleRing.create(self.capacity)
+        self.cursor = 0
+        self.link = None
+        self.control = context.Queue()
+        self.events = context.Queue(self.max_events)
+        options = {
+            "channel": self.channel,
+            "name": self.name,
+            "hysteresis": self.hysteresis,
+            "dwell": self.dwell,
+            "thresholds": dict(self.thresholds),
+            "writer_options": self.writer_options,
+            "log_level": self.log_level,
+            "binary_baud": binary_baud,
+            "max_batch": max_batch,
+            "max_latency": max_latency,
+            "latency": self.latency is not None,
+        }
+        self.process = context.Process(
+            target=run_acquisition, name=f"acquisition-{port}",
+            args=(port, baud, self.ring.name, self.capacity, self.control, self.events, options), daemon=True)
+        self.process.start()
+        self.ready = False
+        self.starting = True
+
+    def close(self, timeout=3.0):
+        if self.process is None:
+            return
+        self.control.put(None)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self._drain_events()
+        self.poll()
+        self.ready = self.starting = False
+        self.process = None
+        self.ring.close()
+        self.ring = None
+
+    # ---------- 命令 ----------
+    def _call(self, method, *args):
+        if not self.accepting:
+            return False
+        self.control.put(("call", method, args))
+        return True
+
+    def set_log_level(self, level):
+        self.log_level = level
+        if self.accepting:
+            self.control.put(("log_level", level))
+
+    def start_collect(self):
+        return self._call("start_collect")
+
+    def stop_collect(self):
+        return self._call("stop_collect")
+
+    def set_channel(self, channel):
+        self.channel = channel
+        self._call("set_channel", channel)
+
+    def send_channel_cmd(self):
+        self._call("send_channel_cmd")
+
+    def set_thresholds(self, name, low, high):
+        self.thresholds[name] = (low, high)
+        self._call("set_thresholds", name, low, high)
+
+    def send_command(self, sig):
+        return self._call("send_command", sig)
+
+    def request_binary(self, baud=None):
+        return self._call("request_binary", baud)
+
+    def request_text(self):
+        return self._call("request_text")
+
+    # ---------- 轮询 ----------
+    def poll(self, limit=None):
+        """读取新的采样和日志并发布，返回采样数；由界面定时器调用"""
+        if self.ring is None:
+            return 0
+        self._drain_events()
+        records, self.cursor, lost = self.ring.read(self.cursor, limit)
+        if lost:
+            self.overruns += lost
+            self.log(f"⚠️ 界面处理过慢，{lost} 个采样未显示（采集进程已正常处理）", logging.WARNING)
+        self.received += len(records)
+        source = self.name
+        for timestamp, received, channel, values in records.tolist():
+            values = values.tolist()  # 子数组字段 tolist() 后仍为 ndarray
+            sample = Sample(channel, tuple(values) if channel == CHANNEL_TEMP_HUMI else (values[0],),
+                            timestamp, source, received)
+            self._publish("sample", sample)
+            if self.upload_enabled:
+                self._publish("upload", sample)
+        return len(records)
+
+    def _drain_events(self):
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "log":
+                self._publish("log", payload)
+            elif kind == "ready":
+                self.ready = True
+                self.starting = False
+            elif kind == "error":
+                self.ready = self.starting = False
+                self.log(f"❌ {payload}", logging.ERROR)
+            elif kind == "link":
+                self.link = payload
+            elif kind == "latency":
+                if self.latency:
+                    self.latency.merge(payload)
+            elif kind == "stats":
+                self.writer_stats = payload
+            elif kind == "closed":
+                self.ready = self.starting = False
+
+    def link_stats(self):
+        """采集进程最近发回的链路质量快照，尚未收到时返回 None"""
+        return self.link
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "overruns": self.overruns,
+            "alive": self.port_open,
+        }
@@ -0,0 +1,231 @@
+"""
+滚动统计：按固定时间窗口（如 10 秒、1 分钟、1 小时）增量计算每个量的
+最小值、最大值、均值、标准差和近似分位数，窗口结束时产出一条汇总（rollup）
+
+每个采样只做 O(1) 的累加，不保存原始数据；分位数用相对误差分桶估计，
+内存只与取值范围的对数有关。汇总可以代替原始采样上传，慢变化的信号上传量下降几个数量级。
+
+汇总格式:
+    {"type": "rollup", "series": "temperature_humidity", "window": 60,
+     "start": 毫秒时间戳, "end": 毫秒时间戳, "count": 采样数,
+     "temperature": {"min": .., "max": .., "mean": .., "std": .., "p50": .., "p90": .., "p99": ..},
+     "humidity": {...}, "source": "COM2"}
+"""
+import math
+import time
+
+from frame_decoder import CHANNEL_TEMP_HUMI
+
+DEFAULT_WINDOWS = (10, 60, 3600)  # 默认窗口长度（秒）
+PERCENTILES = (50, 90, 99)
+RELATIVE_ERROR = 0.01  # 分位数的相对误差上限
+
+# 序列名 -> 各值的字段名，与上传格式一致
+SERIES_FIELDS = {
+    "temperature_humidity": ("temperature", "humidity"),
+    "frequency": ("frequency",),
+}
+FIELD_TITLES = {"temperature": ("温度", "℃"), "humidity": ("湿度", "%"), "frequency": ("频率", "Hz")}
+
+
+def series_of(channel):
+    return "temperature_humidity" if channel == CHANNEL_TEMP_HUMI else "frequency"
+
+
+class QuantileSketch:
+    """
+    对数分桶的分位数估计：第 k 个桶覆盖 (gamma^(k-1), gamma^k]，
+    取桶的中点作为估计值，相对误差不超过 relative_error；非正数单独计数
+    """
+    def __init__(self, relative_error=RELATIVE_ERROR):
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        k = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+
+    def quantile(self, q):
+        """q 取 0~1，没有数据时返回 None"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen > rank:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RunningStats:
+    """单个量的增量统计，均值和方差用 Welford 算法，避免大数相减丢失精度"""
+    def __init__(self, relative_error=RELATIVE_ERROR):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sketch = QuantileSketch(relative_error)
+
+    def add(self, value):
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.sketch.add(value)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def summary(self):
+        if not self.count:
+            return None
+        result = {
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.mean, 3),
+            "std": round(self.std, 3),
+        }
+        for p in PERCENTILES:
+            # 估计值不超出实际的最小/最大值
+            estimate = min(max(self.sketch.quantile(p / 100), self.min), self.max)
+            result[f"p{p}"] = round(estimate, 3)
+        return result
+
+
+class _Window:
+    """一个来源、一个序列、一种窗口长度当前正在累计的窗口"""
+    def __init__(self, start, width_ms, fields, relative_error):
+        self.start = start
+        self.end = start + width_ms
+        self.fields = fields
+        self.stats = [RunningStats(relative_error) for _ in fields]
+        self.count = 0
+
+    def add(self, values):
+        self.count += 1
+        for stats, value in zip(self.stats, values):
+            stats.add(value)
+
+
+class RollingAggregator:
+    """
+    滚动统计，可直接作为 AcquisitionEngine 的订阅者（只处理 "sample" 事件）
+
+    窗口按时间戳对齐（10 秒窗口从每个整 10 秒开始），每个来源、每个通道、每种窗口长度各自累计
+    on_rollup(rollup) 在窗口结束时调用：下一个窗口的采样到达，或 poll() 发现窗口已过期
+    grace 为窗口结束后继续等待迟到采样的时间（秒），之后 poll() 才关闭该窗口
+    没有来源的采样（单串口界面）记为 default_source
+    """
+    def __init__(self, windows=DEFAULT_WINDOWS, on_rollup=None, grace=2.0, default_source="",
+                 relative_error=RELATIVE_ERROR):
+        if not windows or any(w <= 0 for w in windows):
+            raise ValueError(f"窗口长度必须为正数: {windows}")
+        self.windows = tuple(sorted(windows))
+        self.on_rollup = on_rollup
+        self.grace = grace
+        self.default_source = default_source
+        self.relative_error = relative_error
+        self.open = {}  # (来源, 通道, 窗口长度) -> _Window
+        self.last = {}  # (来源, 通道, 窗口长度) -> 最近结束的汇总
+        self.emitted = 0
+
+    def __call__(self, event, payload):
+        if event == "sample":
+            self.add(payload)
+
+    def add(self, sample):
+        source = sample.source or self.default_source
+        fields = SERIES_FIELDS[series_of(sample.channel)]
+        timestamp = sample.timestamp
+        for width in self.windows:
+            width_ms = int(width * 1000)
+            key = (source, sample.channel, width)
+            window = self.open.get(key)
+            if window is None or timestamp >= window.end:
+                if window is not None:
+                    self._close(key, window)
+                start = timestamp - timestamp % width_ms
+                window = _Window(start, width_ms, fields, self.relative_error)
+                self.open[key] = window
+            # 比窗口开始还早的迟到采样（如时钟回拨）计入当前窗口
+            window.add(sample.values)
+
+    def poll(self, now_ms=None):
+        """关闭已过期（结束后超过 grace 秒）的窗口，返回关闭的个数"""
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        deadline = now_ms - int(self.grace * 1000)
+        expired = [(key, window) for key, window in self.open.items() if window.end <= deadline]
+        for key, window in expired:
+            del self.open[key]
+            self._close(key, window)
+        return len(expired)
+
+    def flush(self):
+        """关闭全部窗口（退出时调用），未满的窗口带 "partial": True"""
+        windows = list(self.open.items())
+        self.open.clear()
+        for key, window in windows:
+            self._close(key, window, partial=True)
+
+    def current(self, source, channel, width):
+        """正在累计的窗口的汇总，没有数据时返回 None"""
+        key = (source or self.default_source, channel, width)
+        window = self.open.get(key)
+        return self._rollup(key, window) if window else None
+
+    def _rollup(self, key, window, partial=False):
+        source, channel, width = key
+        rollup = {
+            "type": "rollup",
+            "series": series_of(channel),
+            "window": width,
+            "start": window.start,
+            "end": window.end,
+            "count": window.count,
+        }
+        for field, stats in zip(window.fields, window.stats):
+            rollup[field] = stats.summary()
+        if partial:
+            rollup["partial"] = True
+        if source:
+            rollup["source"] = source
+        return rollup
+
+    def _close(self, key, window, partial=False):
+        rollup = self._rollup(key, window, partial)
+        self.last[key] = rollup
+        self.emitted += 1
+        if self.on_rollup is not None:
+            self.on_rollup(rollup)
+
+
+def format_rollup(rollup):
+    """一行可读的汇总文本，用于日志"""
+    start = time.strftime("%H:%M:%S", time.localtime(rollup["start"] / 1000))
+    prefix = f"[{rollup['source']}] " if rollup.get("source") else ""
+    parts = []
+    for field in SERIES_FIELDS[rollup["series"]]:
+        stats = rollup.get(field)
+        if not stats:
+            continue
+        title, unit = FIELD_TITLES[field]
+        parts.append(f"{title} 均值 {stats['mean']:g}{unit}（{stats['min']}~{stats['max']}，"
+                     f"σ {stats['std']:g}，p90 {stats['p90']:g}）")
+    return f"📈 {prefix}{start} 起 {rollup['window']:g} 秒汇总 {rollup['count']} 条: " + "，".join(parts)
@@ -0,0 +1,287 @@
+"""
+阈值报警引擎：阈值编辑时预编译为数组，按批向量化判断所有通道、所有板子的报警状态
+
+每条规则（温度/湿度/频率）支持:
+    - 回差（hysteresis）：超出 [low, high] 时报警，回到 [low + h, high - h] 以内才解除
+    - 最短持续时间（dwell）：新状态持续 dwell 秒后才真正切换，避免在阈值附近反复发送报警命令
+回差和持续时间都为 0 时与原界面逻辑完全一致：第一次超限即报警，第一次回到范围内即解除。
+"""
+from itertools import chain
+from typing import NamedTuple
+
+import numpy as np
+
+from frame_decoder import CHANNEL_TEMP_HUMI, CHANNEL_FREQ
+
+# 阈值解析失败时使用的默认范围（与原界面逻辑一致）
+FALLBACK_THRESHOLDS = {
+    "temp": (0, 100),
+    "humi": (0, 100),
+    "freq": (0, 10000),
+}
+# 界面输入框的默认阈值
+DEFAULT_THRESHOLDS = {
+    "temp": (0, 40),
+    "humi": (0, 90),
+    "freq": (0, 6000),
+}
+
+# 小于该条数的批次逐条判断：每条规则只有几次比较，从 Sample 对象收集成数组的开销
+# 在小批次上超过向量化省下的时间，实测约上千条以上向量化才更快（如断线重连后积压的数据）
+VECTOR_MIN_BATCH = 1024
+
+
+class AlarmRule(NamedTuple):
+    name: str
+    channel: int
+    column: int       # 在 Sample.values 中的下标
+    raise_cmd: bytes  # 报警命令
+    clear_cmd: bytes  # 解除命令
+    title: str
+
+
+RULES = (
+    AlarmRule("temp", CHANNEL_TEMP_HUMI, 0, b'X', b'x', "温度"),
+    AlarmRule("humi", CHANNEL_TEMP_HUMI, 1, b'Y', b'y', "湿度"),
+    AlarmRule("freq", CHANNEL_FREQ, 0, b'Z', b'z', "频率"),
+)
+RULE_INDEX = {rule.name: i for i, rule in enumerate(RULES)}
+
+
+class _Compiled(NamedTuple):
+    """一个通道的全部规则编译后的数组，行对应板子，列对应规则"""
+    rules: np.ndarray      # 规则在 RULES 中的下标
+    columns: np.ndarray    # 取 Sample.values 的哪一列
+    low: np.ndarray
+    high: np.ndarray
+    clear_low: np.ndarray  # 解除报警的下限 low + 回差
+    clear_high: np.ndarray
+    dwell: np.ndarray      # 每条规则一个值，不分板子
+
+
+def _ffill(known, values, initial, group_start):
+    """
+    按组向前填充：known 为 False 的位置沿用同组内前一个 known 位置的值，
+    同组内还没有 known 位置时取 initial。所有数组形状为 (n, 规则数)，group_start 为 (n,)
+    """
+    pos = np.arange(len(known))[:, None]
+    last = np.maximum.accumulate(np.where(known, pos, -1), axis=0)
+    picked = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    return np.where(last < group_start[:, None], initial, picked)
+
+
+def _shift(values, initial, is_start):
+    """同组内的前一个值，组内第一个位置取 initial"""
+    prev = np.empty_like(values)
+    prev[1:] = values[:-1]
+    return np.where(is_start[:, None], initial, prev)
+
+
+class AlarmEngine:
+    """
+    报警状态机，每个板子（Sample.source）的每条规则有独立状态，阈值可按板子单独设置
+
+    evaluate(samples) 返回与 samples 等长的列表，每项为该采样触发的 [(AlarmRule, 报警中), ...]
+    """
+    def __init__(self, thresholds=None, hysteresis=None, dwell=None):
+        self.limits = dict(DEFAULT_THRESHOLDS)
+        self.limits.update(thresholds or {})
+        self.board_limits = {}  # 板子名 -> 单独设置的阈值
+        self.hysteresis = {rule.name: 0.0 for rule in RULES}
+        self.hysteresis.update(hysteresis or {})
+        self.dwell = {rule.name: 0.0 for rule in RULES}
+        self.dwell.update(dwell or {})
+        # 每个板子每条规则的状态，按板子的行号存放；
+        # 用 Python 列表而不是数组，逐条判断时访问更快，批量判断时再转成数组
+        self.boards = {}     # 板子名 -> 行号
+        self.candidate = []  # 经回差判断后的状态
+        self.active = []     # 经持续时间确认后的状态
+        self.run_start = []  # candidate 当前状态开始的时刻
+        self.compile()
+
+    # ---------- 配置 ----------
+    def thresholds(self, board=""):
+        """某个板子实际使用的阈值"""
+        limits = dict(self.limits)
+        limits.update(self.board_limits.get(board, {}))
+        return limits
+
+    def set_thresholds(self, name, low, high, board=None):
+        """设置阈值，无法解析时退回默认范围；board 为 None 时设置所有板子的默认值"""
+        try:
+            limit = (float(low), float(high))
+        except (TypeError, ValueError):
+            limit = FALLBACK_THRESHOLDS[name]
+        if board is None:
+            self.limits[name] = limit
+        else:
+            self.board_limits.setdefault(board, {})[name] = limit
+        self.compile()
+
+    def set_hysteresis(self, name, value):
+        self.hysteresis[name] = max(0.0, float(value))
+        self.compile()
+
+    def set_dwell(self, name, seconds):
+        self.dwell[name] = max(0.0, float(seconds))
+        self.compile()
+
+    def compile(self):
+        """
+        把阈值、回差和持续时间编译为按通道分组的数组（板子 x 规则），
+        只在配置改变或出现新板子时调用，逐帧判断时不再解析任何配置
+        """
+        boards = sorted(self.boards, key=self.boards.get) or [""]
+        compiled = {}
+        scalar = {}
+        for channel in (CHANNEL_TEMP_HUMI, CHANNEL_FREQ):
+            indices = [i for i, rule in enumerate(RULES) if rule.channel == channel]
+            limits = [self.thresholds(board) for board in boards]
+            low = np.array([[lim[RULES[i].name][0] for i in indices] for lim in limits], dtype=np.float64)
+            high = np.array([[lim[RULES[i].name][1] for i in indices] for lim in limits], dtype=np.float64)
+            # 回差过大时解除区间会为空，最多取区间宽度的一半
+            band = np.array([self.hysteresis[RULES[i].name] for i in indices], dtype=np.float64)
+            band = np.minimum(band, np.maximum(high - low, 0) / 2)
+            c = compiled[channel] = _Compiled(
+                rules=np.array(indices),
+                columns=np.array([RULES[i].column for i in indices]),
+                low=low,
+                high=high,
+                clear_low=low + band,
+                clear_high=high - band,
+                dwell=np.array([self.dwell[RULES[i].name] for i in indices], dtype=np.float64),
+            )
+            scalar[channel] = [
+                [(int(c.rules[j]), int(c.columns[j]), float(c.low[b, j]), float(c.high[b, j]),
+                  float(c.clear_low[b, j]), float(c.clear_high[b, j]), float(c.dwell[j]))
+                 for j in range(len(indices))]
+                for b in range(len(boards))
+            ]
+        self.compiled = compiled
+        self.scalar = scalar  # 逐条判断用的同一份配置，scalar[通道][板子行号]
+
+    # ---------- 状态 ----------
+    def _slot(self, board):
+        slot = self.boards.get(board)
+        if slot is None:
+            slot = self.boards[board] = len(self.boards)
+            self.candidate.append([False] * len(RULES))
+            self.active.append([False] * len(RULES))
+            self.run_start.append([-np.inf] * len(RULES))
+            self.compile()
+        return slot
+
+    def is_active(self, name, board=""):
+        slot = self.boards.get(board)
+        return slot is not None and self.active[slot][RULE_INDEX[name]]
+
+    def reset(self, board=None):
+        """清除报警状态（board 为 None 时清除所有板子）"""
+        if board is None:
+            slots = list(self.boards.values())
+        else:
+            slots = [self.boards[board]] if board in self.boards else []
+        for slot in slots:
+            self.candidate[slot] = [False] * len(RULES)
+            self.active[slot] = [False] * len(RULES)
+            self.run_start[slot] = [-np.inf] * len(RULES)
+
+    # ---------- 判断 ----------
+    def evaluate(self, samples):
+        """按顺序判断一批采样，返回每个采样触发的报警状态变化"""
+        if len(samples) < VECTOR_MIN_BATCH:
+            return [self.evaluate_one(sample) for sample in samples]
+        return self.evaluate_vector(samples)
+
+    def evaluate_vector(self, samples):
+        """向量化路径：按通道分组，所有板子的所有规则一次用数组运算判断"""
+        edges = [[] for _ in samples]
+        by_channel = {}
+        for i, sample in enumerate(samples):
+            by_channel.setdefault(sample.channel, []).append(i)
+        for channel, positions in by_channel.items():
+            if len(positions) == len(samples):
+                self._evaluate_channel(channel, samples, positions, edges)
+            else:
+                self._evaluate_channel(channel, [samples[i] for i in positions], positions, edges)
+        return edges
+
+    def evaluate_one(self, sample):
+        """单个采样的标量路径，与向量化路径结果一致"""
+        slot = self.boards.get(sample.source)
+        if slot is None:
+            slot = self._slot(sample.source)
+        candidates = self.candidate[slot]
+        active = self.active[slot]
+        run_start = self.run_start[slot]
+        now = sample.received
+        values = sample.values
+        edges = []
+        for rule_index, column, low, high, clear_low, clear_high, dwell in self.scalar[sample.channel][slot]:
+            value = values[column]
+            candidate = candidates[rule_index]
+            if value < low or value > high:
+                new_candidate = True
+            elif clear_low <= value <= clear_high:
+                new_candidate = False
+            else:
+                new_candidate = candidate
+            if new_candidate != candidate:
+                candidates[rule_index] = new_candidate
+                run_start[rule_index] = now
+            if new_candidate != active[rule_index] and now - run_start[rule_index] >= dwell:
+                active[rule_index] = new_candidate
+                edges.append((RULES[rule_index], new_candidate))
+        return edges
+
+    def _evaluate_channel(self, channel, samples, positions, edges):
+        n = len(samples)
+        width = len(samples[0].values)
+        boards = self.boards
+        for board in {sample.source for sample in samples} - boards.keys():
+            self._slot(board)
+        compiled = self.compiled[channel]  # 新板子会触发重新编译，之后再取
+        slots = np.fromiter((boards[sample.source] for sample in samples), np.intp, n)
+        values = np.fromiter(chain.from_iterable(sample.values for sample in samples), np.float64, n * width)
+        times = np.fromiter((sample.received for sample in samples), np.float64, n)
+        order = np.argsort(slots, kind="stable")  # 按板子分组，组内保持时间顺序
+        slots = slots[order]
+        values = values.reshape(n, width)[order][:, compiled.columns]
+        times = times[order]
+
+        is_start = np.ones(n, dtype=bool)
+        is_start[1:] = slots[1:] != slots[:-1]
+        group_start = np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+        rules = compiled.rules
+        init_candidate = np.array(self.candidate, dtype=bool)[slots][:, rules]
+        init_active = np.array(self.active, dtype=bool)[slots][:, rules]
+        init_run_start = np.array(self.run_start, dtype=np.float64)[slots][:, rules]
+
+        # 回差：超限为 True，回到解除区间为 False，夹在中间沿用之前的状态
+        out = (values < compiled.low[slots]) | (values > compiled.high[slots])
+        inside = (values >= compiled.clear_low[slots]) & (values <= compiled.clear_high[slots])
+        candidate = _ffill(out | inside, out, init_candidate, group_start)
+        # 持续时间：candidate 每次变化记下开始时刻，持续够 dwell 后 active 才跟随
+        changed = candidate != _shift(candidate, init_candidate, is_start)
+        stamp = np.broadcast_to(times[:, None], candidate.shape)
+        run_start = _ffill(changed, stamp, init_run_start, group_start)
+        settled = stamp - run_start >= compiled.dwell
+        active = _ffill(settled, candidate, init_active, group_start)
+        flips = active != _shift(active, init_active, is_start)
+
+        # 保存每个板子最后的状态
+        is_end = np.ones(n, dtype=bool)
+        is_end[:-1] = is_start[1:]
+        for end in np.flatnonzero(is_end):
+            slot = slots[end]
+            for j, rule_index in enumerate(rules):
+                self.candidate[slot][rule_index] = bool(candidate[end, j])
+                self.active[slot][rule_index] = bool(active[end, j])
+                self.run_start[slot][rule_index] = float(run_start[end, j])
+
+        rows, cols = np.nonzero(flips)  # 按行优先，同一采样的规则保持 RULES 中的顺序
+        if len(rows):
+            order = order.tolist()
+            rule_list = rules.tolist()
+            for pos, j, on in zip(rows.tolist(), cols.tolist(), active[rows, cols].tolist()):
+                edges[positions[order[pos]]].append((RULES[rule_list[j]], on))
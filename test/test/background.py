@@ -0,0 +1,103 @@
+"""
+窗口背景图合成：按窗口尺寸缩放背景图并叠加淡灰色蒙版
+
+缩放在后台线程中完成（QImage 可以跨线程使用），结果按尺寸 LRU 缓存，
+连续的尺寸变化只合成最后一次，界面线程不会因为拖动窗口或切换显示器而卡住。
+"""
+import collections
+import threading
+
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread
+from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap
+
+OVERLAY_COLOR = QColor(200, 200, 200, 80)  # 淡灰色蒙版，80为透明度
+
+
+def compose(source, width, height, overlay=OVERLAY_COLOR):
+    """把 source 按比例铺满 width x height（超出部分由画刷裁掉），再叠加蒙版"""
+    image = source.scaled(width, height, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    if image.format() != QImage.Format_ARGB32_Premultiplied:
+        image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    painter = QPainter(image)
+    painter.fillRect(image.rect(), overlay)  # 直接半透明填充，不再分配整幅蒙版图
+    painter.end()
+    return image
+
+
+class BackgroundCompositor(QThread):
+    """
+    背景合成线程
+
+    request(width, height, ratio) 在界面线程调用：缓存命中时直接返回 QPixmap，
+    否则在 debounce_ms 毫秒内没有新的尺寸后交给后台线程合成，完成后发出 ready(QPixmap)。
+    ratio 为屏幕的 devicePixelRatio，高分屏按物理像素合成。
+    """
+    ready = pyqtSignal(QPixmap)
+    _composed = pyqtSignal(object, QImage)
+
+    def __init__(self, path, cache_size=4, debounce_ms=120, overlay=OVERLAY_COLOR, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.overlay = overlay
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()  # (宽, 高, 倍率) -> QPixmap
+        self.target = None   # 界面当前需要的尺寸
+        self.pending = None  # 已交给后台线程、尚未合成的尺寸
+        self.running = True
+        self.cond = threading.Condition()
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(debounce_ms)
+        self.debounce.timeout.connect(self._submit)
+        self._composed.connect(self._on_composed)
+
+    def request(self, width, height, ratio=1.0, immediate=False):
+        key = (width, height, ratio)
+        self.target = key
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.cache.move_to_end(key)
+            self.debounce.stop()
+            return pixmap
+        if immediate:
+            self._submit()
+        else:
+            self.debounce.start()
+        return None
+
+    def _submit(self):
+        with self.cond:
+            self.pending = self.target
+            self.cond.notify()
+
+    def _on_composed(self, key, image):
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(key[2])
+        self.cache[key] = pixmap
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        if key == self.target:
+            self.ready.emit(pixmap)
+
+    def run(self):
+        source = QImage(self.path)
+        if source.isNull():
+            return
+        while True:
+            with self.cond:
+                while self.running and self.pending is None:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                key, self.pending = self.pending, None
+            width, height, ratio = key
+            image = compose(source, round(width * ratio), round(height * ratio), self.overlay)
+            self._composed.emit(key, image)
+
+    def stop(self):
+        self.debounce.stop()
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.wait()
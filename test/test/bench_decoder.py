@@ -0,0 +1,119 @@
+"""
+帧解码微基准：对比旧的三次 split/正则解析与 frame_decoder 单次解码，以及同内容的二进制帧解码
+
+运行: python bench_decoder.py [--number 200000]
+"""
+import argparse
+import re
+import timeit
+
+from frame_decoder import (
+    decode_frame, decode_binary_frame, encode_binary_frame, calculate_checksum, CHANNEL_TEMP_HUMI, CHANNEL_FREQ,
+)
+
+
+# ---------- 旧实现（原 MainWindow 中的校验与解析流程，作为对照） ----------
+def legacy_checksum(data_str):
+    checksum = 0
+    for char in data_str:
+        checksum += ord(char)
+    return checksum
+
+
+def legacy_validate_checksum(line):
+    if "CHECKSUM:" not in line:
+        return False, "缺少校验和"
+    parts = line.split(" CHECKSUM:")
+    if len(parts) != 2:
+        return False, "校验和格式错误"
+    data_part = parts[0]
+    try:
+        received_checksum = int(parts[1])
+    except ValueError:
+        return False, "校验和数值格式错误"
+    calculated_checksum = legacy_checksum(data_part)
+    if received_checksum != calculated_checksum:
+        return False, f"校验和不匹配: 接收={received_checksum}, 计算={calculated_checksum}"
+    return True, f"校验和正确: {calculated_checksum}"
+
+
+def legacy_validate_data_format(data_part, channel):
+    if channel == CHANNEL_TEMP_HUMI:
+        if not re.match(r"T:\d+\s+H:\d+", data_part):
+            return False, "温湿度数据格式错误"
+        t, h = map(int, re.findall(r"\d+", data_part))
+        if not (0 <= t <= 100):
+            return False, f"温度数值超出范围: {t}℃"
+        if not (0 <= h <= 100):
+            return False, f"湿度数值超出范围: {h}%"
+        return True, f"温湿度数据有效: T={t}℃, H={h}%"
+    if not re.match(r"FREQ:\d+", data_part):
+        return False, "频率数据格式错误"
+    f = int(re.search(r"\d+", data_part).group())
+    if not (0 <= f <= 10000):
+        return False, f"频率数值超出范围: {f}Hz"
+    return True, f"频率数据有效: {f}Hz"
+
+
+def legacy_decode(line, channel):
+    """校验 + 再次解析数值，返回 (有效, 数值)"""
+    valid, _ = legacy_validate_checksum(line)
+    if not valid:
+        return False, ()
+    data_part = line.split(" CHECKSUM:")[0]
+    valid, _ = legacy_validate_data_format(data_part, channel)
+    if not valid:
+        return False, ()
+    data_part = line.split(" CHECKSUM:")[0]
+    if channel == CHANNEL_TEMP_HUMI:
+        match = re.search(r"T:(\d+)\s+H:(\d+)", data_part)
+        return True, (int(match.group(1)), int(match.group(2)))
+    match = re.search(r"FREQ:(\d+)", data_part)
+    return True, (int(match.group(1)),)
+
+
+# ---------- 基准 ----------
+def make_frame(data):
+    return f"{data} CHECKSUM:{calculate_checksum(data)}"
+
+
+CASES = [
+    ("温湿度帧", make_frame("T:25 H:60"), CHANNEL_TEMP_HUMI),
+    ("频率帧", make_frame("FREQ:4321"), CHANNEL_FREQ),
+    ("校验错误帧", "T:25 H:60 CHECKSUM:1", CHANNEL_TEMP_HUMI),
+]
+# 与文本帧内容相同的二进制帧，校验错误帧翻转 CRC 的最后一位
+BINARY_CASES = [
+    encode_binary_frame(CHANNEL_TEMP_HUMI, (25, 60), 0),
+    encode_binary_frame(CHANNEL_FREQ, (4321,), 0),
+    encode_binary_frame(CHANNEL_TEMP_HUMI, (25, 60), 0)[:-1] + b"\x00",
+]
+
+
+def check_equivalent():
+    """确认新旧实现结论一致"""
+    for _, line, channel in CASES:
+        for data in (line, line.encode()):
+            old_valid, old_values = legacy_decode(line, channel)
+            frame = decode_frame(data, expect=channel)
+            assert frame.ok == old_valid and (not old_valid or frame.values == old_values), line
+    for (_, line, channel), binary in zip(CASES, BINARY_CASES):
+        assert decode_binary_frame(binary, channel)[:2] == decode_frame(line, channel)[:2], line
+
+
+def run(number):
+    check_equivalent()
+    print(f"{'用例':<10}{'旧实现 ns/帧':>14}{'str ns/帧':>12}{'bytes ns/帧':>14}{'加速比':>8}{'二进制 ns/帧':>14}")
+    for (title, line, channel), binary in zip(CASES, BINARY_CASES):
+        raw = line.encode()
+        old = min(timeit.repeat(lambda: legacy_decode(line, channel), number=number, repeat=3)) / number
+        new = min(timeit.repeat(lambda: decode_frame(line, channel), number=number, repeat=3)) / number
+        new_b = min(timeit.repeat(lambda: decode_frame(raw, channel), number=number, repeat=3)) / number
+        bin_t = min(timeit.repeat(lambda: decode_binary_frame(binary, channel), number=number, repeat=3)) / number
+        print(f"{title:<10}{old * 1e9:>14.0f}{new * 1e9:>12.0f}{new_b * 1e9:>14.0f}{old / new:>8.1f}x{bin_t * 1e9:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="帧解码微基准")
+    parser.add_argument("--number", type=int, default=200000, help="每个用例的循环次数")
+    run(parser.parse_args().number)
@@ -0,0 +1,317 @@
+"""
+上位机数据链路基准：逐阶段测量吞吐量和单次耗时分位数，结果可输出为 JSON 便于版本间对比
+
+阶段:
+    decode  - 帧校验与解码（AcquisitionEngine.validate_data_with_checksum）
+    gui     - 界面处理一行数据（MainWindow.on_data_received，offscreen 平台）
+    render  - 折线图重绘一帧（PlotScheduler.render）
+    paint   - 窗口显示时处理一行数据并画出数值（带阴影的 QLabel 和 --light 的 ValueBoard 各测一次）
+    json    - 上传数据的编码（JSON 单条和 50 条一批，列存及列存+zlib 50 条一批），附每条字节数
+    e2e     - 端到端：emulator.py 模拟固件 -> pty 串口 -> ChunkReader -> 采集引擎
+
+运行:
+    python bench_pipeline.py
+    python bench_pipeline.py --stages decode,json --number 50000 --json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+from acquisition import AcquisitionEngine, ChunkReader, Sample
+from frame_decoder import CHANNEL_TEMP_HUMI, CHANNEL_FREQ, calculate_checksum
+from upload_codec import encode_columns, compress
+
+STAGES = ("decode", "gui", "render", "paint", "json", "e2e")
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def make_frame(data):
+    return f"{data} CHECKSUM:{calculate_checksum(data)}"
+
+
+def make_lines(count, seed, channel=CHANNEL_TEMP_HUMI, bad_ratio=0.05):
+    """生成可复现的数据行，其中 bad_ratio 比例为校验错误的帧"""
+    rnd = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        if channel == CHANNEL_TEMP_HUMI:
+            data = f"T:{rnd.randint(15, 35)} H:{rnd.randint(30, 80)}"
+        else:
+            data = f"FREQ:{rnd.randint(500, 5000)}"
+        line = make_frame(data)
+        if rnd.random() < bad_ratio:
+            line = f"{data} CHECKSUM:{calculate_checksum(data) + 1}"
+        lines.append(line)
+    return lines
+
+
+def summarize(stage, durations_ns, items=None, elapsed=None, **extra):
+    """
+    durations_ns - 每次操作的耗时（纳秒）
+    items/elapsed - 吞吐量按 items / elapsed 计算，默认用操作次数和耗时总和
+    """
+    durations = np.asarray(durations_ns, dtype=np.float64) / 1000.0
+    if items is None:
+        items = len(durations)
+    if elapsed is None:
+        elapsed = durations.sum() / 1e6
+    result = {
+        "stage": stage,
+        "count": int(items),
+        "elapsed_s": round(float(elapsed), 6),
+        "throughput_per_s": round(items / elapsed, 1) if elapsed else None,
+        "latency_us": {
+            f"p{p:g}": round(float(np.percentile(durations, p)), 3) for p in PERCENTILES
+        } if len(durations) else {},
+    }
+    if len(durations):
+        result["latency_us"]["mean"] = round(float(durations.mean()), 3)
+        result["latency_us"]["max"] = round(float(durations.max()), 3)
+    result.update(extra)
+    return result
+
+
+def timed_loop(func, args_list):
+    """逐次调用 func(arg) 并记录每次耗时"""
+    clock = time.perf_counter_ns
+    durations = np.empty(len(args_list), dtype=np.int64)
+    for i, arg in enumerate(args_list):
+        start = clock()
+        func(arg)
+        durations[i] = clock() - start
+    return durations
+
+
+class NullSerial:
+    """吞掉所有写入的串口替身，用于不关心回发的阶段"""
+    is_open = True
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+# ---------- 各阶段 ----------
+def bench_decode(args):
+    results = []
+    for channel, name in ((CHANNEL_TEMP_HUMI, "decode_temp_humi"), (CHANNEL_FREQ, "decode_freq")):
+        engine = AcquisitionEngine(channel=channel)
+        lines = make_lines(args.number, args.seed, channel)
+        timed_loop(engine.validate_data_with_checksum, lines[:1000])  # 预热
+        results.append(summarize(name, timed_loop(engine.validate_data_with_checksum, lines)))
+    return results
+
+
+_app = None
+
+
+def _main_window(**options):
+    """offscreen 平台下创建主窗口（不记录、不上传）"""
+    global _app
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    import upper_com_qt
+    if _app is None:
+        _app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = upper_com_qt.MainWindow(record_dir="", **options)
+    window.create_plot()  # 不进入事件循环，直接创建折线图
+    window.ser = NullSerial()
+    window.engine.ser = window.ser
+    return window
+
+
+def bench_gui(args):
+    window = _main_window()
+    lines = make_lines(args.number, args.seed)
+    timed_loop(window.on_data_received, lines[:1000])
+    durations = timed_loop(window.on_data_received, lines)
+    # 日志窗口和折线图由定时器刷新，不计入单行处理时间
+    window.text_area.flush()
+    window.close()
+    return [summarize("gui_on_data_received", durations)]
+
+
+def bench_render(args):
+    window = _main_window()
+    for line in make_lines(window.plot_scheduler.window * 2, args.seed):
+        window.on_data_received(line)
+    window.text_area.flush()
+    scheduler = window.plot_scheduler
+    frames = max(1, args.number // 100)
+
+    def render(_):
+        scheduler.mark_dirty("temp")
+        scheduler.mark_dirty("humi")
+        scheduler.render()
+    durations = timed_loop(render, range(frames))
+    window.close()
+    return [summarize("render_frame", durations, plot_points=scheduler.window)]
+
+
+def bench_paint(args):
+    results = []
+    lines = make_lines(min(args.number, 5000), args.seed)
+    for name, lightweight in (("paint_labels", False), ("paint_light", True)):
+        window = _main_window(lightweight=lightweight)
+        window.change_channel(0)
+        window.show()
+        window.plot_scheduler.timer.stop()  # 只测数值显示，折线图由 render 阶段单独测量
+        window.text_area.flush_timer.stop()
+
+        def process(line):
+            window.on_data_received(line)
+            _app.processEvents()  # 画出本次 update() 请求的区域
+        timed_loop(process, lines[:200])
+        durations = timed_loop(process, lines)
+        window.close()
+        results.append(summarize(name, durations))
+    return results
+
+
+def bench_json(args):
+    rnd = random.Random(args.seed)
+    samples = [Sample(CHANNEL_TEMP_HUMI, (rnd.randint(15, 35), rnd.randint(30, 80)), 1700000000000 + i)
+               for i in range(args.number)]
+    payloads = [s.to_server_data() for s in samples]
+    single = timed_loop(json.dumps, payloads)
+    batches = [payloads[i:i + 50] for i in range(0, len(payloads) - 49, 50)]
+    batched = timed_loop(json.dumps, batches)
+    columns = timed_loop(encode_columns, batches)
+    compressed = timed_loop(lambda batch: compress(encode_columns(batch), "zlib"), batches)
+
+    def bytes_per_sample(encode):
+        return round(sum(len(encode(batch)) for batch in batches) / (len(batches) * 50), 2)
+    return [
+        summarize("json_single", single),
+        summarize("json_batch50", batched, items=len(batches) * 50, batch_size=50,
+                  bytes_per_sample=bytes_per_sample(lambda batch: json.dumps(batch).encode())),
+        summarize("columns_batch50", columns, items=len(batches) * 50, batch_size=50,
+                  bytes_per_sample=bytes_per_sample(encode_columns)),
+        summarize("columns_zlib_batch50", compressed, items=len(batches) * 50, batch_size=50,
+                  bytes_per_sample=bytes_per_sample(lambda batch: compress(encode_columns(batch), "zlib")[0])),
+    ]
+
+
+def bench_e2e(args):
+    """
+    端到端吞吐量和时延：模拟器记录每帧写入发送缓冲的时刻，
+    采集引擎产出对应采样时记录接收时刻，两者之差即为时延（同一进程，单调时钟）
+    """
+    import serial
+    from emulator import FirmwareEmulator
+
+    send_times = []
+
+    class TimedEmulator(FirmwareEmulator):
+        def next_frame(self):
+            send_times.append(time.perf_counter_ns())
+            return super().next_frame()
+
+    emulator = TimedEmulator(rate=args.rate, seed=args.seed, boot_messages=False).start()
+    ser = serial.Serial(emulator.slave_path, 115200, timeout=0.1)
+    engine = AcquisitionEngine(ser)
+    receive_times = []
+
+    def on_event(event, payload):
+        if event == "sample":
+            receive_times.append(time.perf_counter_ns())
+    engine.subscribe(on_event)
+    reader = ChunkReader(ser, engine.process_lines)
+    thread = threading.Thread(target=reader.run, daemon=True)
+    thread.start()
+
+    engine.start_collect()
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    engine.stop_collect()
+    time.sleep(0.2)  # 等最后的数据到达
+    elapsed = time.perf_counter() - started
+    reader.stop()
+    thread.join()
+    ser.close()
+    stats = emulator.stats()
+    emulator.close()
+
+    count = min(len(send_times), len(receive_times))
+    latencies = np.asarray(receive_times[:count]) - np.asarray(send_times[:count])
+    return [summarize("e2e_loopback", latencies, items=len(receive_times), elapsed=elapsed,
+                      target_rate=args.rate, frames_sent=stats["frames_sent"],
+                      frames_dropped=stats["frames_dropped"], echo_ok=stats["echo_ok"])]
+
+
+BENCHES = {
+    "decode": bench_decode,
+    "gui": bench_gui,
+    "render": bench_render,
+    "paint": bench_paint,
+    "json": bench_json,
+    "e2e": bench_e2e,
+}
+
+
+def run(args):
+    results = []
+    for stage in args.stages:
+        results.extend(BENCHES[stage](args))
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "number": args.number,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def print_table(report):
+    print(f"{'阶段':<22}{'次数':>9}{'吞吐量/s':>13}" + "".join(f"{'p%g us' % p:>11}" for p in PERCENTILES))
+    for r in report["results"]:
+        latency = r["latency_us"]
+        print(f"{r['stage']:<22}{r['count']:>9}{r['throughput_per_s'] or 0:>13.0f}"
+              + "".join(f"{latency.get(f'p{p:g}', 0):>11.2f}" for p in PERCENTILES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上位机数据链路基准")
+    parser.add_argument("--stages", default=",".join(STAGES), help="要运行的阶段，逗号分隔: " + ",".join(STAGES))
+    parser.add_argument("--number", type=int, default=20000, help="decode/gui/json 阶段的操作次数")
+    parser.add_argument("--seed", type=int, default=1, help="生成测试数据的随机数种子")
+    parser.add_argument("--rate", type=float, default=5000, help="e2e 阶段模拟器每秒发送的帧数")
+    parser.add_argument("--duration", type=float, default=3.0, help="e2e 阶段持续时间（秒）")
+    parser.add_argument("--json", help="把结果写入该 JSON 文件，- 表示输出到标准输出")
+    args = parser.parse_args()
+    args.stages = [s for s in args.stages.split(",") if s]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(sorted(unknown))}")
+
+    report = run(args)
+    if args.json == "-":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    print_table(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+启动时间基准：每次在新进程中测量上位机和无界面采集程序的启动耗时
+
+阶段（毫秒，从子进程开始执行本脚本算起）:
+    gui_import       - 导入 upper_com_qt
+    gui_first_paint  - 创建 MainWindow 并画出第一帧（offscreen 平台），即窗口可交互
+    gui_ready        - 折线图、背景图和串口列表都已就绪
+    collector_import - 导入 collector
+
+运行:
+    python bench_startup.py [--runs 10] [--json results.json]
+    python bench_startup.py --max-first-paint-ms 400   # 中位数超出预算时返回 1，可放进 CI
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_T0 = time.perf_counter()
+
+READY_TIMEOUT = 10.0  # 等待折线图和串口列表就绪的最长时间（秒）
+
+
+def _ms(t):
+    return round((t - _T0) * 1000, 3)
+
+
+def child_gui():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import upper_com_qt
+    from PyQt5.QtCore import QObject, QEvent
+    from PyQt5.QtWidgets import QApplication
+    result = {"gui_import": _ms(time.perf_counter())}
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "gui_first_paint" not in result:
+                result["gui_first_paint"] = _ms(time.perf_counter())
+            return False
+
+    app = QApplication(sys.argv[:1])
+    window = upper_com_qt.MainWindow(record_dir="")
+    watcher = FirstPaint()
+    window.installEventFilter(watcher)
+    window.show()
+    deadline = time.perf_counter() + READY_TIMEOUT
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        if window.plot_widget is not None and window.refresh_btn.isEnabled() and "gui_first_paint" in result:
+            result["gui_ready"] = _ms(time.perf_counter())
+            break
+        time.sleep(0.001)
+    window.close()
+    return result
+
+
+def child_collector():
+    import collector  # noqa: F401
+    return {"collector_import": _ms(time.perf_counter())}
+
+
+CHILDREN = {
+    "gui": child_gui,
+    "collector": child_collector,
+}
+
+
+def run_child(name):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", name]
+    output = subprocess.run(cmd, check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(name, values):
+    return {
+        "stage": name,
+        "runs": len(values),
+        "median_ms": round(statistics.median(values), 3),
+        "min_ms": round(min(values), 3),
+        "max_ms": round(max(values), 3),
+    }
+
+
+def run(args):
+    samples = {}
+    for _ in range(args.runs):
+        for name in args.targets.split(","):
+            for stage, value in run_child(name).items():
+                samples.setdefault(stage, []).append(value)
+    results = [summarize(stage, values) for stage, values in samples.items()]
+    print(f"{'阶段':<20}{'次数':>6}{'中位数 ms':>12}{'最小 ms':>10}{'最大 ms':>10}")
+    for r in results:
+        print(f"{r['stage']:<20}{r['runs']:>6}{r['median_ms']:>12.1f}{r['min_ms']:>10.1f}{r['max_ms']:>10.1f}")
+    if args.json:
+        payload = {"timestamp": int(time.time()), "python": sys.version.split()[0], "results": results}
+        if args.json == "-":
+            print(json.dumps(payload, ensure_ascii=False, indent=2))
+        else:
+            with open(args.json, "w", encoding="utf-8") as fp:
+                json.dump(payload, fp, ensure_ascii=False, indent=2)
+    if args.max_first_paint_ms is not None:
+        paint = next((r for r in results if r["stage"] == "gui_first_paint"), None)
+        if paint is not None and paint["median_ms"] > args.max_first_paint_ms:
+            print(f"❌ 首帧耗时 {paint['median_ms']:.1f} ms 超出预算 {args.max_first_paint_ms} ms")
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动时间基准")
+    parser.add_argument("--runs", type=int, default=10, help="每个目标启动的次数")
+    parser.add_argument("--targets", default="gui,collector", help="测量的程序，逗号分隔: " + ",".join(CHILDREN))
+    parser.add_argument("--json", help="把结果写入 JSON 文件，- 表示标准输出")
+    parser.add_argument("--max-first-paint-ms", type=float, help="gui_first_paint 中位数的预算，超出时返回 1")
+    parser.add_argument("--child", choices=list(CHILDREN), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(CHILDREN[args.child]()))
+        return 0
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
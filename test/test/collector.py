@@ -0,0 +1,263 @@
+"""
+无界面采集程序：在网关等没有显示器的机器上运行采集引擎
+
+示例:
+    python collector.py --port /dev/ttyUSB0 --channel temp --start
+    python collector.py --port /dev/ttyUSB0 --channel dual --start   # 温湿度和频率交替采集
+    python collector.py --port COM2 --channel freq --upload --freq-range 0 6000
+    python collector.py --port /dev/ttyUSB0 --port /dev/ttyUSB1 --start
+    python collector.py --config ports.json --start
+    python collector.py --port /dev/ttyUSB0 --start --upload --rollup 10 60 3600 --rollup-only
+    python collector.py --port /dev/ttyUSB0 --start --upload --upload-format auto --upload-compression zlib
+    python collector.py --port /dev/ttyUSB0 --start --stream-port 8090   # curl -N http://127.0.0.1:8090/stream
+
+多串口配置文件格式（未写的字段使用命令行参数）:
+    [
+        {"port": "/dev/ttyUSB0", "channel": "temp", "thresholds": {"temp": [0, 40]}},
+        {"port": "/dev/ttyUSB1", "channel": "freq", "baud": 9600, "binary_baud": 57600},
+        {"port": "/dev/ttyUSB2", "channel": "dual"}
+    ]
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+
+from acquisition import CHANNEL_TEMP_HUMI, CHANNEL_FREQ, CHANNEL_DUAL, DEFAULT_THRESHOLDS
+from frame_decoder import BINARY_BAUD_CODES
+from multiport import MultiPortCollector
+from alarms import AlarmEngine, RULES
+from uploader import Uploader, OVERFLOW_POLICIES, OVERFLOW_DROP_OLDEST
+from upload_codec import WIRE_FORMATS, WIRE_JSON, COMPRESSIONS
+from recorder import Recorder
+from latency import LatencyTracker, LatencyReporter, LatencyEndpoint
+from aggregator import RollingAggregator, format_rollup
+from link_stats import format_link_stats
+
+SERVER_URL = "http://data.cancanjiao.xyz/data"
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+CHANNEL_NAMES = {"temp": CHANNEL_TEMP_HUMI, "freq": CHANNEL_FREQ, "dual": CHANNEL_DUAL}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="温湿度/频率无界面采集程序")
+    parser.add_argument("--port", action="append", default=[], help="串口号，如 COM2 或 /dev/ttyUSB0，可重复指定多个")
+    parser.add_argument("--config", help="多串口JSON配置文件")
+    parser.add_argument("--baud", type=int, default=9600, help="波特率")
+    parser.add_argument("--channel", choices=list(CHANNEL_NAMES), default="temp",
+                        help="采集通道，dual 为温湿度和频率交替采集")
+    parser.add_argument("--binary-baud", type=int, choices=sorted(BINARY_BAUD_CODES),
+                        help="打开串口后协商二进制帧并切换到该波特率，旧固件不支持时继续使用文本帧")
+    parser.add_argument("--start", action="store_true", help="打开串口后立即发送启动命令")
+    parser.add_argument("--upload", action="store_true", help="上传数据到服务器")
+    parser.add_argument("--server-url", default=SERVER_URL, help="服务器地址")
+    parser.add_argument("--batch-size", type=int, default=50, help="每次上传最多携带的采样数")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="不足一批时最长等待时间（秒）")
+    parser.add_argument("--max-queue", type=int, default=10000, help="上传队列上限")
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default=OVERFLOW_DROP_OLDEST,
+                        help="上传队列满时的策略")
+    parser.add_argument("--upload-format", choices=WIRE_FORMATS, default=WIRE_JSON,
+                        help="上传编码：json、columns（列存差分编码）或 auto（服务器不支持列存时退回 JSON）")
+    parser.add_argument("--upload-compression", choices=list(COMPRESSIONS), default="none",
+                        help="上传请求体压缩方式")
+    parser.add_argument("--spool", help="落盘缓冲文件路径，断网或退出时数据写入该文件，恢复后补发")
+    parser.add_argument("--max-spool", type=int, default=1000000, help="落盘缓冲最多保存的采样数")
+    parser.add_argument("--replay-rate", type=float, default=200, help="补发积压数据时每秒最多发送的采样数，0为不限速")
+    parser.add_argument("--max-backoff", type=float, default=60.0, help="连续上传失败时最长重试间隔（秒）")
+    parser.add_argument("--rollup", nargs="+", type=float, metavar="SECONDS",
+                        help="按这些窗口长度（秒）计算最小/最大/均值/标准差/分位数汇总，写入日志并上传")
+    parser.add_argument("--rollup-only", action="store_true", help="只上传汇总，不上传原始采样（需要 --rollup）")
+    parser.add_argument("--record-dir", help="本地记录目录（按天分目录的二进制列存）")
+    parser.add_argument("--latency-file", help="每秒把逐帧时延统计写入该 JSON 文件")
+    parser.add_argument("--latency-port", type=int, help="在该端口提供 GET /latency 时延统计接口")
+    parser.add_argument("--stream-port", type=int, help="在该端口提供 GET /stream 实时数据流（server-sent events）")
+    parser.add_argument("--stream-host", default="127.0.0.1", help="实时数据流监听地址，0.0.0.0 允许其他机器订阅")
+    parser.add_argument("--link-interval", type=float, default=60.0,
+                        help="每隔多少秒记录一次链路质量（丢帧、坏帧统计），0 为只在退出时记录")
+    parser.add_argument("--log-level", choices=list(LOG_LEVELS), default="info",
+                        help="日志级别，debug 会打印每一行原始数据和每个采样的校验结果")
+    for name, title in (("temp", "温度"), ("humi", "湿度"), ("freq", "频率")):
+        parser.add_argument(f"--{name}-range", nargs=2, type=float, metavar=("MIN", "MAX"),
+                            default=DEFAULT_THRESHOLDS[name], help=f"{title}报警范围")
+        parser.add_argument(f"--{name}-hysteresis", type=float, default=0.0,
+                            help=f"{title}报警回差，回到范围内超过该值才解除报警")
+    parser.add_argument("--alarm-dwell", type=float, default=0.0, help="报警/解除前状态至少持续的秒数")
+    parser.add_argument("--ack-timeout", type=float, default=1.0, help="等待下位机确认回发的超时（秒）")
+    parser.add_argument("--echo-retries", type=int, default=1, help="回发校验出错或超时后的重发次数")
+    return parser
+
+
+def load_port_configs(args):
+    """合并命令行和配置文件，得到每个串口的配置"""
+    configs = [{"port": port} for port in args.port]
+    if args.config:
+        with open(args.config, encoding="utf-8") as fp:
+            configs.extend(json.load(fp))
+    for config in configs:
+        config.setdefault("baud", args.baud)
+        config.setdefault("channel", args.channel)
+        config.setdefault("binary_baud", args.binary_baud)
+        thresholds = {name: tuple(getattr(args, f"{name}_range")) for name in ("temp", "humi", "freq")}
+        thresholds.update(config.get("thresholds", {}))
+        config["thresholds"] = thresholds
+    return configs
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    configs = load_port_configs(args)
+    if not configs:
+        parser.error("至少需要 --port 或 --config")
+    if args.rollup_only and not args.rollup:
+        parser.error("--rollup-only 需要同时指定 --rollup")
+
+    log_level = LOG_LEVELS[args.log_level]
+
+    def log(message, level=logging.INFO):
+        if level >= log_level:
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {logging.getLevelName(level):<7} {message}", flush=True)
+
+    # 先打开串口，一个都打不开时直接退出，不启动上传线程和各个服务
+    latency = LatencyTracker() if args.latency_file or args.latency_port is not None else None
+    alarms = AlarmEngine(
+        hysteresis={rule.name: getattr(args, f"{rule.name}_hysteresis") for rule in RULES},
+        dwell={rule.name: args.alarm_dwell for rule in RULES},
+    )
+    writer_options = {"ack_timeout": args.ack_timeout, "max_retries": args.echo_retries, "latency": latency}
+    collector = MultiPortCollector(alarms=alarms, writer_options=writer_options)
+    opened = []
+    for config in configs:
+        channel = CHANNEL_NAMES[config["channel"]]
+        try:
+            engine = collector.add_port(config["port"], config["baud"], channel, config["thresholds"])
+        except Exception as e:
+            log(f"❌ 打开串口失败: {config['port']}: {e}", logging.ERROR)
+            continue
+        opened.append((config, engine))
+    if not collector.channels:
+        return 1
+
+    reporter = endpoint = None
+    if latency is not None:
+        if args.latency_file:
+            reporter = LatencyReporter(latency, args.latency_file).start()
+        if args.latency_port is not None:
+            endpoint = LatencyEndpoint(latency, port=args.latency_port).start()
+            log(f"时延统计接口: {endpoint.url}")
+
+    stream = None
+    if args.stream_port is not None:
+        from live_stream import LiveStreamServer  # 只在启用数据流时导入（asyncio），缩短启动时间
+        stream = LiveStreamServer(args.stream_host, args.stream_port).start()
+        log(f"实时数据流: {stream.url}")
+
+    uploader = None
+    if args.upload:
+        uploader = Uploader(args.server_url, log=log, batch_size=args.batch_size,
+                            flush_interval=args.flush_interval, max_queue=args.max_queue,
+                            overflow=args.overflow, max_backoff=args.max_backoff, spool_path=args.spool,
+                            max_spool=args.max_spool, replay_rate=args.replay_rate, latency=latency,
+                            wire=args.upload_format, compression=args.upload_compression)
+        upload_thread = threading.Thread(target=uploader.run, name="uploader")
+        upload_thread.start()
+
+    def make_subscriber(name):
+        prefix = f"[{name}] " if len(configs) > 1 else ""
+
+        def on_event(event, payload):
+            if event == "line":
+                log(prefix + payload, logging.DEBUG)
+            elif event == "log":
+                level, message = payload
+                log(prefix + message, level)
+            elif event == "upload" and uploader:
+                uploader.send_data(payload.to_server_data(), payload.received)
+        return on_event
+
+    recorder = Recorder(args.record_dir) if args.record_dir else None
+
+    aggregator = None
+    if args.rollup:
+        def on_rollup(rollup):
+            log(format_rollup(rollup))
+            if stream:
+                stream.publish(rollup)
+            if uploader:
+                uploader.send_data(rollup)
+        aggregator = RollingAggregator(args.rollup, on_rollup=on_rollup)
+
+    for config, engine in opened:
+        engine.subscribe(make_subscriber(config["port"]))
+        engine.latency = latency
+        if recorder:
+            engine.subscribe(recorder)
+        if aggregator:
+            engine.subscribe(aggregator)
+        if stream:
+            engine.subscribe(stream)
+        engine.upload_enabled = uploader is not None and not args.rollup_only
+        log(f"串口已打开: {config['port']}")
+        engine.send_channel_cmd()
+        if config["binary_baud"] is not None:
+            engine.request_binary(config["binary_baud"])
+        if args.start:
+            engine.start_collect()
+
+    def log_link():
+        for engine in collector.engines:
+            log(format_link_stats(engine.link_stats(), engine.name))
+
+    try:
+        if aggregator or args.link_interval > 0:
+            # 每轮事件循环（最长 1 秒）检查一次过期的窗口和链路统计，串口没有数据时也能按时产出
+            next_link = time.monotonic() + args.link_interval
+            while collector.running and collector.channels:
+                collector.run_once()
+                if aggregator:
+                    aggregator.poll()
+                if args.link_interval > 0 and time.monotonic() >= next_link:
+                    next_link = time.monotonic() + args.link_interval
+                    log_link()
+        else:
+            collector.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.start:
+            for engine in collector.engines:
+                engine.stop_collect()
+        for port_channel in collector.channels.values():
+            if port_channel.writer is not None:
+                log(f"[{port_channel.name}] 串口发送统计: "
+                    + ", ".join(f"{k}={v}" for k, v in port_channel.writer.stats().items()))
+        log_link()
+        collector.close()
+        if aggregator:
+            aggregator.flush()
+        if recorder:
+            recorder.close()
+        if uploader:
+            uploader.stop()
+            upload_thread.join()
+            log("上传统计: " + ", ".join(f"{k}={v}" for k, v in uploader.stats().items()))
+        if stream:
+            stream.stop()
+            log("实时数据流统计: " + ", ".join(f"{k}={v}" for k, v in stream.stats().items()))
+        if reporter:
+            reporter.stop()
+        if endpoint:
+            endpoint.stop()
+        log("串口已关闭")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
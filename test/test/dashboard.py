@@ -0,0 +1,147 @@
+"""
+轻量仪表盘：用一个自绘控件显示温湿度/频率及减半值，替代逐个带阴影效果的 QLabel
+
+QGraphicsDropShadowEffect 会让标签每次 setText 都先画到离屏缓冲再合成，
+低配工控机上六个标签逐帧刷新就占去大半个核。这里文字用 QStaticText 缓存排版结果，
+阴影直接偏移一像素再画一遍，并且只有数值变化的格子才请求重绘。
+"""
+from PyQt5.QtCore import QPointF, QRect, Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QStaticText
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+TEXT_COLOR = QColor(255, 255, 255)
+SHADOW_COLOR = QColor(0, 0, 0)
+SHADOW_OFFSET = QPointF(1, 1)
+CELL_SPACING = 12      # 同一组相邻格子的间距（像素）
+RESERVED_VALUE = "888"  # 按该数值预留格子宽度，数值在此宽度内变化时格子位置不动
+
+
+class Cell:
+    """一个数值格子，template 形如 "温度: {} ℃\""""
+
+    def __init__(self, key, template, placeholder="--"):
+        self.key = key
+        self.template = template
+        self.text = template.format(placeholder)
+        self.static = QStaticText(self.text)
+        self.static.setTextFormat(Qt.PlainText)
+        self.rect = QRect()
+        self.align_right = False
+
+
+class ValueBoard(QWidget):
+    """
+    自绘数值面板
+
+    rows 为 {通道: (左侧格子, 右侧格子)}，格子写作 (键, 模板)。
+    只显示当前通道的一行（双通道时用 set_channels 显示多行）：
+    左侧一组靠左排列，右侧一组靠右排列，和原来的标签布局一致。
+    set_value 在文字没变时什么也不做，变了也只重绘该格子；repaints 统计实际重绘的格子数。
+    """
+
+    def __init__(self, rows, font_size=16, parent=None):
+        super().__init__(parent)
+        self.text_font = QFont()
+        self.text_font.setFamilies(["Microsoft YaHei", "微软雅黑", "sans-serif"])
+        self.text_font.setPixelSize(font_size)
+        self.text_font.setBold(True)
+        self.metrics = QFontMetrics(self.text_font)
+        self.rows = {}
+        self.cells = {}
+        for channel, (left, right) in rows.items():
+            left = [Cell(*spec) for spec in left]
+            right = [Cell(*spec) for spec in right]
+            for cell in right:
+                cell.align_right = True
+            self.rows[channel] = (left, right)
+            for cell in left + right:
+                cell.static.prepare(font=self.text_font)
+                self.cells[cell.key] = cell
+        self.channels = (next(iter(self.rows)),)
+        self.row_height = self.metrics.height() + 8
+        self.repaints = 0
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setFixedHeight(self.row_height)
+
+    def visible_cells(self):
+        cells = []
+        for channel in self.channels:
+            left, right = self.rows[channel]
+            cells += left + right
+        return cells
+
+    def set_channel(self, channel):
+        self.set_channels((channel,))
+
+    def set_channels(self, channels):
+        """按顺序每个通道显示一行"""
+        channels = tuple(channels)
+        if channels != self.channels:
+            self.channels = channels
+            self.setFixedHeight(self.row_height * len(channels))
+            self.layout_cells()
+            self.update()
+
+    def set_value(self, key, value):
+        cell = self.cells[key]
+        text = cell.template.format(value)
+        if text == cell.text:
+            return
+        cell.text = text
+        cell.static.setText(text)
+        cell.static.prepare(font=self.text_font)
+        if cell not in self.visible_cells():
+            return
+        if self.cell_width(cell) > cell.rect.width():
+            # 数值变宽超出预留宽度，整行重新排布
+            self.layout_cells()
+            self.update()
+        else:
+            self.update(cell.rect)
+
+    def set_values(self, **values):
+        for key, value in values.items():
+            self.set_value(key, value)
+
+    def cell_width(self, cell):
+        reserved = self.metrics.horizontalAdvance(cell.template.format(RESERVED_VALUE))
+        return max(reserved, self.metrics.horizontalAdvance(cell.text)) + int(SHADOW_OFFSET.x())
+
+    def layout_cells(self):
+        for row, channel in enumerate(self.channels):
+            left, right = self.rows[channel]
+            y = row * self.row_height
+            x = 0
+            for cell in left:
+                width = self.cell_width(cell)
+                cell.rect = QRect(x, y, width, self.row_height)
+                x += width + CELL_SPACING
+            x = self.width()
+            for cell in reversed(right):
+                width = self.cell_width(cell)
+                x -= width
+                cell.rect = QRect(x, y, width, self.row_height)
+                x -= CELL_SPACING
+
+    def resizeEvent(self, event):
+        self.layout_cells()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setFont(self.text_font)
+        region = event.region()
+        for cell in self.visible_cells():
+            if not region.intersects(cell.rect):
+                continue
+            self.repaints += 1
+            size = cell.static.size()
+            x = cell.rect.left()
+            if cell.align_right:
+                x = cell.rect.right() + 1 - size.width() - SHADOW_OFFSET.x()
+            pos = QPointF(x, cell.rect.top() + (cell.rect.height() - size.height()) / 2)
+            painter.setPen(SHADOW_COLOR)
+            painter.drawStaticText(pos + SHADOW_OFFSET, cell.static)
+            painter.setPen(TEXT_COLOR)
+            painter.drawStaticText(pos, cell.static)
+        painter.end()
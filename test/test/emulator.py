@@ -0,0 +1,413 @@
+"""
+单片机固件模拟器：在 pty 伪终端上模拟 main.c 的串口协议，用于在没有 Proteus 的机器上联调和压测上位机
+
+支持的协议:
+    CMD:S / CMD:E          - 开始/停止采集
+    CMD:A / CMD:B          - 切换到温湿度/频率通道
+    CMD:D                  - 双通道：温湿度帧和频率帧交替发送
+    CMD:X/Y/Z, CMD:x/y/z   - 报警/解除报警，回复 "TEMPER ALARM" 等
+    CMD:F<代码> / CMD:T    - 切换到二进制帧/文本帧，回复 "[DEBUG] FORMAT BIN/TEXT <波特率>"
+                             （pty 没有真实波特率，只记录协商结果）
+    "<数据> CHECKSUM:<和>"  - 回发的减半值，回复 "[DEBUG] CHECKSUM OK/ERROR" 和 DAC 调试信息
+    采集中按 rate 帧/秒发送 "T:%u H:%u SEQ:%u CHECKSUM:%u" 或 "FREQ:%u SEQ:%u CHECKSUM:%u"，
+    二进制模式下发送 frame_decoder 中定义的 9 字节帧；帧序号两种格式共用，CMD:S 和 CMD:F 时清零
+
+示例:
+    python emulator.py --rate 1000 --corrupt 0.01
+    python emulator.py --rate 100 --corrupt 0.05 --corrupt-kinds drop   # 只丢帧，检验链路统计
+    python upper_com_qt.py          # 在串口列表中选择模拟器打印的 /dev/pts/N
+    python collector.py --port /dev/pts/N --channel temp --start
+"""
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from frame_decoder import (
+    CHANNEL_TEMP_HUMI, CHANNEL_FREQ, CHANNEL_DUAL, CHECKSUM_SEP, calculate_checksum,
+    encode_binary_frame, BINARY_BAUD_CODES, FORMAT_ACK_PREFIX,
+)
+
+NUM_BUF_SIZE = 24     # 与固件 num_buf 大小一致，超长的行被截断
+MAX_OUTPUT = 1 << 20  # 上位机不读取时最多积压的输出字节数，超出后丢帧
+
+BOOT_MESSAGES = [
+    "[DEBUG] UART_Init",
+    "[DEBUG] LCD_Init",
+    "[DEBUG] Timer0_Init",
+    "[DEBUG] INT0_Init",
+    "[DEBUG] Init Done",
+]
+
+ALARM_REPLIES = {
+    "X": "TEMPER ALARM",
+    "Y": "HUMI ALARM",
+    "Z": "FREQ ALARM",
+    "x": "TEMPER NORMAL",
+    "y": "HUMI NORMAL",
+    "z": "FREQ NORMAL",
+}
+
+# 注入的错误类型
+CORRUPT_CHECKSUM = "checksum"  # 校验和错误（二进制帧为 CRC 错误）
+CORRUPT_GARBLE = "garble"      # 数据中某个字符（字节）被替换
+CORRUPT_TRUNCATE = "truncate"  # 行（帧）被截断
+CORRUPT_DHT_FAIL = "dht_fail"  # 温湿度通道读传感器失败（不占用帧序号）
+CORRUPT_DROP = "drop"          # 整帧在线路上丢失（已占用帧序号）
+CORRUPT_KINDS = (CORRUPT_CHECKSUM, CORRUPT_GARBLE, CORRUPT_TRUNCATE, CORRUPT_DHT_FAIL, CORRUPT_DROP)
+DHT_FAIL_LINES = "[DEBUG] DHT11 FAIL\r\nDHT11 FAIL"
+
+
+def _leading_int(text):
+    """模拟 atoi/sscanf("%d")：解析开头的整数，失败返回 0"""
+    text = text.lstrip()
+    end = 0
+    if text[:1] in ("-", "+"):
+        end = 1
+    while end < len(text) and text[end].isdigit():
+        end += 1
+    try:
+        return int(text[:end])
+    except ValueError:
+        return 0
+
+
+class FirmwareEmulator:
+    """
+    固件模拟器，主端（master）由模拟器读写，从端路径（slave_path）交给上位机打开
+
+    rate    - 采集中每秒发送的数据帧数（真实硬件为 1）
+    corrupt - 每帧被注入错误的概率，错误类型从 corrupt_kinds 中随机选取
+    seed    - 随机数种子，便于复现
+    legacy  - 模拟不支持二进制帧的旧固件，忽略 CMD:F / CMD:T / CMD:D，文本帧不带 SEQ
+    """
+    def __init__(self, rate=1.0, corrupt=0.0, corrupt_kinds=CORRUPT_KINDS, seed=None,
+                 channel=CHANNEL_TEMP_HUMI, collecting=False, boot_messages=True, legacy=False):
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        self.rate = rate
+        self.corrupt = corrupt
+        self.corrupt_kinds = tuple(corrupt_kinds)
+        self.random = random.Random(seed)
+        self.channel = channel
+        self.dual_turn = CHANNEL_TEMP_HUMI  # 双通道时下一帧的类型
+        self.collecting = collecting
+        self.legacy = legacy
+        self.binary = False
+        self.baud = 9600
+        self.seq = 0
+        self.running = False
+        self.thread = None
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.slave_path = os.ttyname(self.slave_fd)
+        self.rx = bytearray()
+        self.tx = bytearray()
+        self.lock = threading.Lock()
+        self.temp = 25
+        self.humi = 55
+        self.freq = 1000
+        self.alarms = {"X": False, "Y": False, "Z": False}
+        # 计数器
+        self.frames_sent = 0
+        self.frames_corrupted = 0
+        self.frames_dropped = 0  # 上位机来不及读取而丢弃的帧
+        self.commands = 0
+        self.echo_ok = 0
+        self.echo_error = 0
+        self._epoch = time.monotonic()
+        self._due = 0
+        if boot_messages:
+            for message in BOOT_MESSAGES:
+                self._send(message)
+
+    def stats(self):
+        """计数快照"""
+        with self.lock:
+            return {
+                "frames_sent": self.frames_sent,
+                "frames_corrupted": self.frames_corrupted,
+                "frames_dropped": self.frames_dropped,
+                "commands": self.commands,
+                "echo_ok": self.echo_ok,
+                "echo_error": self.echo_error,
+            }
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = rate
+            self._restart_clock()
+
+    def _restart_clock(self):
+        self._epoch = time.monotonic()
+        self._due = 0
+
+    def _send(self, line):
+        self.tx += line.encode("ascii") + b"\r\n"
+
+    # ---- 接收：模拟 UART_ISR ----
+    def feed(self, data):
+        """处理上位机发来的字节"""
+        for byte in data:
+            if byte in (0x0D, 0x0A):
+                if self.rx:
+                    line = self.rx.decode("ascii", errors="replace")
+                    self.rx.clear()
+                    self.handle_line(line)
+            elif len(self.rx) < NUM_BUF_SIZE - 1:
+                self.rx.append(byte)
+
+    def handle_line(self, line):
+        if line.startswith("CMD:") and len(line) >= 5:
+            self.handle_command(line[4], line[5:])
+            return
+        data, sep, checksum = line.partition(CHECKSUM_SEP)
+        if sep:
+            if _leading_int(checksum) != calculate_checksum(data):
+                with self.lock:
+                    self.echo_error += 1
+                self._send("[DEBUG] CHECKSUM ERROR")
+                return
+            with self.lock:
+                self.echo_ok += 1
+            self._send("[DEBUG] CHECKSUM OK")
+        self._send("HALF VALUE: " + data)
+        self.handle_half(data)
+
+    def handle_command(self, cmd, arg=""):
+        with self.lock:
+            self.commands += 1
+        if cmd == "S":
+            self.collecting = True
+            self.seq = 0
+            self._restart_clock()
+        elif cmd == "E":
+            self.collecting = False
+        elif cmd == "A":
+            self.channel = CHANNEL_TEMP_HUMI
+            self._restart_clock()
+        elif cmd == "B":
+            self.channel = CHANNEL_FREQ
+            self._restart_clock()
+        elif self.legacy and cmd in ("F", "T", "D"):
+            pass
+        elif cmd == "D":
+            self.channel = CHANNEL_DUAL
+            self.dual_turn = CHANNEL_TEMP_HUMI
+            self._restart_clock()
+        elif cmd == "F":
+            bauds = {code: baud for baud, code in BINARY_BAUD_CODES.items()}
+            self.baud = bauds.get(arg[:1], 9600)
+            self.binary = True
+            self.seq = 0
+            self._send(f"{FORMAT_ACK_PREFIX}BIN {self.baud}")
+        elif cmd == "T":
+            self.baud = 9600
+            self.binary = False
+            self._send(f"{FORMAT_ACK_PREFIX}TEXT {self.baud}")
+        elif cmd in ALARM_REPLIES:
+            self.alarms[cmd.upper()] = cmd.isupper()
+            self._send(ALARM_REPLIES[cmd])
+
+    def handle_half(self, data):
+        """模拟 handle_half_value / handle_half_freq 的 DAC 调试输出，双通道时按数值个数区分"""
+        if self.channel == CHANNEL_DUAL:
+            temp_humi = " " in data.strip()
+        else:
+            temp_humi = self.channel == CHANNEL_TEMP_HUMI
+        if temp_humi:
+            parts = data.split(None, 1)
+            t = _leading_int(parts[0]) if parts else 0
+            h = _leading_int(parts[1]) if len(parts) > 1 else 0
+            self._send("[DEBUG] RAW BUF: " + data)
+            self._send(f"[DEBUG] DAC OUT TEMP: {t & 0xFF}")
+            self._send(f"[DEBUG] DAC OUT HUMI: {h & 0xFF}")
+        else:
+            self._send("[DEBUG] RAW FREQ BUF: " + data)
+            self._send(f"[DEBUG] DAC OUT FREQ: {_leading_int(data) & 0xFF}")
+
+    # ---- 发送：模拟主循环 ----
+    def next_frame(self):
+        """
+        生成下一帧（文本帧不含行尾，二进制帧为 bytes），按 corrupt 概率注入错误，
+        返回 (帧, 是否注入了错误)；注入丢帧时帧为 None
+        """
+        kind = self.channel
+        if kind == CHANNEL_DUAL:
+            # 与固件一致：每个采样周期轮流测量一种量，读传感器失败也算一轮
+            kind = self.dual_turn
+            self.dual_turn = CHANNEL_FREQ if kind == CHANNEL_TEMP_HUMI else CHANNEL_TEMP_HUMI
+        line, corrupted = self._next_frame(kind)
+        if line != DHT_FAIL_LINES:
+            # 与固件一致：只有真正发出（或在线路上丢失）的数据帧占用序号
+            self.seq = (self.seq + 1) & 0xFF
+        return line, corrupted
+
+    def _pick_corruption(self, kind):
+        kinds = [k for k in self.corrupt_kinds
+                 if k != CORRUPT_DHT_FAIL or kind == CHANNEL_TEMP_HUMI]
+        return self.random.choice(kinds) if kinds else CORRUPT_CHECKSUM
+
+    def _next_frame(self, kind):
+        rnd = self.random
+        if kind == CHANNEL_TEMP_HUMI:
+            self.temp = min(50, max(0, self.temp + rnd.randint(-1, 1)))
+            self.humi = min(95, max(20, self.humi + rnd.randint(-2, 2)))
+            data = f"T:{self.temp} H:{self.humi}"
+            values = (self.temp, self.humi)
+        else:
+            self.freq = min(9000, max(100, self.freq + rnd.randint(-20, 20)))
+            data = f"FREQ:{self.freq}"
+            values = (self.freq,)
+        if self.binary:
+            frame = encode_binary_frame(kind, values, self.seq)
+            return self._corrupt_binary(frame, kind)
+        if not self.legacy:
+            data += f" SEQ:{self.seq}"
+        checksum = calculate_checksum(data)
+        if not (self.corrupt and rnd.random() < self.corrupt):
+            return f"{data}{CHECKSUM_SEP}{checksum}", False
+        corruption = self._pick_corruption(kind)
+        if corruption == CORRUPT_DHT_FAIL:
+            return DHT_FAIL_LINES, True
+        if corruption == CORRUPT_DROP:
+            return None, True
+        line = f"{data}{CHECKSUM_SEP}{checksum}"
+        if corruption == CORRUPT_CHECKSUM:
+            line = f"{data}{CHECKSUM_SEP}{checksum + rnd.randint(1, 9)}"
+        elif corruption == CORRUPT_GARBLE:
+            pos = rnd.randrange(len(data))
+            line = line[:pos] + rnd.choice("?#x ") + line[pos + 1:]
+        elif corruption == CORRUPT_TRUNCATE:
+            line = line[:rnd.randrange(1, len(line))]
+        return line, True
+
+    def _corrupt_binary(self, frame, kind):
+        rnd = self.random
+        if not (self.corrupt and rnd.random() < self.corrupt):
+            return frame, False
+        corruption = self._pick_corruption(kind)
+        if corruption == CORRUPT_DHT_FAIL:
+            return DHT_FAIL_LINES, True
+        if corruption == CORRUPT_DROP:
+            return None, True
+        frame = bytearray(frame)
+        if corruption == CORRUPT_CHECKSUM:
+            frame[-1] ^= 1 << rnd.randrange(8)
+        elif corruption == CORRUPT_GARBLE:
+            frame[rnd.randrange(3, 7)] ^= 1 << rnd.randrange(8)
+        elif corruption == CORRUPT_TRUNCATE:
+            del frame[rnd.randrange(1, len(frame)):]
+        return bytes(frame), True
+
+    def emit_due_frames(self, now):
+        """按 rate 补齐到 now 为止应发送的帧，返回距下一帧的秒数"""
+        if not self.collecting:
+            return None
+        due = int((now - self._epoch) * self.rate)
+        for _ in range(due - self._due):
+            line, corrupted = self.next_frame()
+            if line is None:
+                with self.lock:
+                    self.frames_corrupted += 1
+                continue
+            if len(self.tx) > MAX_OUTPUT:
+                # 上位机跟不上，像真实 UART 一样无法再发，计为丢帧
+                with self.lock:
+                    self.frames_dropped += 1
+                continue
+            if isinstance(line, bytes):
+                self.tx += line
+            else:
+                self._send(line)
+            with self.lock:
+                self.frames_sent += 1
+                self.frames_corrupted += corrupted
+        self._due = due
+        return (due + 1) / self.rate - (now - self._epoch)
+
+    def run(self):
+        self.running = True
+        while self.running:
+            timeout = self.emit_due_frames(time.monotonic())
+            if timeout is None:
+                timeout = 0.1
+            writers = [self.master_fd] if self.tx else []
+            readable, writable, _ = select.select([self.master_fd], writers, [], min(max(timeout, 0), 0.1))
+            if readable:
+                try:
+                    data = os.read(self.master_fd, 4096)
+                except (BlockingIOError, OSError):
+                    data = b""
+                self.feed(data)
+            if writable and self.tx:
+                try:
+                    written = os.write(self.master_fd, self.tx)
+                except BlockingIOError:
+                    written = 0
+                del self.tx[:written]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def close(self):
+        self.stop()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单片机固件串口协议模拟器（pty）")
+    parser.add_argument("--rate", type=float, default=1.0, help="每秒发送的数据帧数，真实硬件为 1")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="每帧注入错误的概率（0~1）")
+    parser.add_argument("--corrupt-kinds", default=",".join(CORRUPT_KINDS),
+                        help="注入的错误类型，逗号分隔: " + ",".join(CORRUPT_KINDS))
+    parser.add_argument("--channel", choices=("temp", "freq", "dual"), default="temp", help="初始通道")
+    parser.add_argument("--start", action="store_true", help="不等待 CMD:S 直接开始发送")
+    parser.add_argument("--seed", type=int, help="随机数种子")
+    parser.add_argument("--link", help="额外创建指向从端的符号链接，便于固定串口路径")
+    parser.add_argument("--legacy", action="store_true", help="模拟不支持二进制帧协商的旧固件")
+    args = parser.parse_args()
+
+    kinds = [k for k in args.corrupt_kinds.split(",") if k]
+    unknown = set(kinds) - set(CORRUPT_KINDS)
+    if unknown:
+        parser.error(f"未知的错误类型: {', '.join(sorted(unknown))}")
+    emulator = FirmwareEmulator(
+        rate=args.rate, corrupt=args.corrupt, corrupt_kinds=kinds, seed=args.seed,
+        channel={"temp": CHANNEL_TEMP_HUMI, "freq": CHANNEL_FREQ, "dual": CHANNEL_DUAL}[args.channel],
+        collecting=args.start, legacy=args.legacy,
+    )
+    if args.link:
+        if os.path.lexists(args.link):
+            os.remove(args.link)
+        os.symlink(emulator.slave_path, args.link)
+    emulator.start()
+    print(f"模拟器已启动: {args.link or emulator.slave_path}", flush=True)
+    try:
+        while True:
+            time.sleep(5)
+            s = emulator.stats()
+            print(f"已发送 {s['frames_sent']} 帧（注入错误 {s['frames_corrupted']}，丢弃 {s['frames_dropped']}），"
+                  f"命令 {s['commands']} 条，回发校验 正确 {s['echo_ok']} / 错误 {s['echo_error']}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.close()
+        if args.link and os.path.islink(args.link):
+            os.remove(args.link)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+下位机数据帧解码：一次匹配完成格式、校验和与范围检查
+
+支持的帧格式（与 main.c 一致）：
+    T:%u H:%u SEQ:%u CHECKSUM:%u
+    FREQ:%u SEQ:%u CHECKSUM:%u
+    SEQ 为 0~255 循环的帧序号，与二进制帧共用计数，旧固件的帧没有 SEQ 字段
+
+二进制帧（CMD:F 协商后启用，共 9 字节）：
+    0xA5 | 类型 | 序号 | 值1(u16 大端) | 值2(u16 大端) | CRC-16(大端)
+    类型 0x01 为温湿度（值1=温度，值2=湿度），0x02 为频率（值1=频率，值2=0）
+    CRC-16/CCITT-FALSE（多项式 0x1021，初值 0xFFFF），覆盖类型到值2的 6 个字节
+"""
+import re
+from binascii import crc_hqx
+from typing import NamedTuple
+
+CHANNEL_TEMP_HUMI = 0  # 温湿度通道
+CHANNEL_FREQ = 1       # 频率通道
+CHANNEL_DUAL = 2       # 双通道交替采集（CMD:D），不是帧类型，帧仍为温湿度帧或频率帧
+FRAME_UNKNOWN = -1
+
+CHECKSUM_SEP = " CHECKSUM:"
+
+# 二进制帧
+FRAME_SYNC = 0xA5
+BINARY_FRAME_LEN = 9
+BINARY_TYPES = {0x01: CHANNEL_TEMP_HUMI, 0x02: CHANNEL_FREQ}
+BINARY_TYPE_CODES = {kind: code for code, kind in BINARY_TYPES.items()}
+# 帧格式协商：CMD:F<波特率代码> 切换到二进制帧，CMD:T 恢复文本帧和 9600 波特率
+# 下位机回复 "[DEBUG] FORMAT BIN <波特率>" / "[DEBUG] FORMAT TEXT <波特率>" 后再切换波特率
+BINARY_BAUD_CODES = {9600: "0", 19200: "1", 57600: "2"}
+FORMAT_ACK_PREFIX = "[DEBUG] FORMAT "
+# 下位机发出的非数据行（调试信息、报警回复、减半值回显、DHT11 读取失败），
+# 其余不带校验和的行都是在串口上损坏的数据帧
+STATUS_LINE_PREFIXES = ("[DEBUG]", "HALF VALUE:", "TEMPER ", "HUMI ", "FREQ ALARM", "FREQ NORMAL", "DHT11 ")
+
+# 数值合法范围
+TEMP_RANGE = (0, 100)
+HUMI_RANGE = (0, 100)
+FREQ_RANGE = (0, 10000)
+
+SEQ_MODULO = 256  # 帧序号为 8 位，文本帧和二进制帧相同
+
+# 帧错误类型，用于链路质量统计（link_stats）
+FAULT_NONE = ""
+FAULT_CHECKSUM = "checksum"  # 校验和/CRC 不匹配、缺少校验和、长度错误
+FAULT_FORMAT = "format"      # 校验和正确但数据格式错误
+FAULT_RANGE = "range"        # 数值超出合法范围
+FAULT_CHANNEL = "channel"    # 帧类型与当前通道不符
+
+# 预编译的整帧匹配（str 和 bytes 各一份），组: t, h, f, seq, checksum
+_FRAME_PATTERN = r"(?:T:(\d+)\s+H:(\d+)|FREQ:(\d+))(?: SEQ:(\d+))? CHECKSUM:(\d+)"
+_FRAME_RE = re.compile(_FRAME_PATTERN, re.ASCII)
+_FRAME_RE_BYTES = re.compile(_FRAME_PATTERN.encode())
+_TEMP_HUMI_RE = re.compile(r"T:(\d+)\s+H:(\d+)")
+_FREQ_RE = re.compile(r"FREQ:(\d+)")
+_SEQ_RE = re.compile(r" SEQ:(\d+)")
+
+
+class Frame(NamedTuple):
+    """解码结果"""
+    kind: int            # CHANNEL_TEMP_HUMI / CHANNEL_FREQ / FRAME_UNKNOWN
+    values: tuple        # 温湿度为 (t, h)，频率为 (f,)
+    checksum_ok: bool
+    checksum: int        # 计算得到的校验和（二进制帧为 CRC-16）
+    error: str = ""      # 错误原因，有效帧为空
+    seq: int = -1        # 帧序号，旧固件的文本帧和校验失败的帧为 -1
+    fault: str = FAULT_NONE  # 错误类型，见 FAULT_*
+    binary: bool = False     # 是否为二进制帧
+
+    @property
+    def ok(self):
+        return not self.error
+
+    def describe(self):
+        """有效帧的说明文字"""
+        if self.binary:
+            check = f"CRC正确: 0x{self.checksum:04X}"
+        else:
+            check = f"校验和正确: {self.checksum}"
+        if self.seq >= 0:
+            check += f" 序号: {self.seq}"
+        if self.kind == CHANNEL_TEMP_HUMI:
+            t, h = self.values
+            return f"温湿度数据有效: T={t}℃, H={h}% | {check}"
+        f, = self.values
+        return f"频率数据有效: {f}Hz | {check}"
+
+
+def channel_kinds(channel):
+    """采集通道会收到的帧类型"""
+    if channel == CHANNEL_DUAL:
+        return (CHANNEL_TEMP_HUMI, CHANNEL_FREQ)
+    return (channel,)
+
+
+def calculate_checksum(data):
+    """计算校验和（与下位机 calculate_checksum 一致），支持 str 和 bytes"""
+    if isinstance(data, str):
+        return sum(map(ord, data))
+    return sum(data)
+
+
+def _format_error(kind):
+    return "温湿度数据格式错误" if kind == CHANNEL_TEMP_HUMI else "频率数据格式错误"
+
+
+def _range_fault(error):
+    return FAULT_RANGE if error else FAULT_NONE
+
+
+def _check_range(kind, values):
+    if kind == CHANNEL_TEMP_HUMI:
+        t, h = values
+        if not (TEMP_RANGE[0] <= t <= TEMP_RANGE[1]):
+            return f"温度数值超出范围: {t}℃"
+        if not (HUMI_RANGE[0] <= h <= HUMI_RANGE[1]):
+            return f"湿度数值超出范围: {h}%"
+    else:
+        f, = values
+        if not (FREQ_RANGE[0] <= f <= FREQ_RANGE[1]):
+            return f"频率数值超出范围: {f}Hz"
+    return ""
+
+
+def _decode_slow(line, expect):
+    """整帧匹配失败时逐项定位错误原因"""
+    sep = CHECKSUM_SEP if isinstance(line, str) else CHECKSUM_SEP.encode()
+    if sep[1:] not in line:
+        return Frame(FRAME_UNKNOWN, (), False, 0, "缺少校验和", fault=FAULT_CHECKSUM)
+    parts = line.split(sep)
+    if len(parts) != 2:
+        return Frame(FRAME_UNKNOWN, (), False, 0, "校验和格式错误", fault=FAULT_CHECKSUM)
+    data_part, checksum_part = parts
+    try:
+        received = int(checksum_part)
+    except ValueError:
+        return Frame(FRAME_UNKNOWN, (), False, 0, "校验和数值格式错误", fault=FAULT_CHECKSUM)
+    calculated = calculate_checksum(data_part)
+    if received != calculated:
+        return Frame(FRAME_UNKNOWN, (), False, calculated,
+                     f"校验和不匹配: 接收={received}, 计算={calculated}", fault=FAULT_CHECKSUM)
+    # 校验和正确但数据部分不符合格式
+    if isinstance(data_part, bytes):
+        data_part = data_part.decode(errors='ignore')
+    seq_match = _SEQ_RE.search(data_part)
+    seq = int(seq_match.group(1)) % SEQ_MODULO if seq_match else -1
+    kind = expect if expect is not None else FRAME_UNKNOWN
+    if kind == FRAME_UNKNOWN:
+        kind = CHANNEL_FREQ if data_part.startswith("FREQ") else CHANNEL_TEMP_HUMI
+    pattern = _TEMP_HUMI_RE if kind == CHANNEL_TEMP_HUMI else _FREQ_RE
+    match = pattern.match(data_part)
+    if not match:
+        other = _FREQ_RE if kind == CHANNEL_TEMP_HUMI else _TEMP_HUMI_RE
+        fault = FAULT_CHANNEL if other.match(data_part) else FAULT_FORMAT
+        return Frame(kind, (), True, calculated, _format_error(kind), seq, fault)
+    values = tuple(int(v) for v in match.groups())
+    error = _check_range(kind, values)
+    return Frame(kind, values, True, calculated, error, seq, _range_fault(error))
+
+
+def decode_frame(line, expect=None):
+    """
+    解码一帧（str 或 bytes，不含行尾）
+    expect 为期望的通道，帧类型不符时按格式错误处理
+    """
+    match = (_FRAME_RE if isinstance(line, str) else _FRAME_RE_BYTES).fullmatch(line)
+    if match is None:
+        return _decode_slow(line, expect)
+    t, h, f, seq, received = match.groups()
+    data_part = line[:match.start(5) - len(CHECKSUM_SEP)]
+    # 整帧已匹配，数据部分只含 ASCII，直接对字节求和
+    calculated = sum(data_part.encode() if isinstance(data_part, str) else data_part)
+    if int(received) != calculated:
+        return Frame(FRAME_UNKNOWN, (), False, calculated,
+                     f"校验和不匹配: 接收={int(received)}, 计算={calculated}", fault=FAULT_CHECKSUM)
+    seq = int(seq) % SEQ_MODULO if seq is not None else -1
+    if f is None:
+        kind, values = CHANNEL_TEMP_HUMI, (int(t), int(h))
+    else:
+        kind, values = CHANNEL_FREQ, (int(f),)
+    if expect is not None and kind != expect:
+        return Frame(expect, (), True, calculated, _format_error(expect), seq, FAULT_CHANNEL)
+    error = _check_range(kind, values)
+    return Frame(kind, values, True, calculated, error, seq, _range_fault(error))
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE（与下位机 crc16_ccitt 一致）"""
+    return crc_hqx(data, 0xFFFF)
+
+
+def encode_binary_frame(kind, values, seq):
+    """编码一个二进制帧（模拟器和测试用）"""
+    v1 = values[0]
+    v2 = values[1] if len(values) > 1 else 0
+    body = bytes((BINARY_TYPE_CODES[kind], seq & 0xFF, v1 >> 8 & 0xFF, v1 & 0xFF, v2 >> 8 & 0xFF, v2 & 0xFF))
+    crc = crc16(body)
+    return bytes((FRAME_SYNC,)) + body + bytes((crc >> 8, crc & 0xFF))
+
+
+def decode_binary_frame(data, expect=None):
+    """
+    解码一个二进制帧（bytes，以同步字节开头）
+    expect 为期望的通道，帧类型不符时按格式错误处理
+    """
+    if len(data) != BINARY_FRAME_LEN or data[0] != FRAME_SYNC:
+        return Frame(FRAME_UNKNOWN, (), False, 0, "二进制帧长度错误", fault=FAULT_CHECKSUM, binary=True)
+    calculated = crc16(data[1:7])
+    received = data[7] << 8 | data[8]
+    if received != calculated:
+        return Frame(FRAME_UNKNOWN, (), False, calculated,
+                     f"CRC不匹配: 接收=0x{received:04X}, 计算=0x{calculated:04X}", fault=FAULT_CHECKSUM, binary=True)
+    kind = BINARY_TYPES.get(data[1], FRAME_UNKNOWN)
+    seq = data[2]
+    if kind == FRAME_UNKNOWN:
+        return Frame(kind, (), True, calculated, f"未知帧类型: 0x{data[1]:02X}", seq, FAULT_FORMAT, True)
+    if expect is not None and kind != expect:
+        return Frame(expect, (), True, calculated, _format_error(expect), seq, FAULT_CHANNEL, True)
+    if kind == CHANNEL_TEMP_HUMI:
+        values = (data[3] << 8 | data[4], data[5] << 8 | data[6])
+    else:
+        values = (data[3] << 8 | data[4],)
+    error = _check_range(kind, values)
+    return Frame(kind, values, True, calculated, error, seq, _range_fault(error), True)
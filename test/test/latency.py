@@ -0,0 +1,217 @@
+"""
+逐帧时延统计：串口读到数据时用单调时钟打戳，记录到各处理环节完成的耗时
+
+环节:
+    validate - 收到 -> 校验解码完成
+    plot     - 收到 -> 写入折线图曲线
+    echo     - 收到 -> 减半值回发写入串口
+    echo_ack - 回发写入串口 -> 下位机回复 CHECKSUM OK/ERROR（往返时间）
+    ack      - 收到 -> 服务器确认上传
+
+统计结果可写入 JSON 文件（LatencyReporter）或通过 HTTP 读取（LatencyEndpoint）。
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+STAGES = ("validate", "plot", "echo", "echo_ack", "ack")
+STAGE_TITLES = {
+    "validate": "校验",
+    "plot": "绘图",
+    "echo": "回发",
+    "echo_ack": "下位机确认",
+    "ack": "上传确认",
+}
+
+# 直方图桶上界（毫秒）：0.01ms ~ 100s，每十倍 8 个桶
+BUCKET_BOUNDS_MS = [round(0.01 * 10 ** (i / 8), 6) for i in range(8 * 7 + 1)]
+
+
+class LatencyHistogram:
+    """对数分桶直方图，分位数取所在桶的上界"""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)  # 最后一个桶为溢出
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other):
+        """并入另一个直方图（如采集进程发回的增量）"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_ms += other.total_ms
+        if other.max_ms > self.max_ms:
+            self.max_ms = other.max_ms
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 4),
+            # [桶上界(ms), 个数]，只列出非空桶，上界为 null 表示溢出桶
+            "buckets": [[BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else None, n]
+                        for i, n in enumerate(self.counts) if n],
+        }
+
+
+class LatencyTracker:
+    """
+    线程安全的时延统计，采集、绘图、上传线程共用一个实例
+    received 均为 time.monotonic() 的读数
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.counters = {}
+
+    def record(self, stage, received, now=None):
+        """记录一帧从收到到 stage 完成的耗时"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            self.histograms[stage].add((now - received) * 1000)
+
+    def record_many(self, stage, received_list, now=None):
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            histogram = self.histograms[stage]
+            for received in received_list:
+                histogram.add((now - received) * 1000)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def take(self):
+        """取出上次 take() 以来的记录并清零，返回 {"stages": {环节: 直方图}, "counters": {...}}，只含非空项"""
+        with self.lock:
+            histograms, counters = self.histograms, self.counters
+            self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+            self.counters = {}
+        return {"stages": {stage: h for stage, h in histograms.items() if h.count}, "counters": counters}
+
+    def merge(self, delta):
+        """并入 take() 取出的记录，用于把采集进程的时延统计汇总到界面进程"""
+        with self.lock:
+            for stage, histogram in delta["stages"].items():
+                self.histograms[stage].merge(histogram)
+            for name, n in delta["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+            self.counters = {}
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "timestamp": int(time.time() * 1000),
+                "uptime_s": round(time.monotonic() - self.started, 3),
+                "counters": dict(self.counters),
+                "stages": {stage: h.snapshot() for stage, h in self.histograms.items()},
+            }
+
+    def write_json(self, path):
+        """原子地写入统计快照，读取方不会读到半个文件"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(self.snapshot(), fp, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+
+class LatencyReporter:
+    """后台线程每 interval 秒把统计写入 path，停止时再写一次"""
+    def __init__(self, tracker, path, interval=1.0):
+        self.tracker = tracker
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.tracker.write_json(self.path)
+        self.tracker.write_json(self.path)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="latency-reporter", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+class LatencyEndpoint:
+    """在后台线程提供 GET /latency，返回 JSON 统计快照"""
+    def __init__(self, tracker, host="127.0.0.1", port=0):
+        from http.server import ThreadingHTTPServer  # 只在启用接口时导入，缩短启动时间
+        self.tracker = tracker
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/latency"
+
+    def _make_handler(self):
+        from http.server import BaseHTTPRequestHandler
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/latency"):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(endpoint.tracker.snapshot(), ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="latency-endpoint", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,99 @@
+"""
+时延统计面板：显示各环节的时延分位数、直方图和计数
+"""
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QPlainTextEdit, QPushButton, QVBoxLayout, QHBoxLayout, QWidget
+
+from latency import STAGES, STAGE_TITLES
+
+BAR_WIDTH = 30  # 直方图最长的条宽（字符）
+COUNTER_TITLES = {
+    "frames_ok": "有效帧",
+    "frames_bad": "校验失败",
+    "plotted": "已绘图",
+    "acked": "已确认上传",
+    "echo_acked": "回发确认",
+    "echo_nacked": "回发校验错",
+    "echo_timeouts": "回发超时",
+    "echo_retries": "回发重试",
+    "echo_coalesced": "回发合并",
+}
+
+
+def _fmt_ms(value):
+    if value is None:
+        return "--"
+    return f"{value:.3f}" if value < 10 else f"{value:.1f}"
+
+
+def format_snapshot(snapshot):
+    """把 LatencyTracker.snapshot() 转换为等宽文本"""
+    lines = [f"运行 {snapshot['uptime_s']:.0f} 秒"]
+    counters = snapshot["counters"]
+    if counters:
+        lines.append("  ".join(f"{COUNTER_TITLES.get(k, k)}: {v}" for k, v in sorted(counters.items())))
+    lines.append("")
+    lines.append(f"{'环节':<8}{'次数':>9}{'平均ms':>10}{'p50':>9}{'p90':>9}{'p99':>9}{'最大':>9}")
+    stages = snapshot["stages"]
+    for stage in STAGES:
+        s = stages[stage]
+        lines.append(f"{STAGE_TITLES[stage]:<8}{s['count']:>9}{_fmt_ms(s['mean_ms']):>10}"
+                     f"{_fmt_ms(s['p50_ms']):>9}{_fmt_ms(s['p90_ms']):>9}"
+                     f"{_fmt_ms(s['p99_ms']):>9}{_fmt_ms(s['max_ms']):>9}")
+    for stage in STAGES:
+        buckets = stages[stage]["buckets"]
+        if not buckets:
+            continue
+        lines.append("")
+        lines.append(f"{STAGE_TITLES[stage]}时延分布（ms）")
+        peak = max(n for _, n in buckets)
+        for bound, n in buckets:
+            label = f"≤{_fmt_ms(bound)}" if bound is not None else "更大"
+            bar = "█" * max(1, round(n / peak * BAR_WIDTH))
+            lines.append(f"{label:>10} {bar} {n}")
+    return "\n".join(lines)
+
+
+class LatencyPanel(QWidget):
+    """
+    独立窗口，显示时延统计，只在可见时每 refresh_ms 毫秒刷新
+    """
+    def __init__(self, tracker, refresh_ms=1000, parent=None):
+        super().__init__(parent)
+        self.tracker = tracker
+        self.setWindowTitle("时延统计")
+        self.resize(560, 520)
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        font = QFont("Monospace")
+        font.setStyleHint(QFont.TypeWriter)
+        self.text.setFont(font)
+        self.reset_btn = QPushButton("清零")
+        self.reset_btn.clicked.connect(self.reset)
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.reset_btn)
+        layout = QVBoxLayout()
+        layout.addWidget(self.text)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.setInterval(refresh_ms)
+
+    def refresh(self):
+        self.text.setPlainText(format_snapshot(self.tracker.snapshot()))
+
+    def reset(self):
+        self.tracker.reset()
+        self.refresh()
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,127 @@
+"""
+链路质量统计：按帧序号统计丢帧，按错误类型统计坏帧
+
+下位机每发一帧（文本帧的 SEQ 字段、二进制帧的序号字节）序号加一，0~255 循环。
+主机收到的序号不连续时，中间缺的帧要么在串口上损坏（已计入 corrupt，序号无法读出），
+要么根本没有到达（串口缓冲溢出、线路断开、下位机忙），后者计入 dropped。
+
+计数器:
+    received     - 收到的帧（含坏帧）
+    valid        - 有效帧
+    dropped      - 按序号推算没有到达的帧
+    corrupt      - 校验和/CRC 错误、缺少校验和、被截断的帧
+    malformed    - 校验和正确但格式错误
+    out_of_range - 数值超出合法范围
+    unexpected   - 帧类型与当前通道不符
+    resyncs      - 序号跳变过大（下位机复位等）时重新对齐的次数
+    overflows    - 读串口时输入缓冲接近满的次数（可能溢出丢字节）
+
+只在采集线程中更新，其他线程通过 snapshot() 读取（只读整数，不加锁）。
+旧固件的文本帧没有序号，此时只统计坏帧，dropped 保持为 0。
+一次连续丢失超过 128 帧时无法与复位区分，按 resync 处理。
+"""
+from frame_decoder import (
+    SEQ_MODULO, FAULT_CHECKSUM, FAULT_FORMAT, FAULT_RANGE, FAULT_CHANNEL,
+)
+
+# 序号差超过它时认为下位机复位或主机漏掉了很长一段，只重新对齐不计丢帧
+RESYNC_GAP = SEQ_MODULO // 2
+# 读串口时 in_waiting 达到它认为输入缓冲可能已溢出（Linux tty 缓冲为 4095 字节）
+OVERFLOW_THRESHOLD = 4095
+
+COUNTERS = ("received", "valid", "dropped", "corrupt", "malformed", "out_of_range", "unexpected",
+            "resyncs", "overflows")
+COUNTER_TITLES = {
+    "received": "收到",
+    "valid": "有效",
+    "dropped": "丢帧",
+    "corrupt": "损坏",
+    "malformed": "格式错误",
+    "out_of_range": "超范围",
+    "unexpected": "通道不符",
+    "resyncs": "重新对齐",
+    "overflows": "缓冲溢出",
+}
+
+_FAULT_COUNTERS = {
+    FAULT_FORMAT: "malformed",
+    FAULT_RANGE: "out_of_range",
+    FAULT_CHANNEL: "unexpected",
+}
+
+
+class LinkStats:
+    """一个串口的链路质量统计"""
+    def __init__(self):
+        self.last_seq = None      # 上一帧的序号，None 表示尚未对齐
+        self.corrupt_pending = 0  # 上一个序号之后的坏帧数，它们占用了序号但读不出来
+        self.sequenced = False    # 是否收到过带序号的帧
+        self.reset()
+
+    def reset(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.expect_restart()
+
+    def expect_restart(self):
+        """下位机的序号可能不连续（重新启动采集、切换通道或帧格式）时调用，下一帧重新对齐"""
+        self.last_seq = None
+        self.corrupt_pending = 0
+
+    def record_frame(self, frame):
+        """记录一个解码后的帧（frame_decoder.Frame）"""
+        self.received += 1
+        if frame.fault == FAULT_CHECKSUM:
+            self.corrupt += 1
+            self.corrupt_pending += 1
+            return
+        if frame.ok:
+            self.valid += 1
+        else:
+            counter = _FAULT_COUNTERS.get(frame.fault)
+            if counter is not None:
+                setattr(self, counter, getattr(self, counter) + 1)
+        if frame.seq >= 0:
+            self._record_seq(frame.seq)
+
+    def record_truncated(self):
+        """记录一个被截断或损坏、缺少校验和的数据帧"""
+        self.received += 1
+        self.corrupt += 1
+        self.corrupt_pending += 1
+
+    def record_overflow(self):
+        self.overflows += 1
+
+    def _record_seq(self, seq):
+        self.sequenced = True
+        if self.last_seq is not None:
+            gap = (seq - self.last_seq - 1) % SEQ_MODULO
+            if gap >= RESYNC_GAP:
+                self.resyncs += 1
+            elif gap > self.corrupt_pending:
+                self.dropped += gap - self.corrupt_pending
+        self.last_seq = seq
+        self.corrupt_pending = 0
+
+    @property
+    def loss_rate(self):
+        """没有得到有效数据的帧（丢失 + 损坏）占应收帧的比例"""
+        expected = self.received + self.dropped
+        return (self.dropped + self.corrupt) / expected if expected else 0.0
+
+    def snapshot(self):
+        data = {name: getattr(self, name) for name in COUNTERS}
+        data["sequenced"] = self.sequenced
+        data["loss_rate"] = round(self.loss_rate, 6)
+        return data
+
+
+def format_link_stats(snapshot, name=""):
+    """一行可读的链路质量文本，用于日志和界面"""
+    prefix = f"[{name}] " if name else ""
+    parts = [f"{COUNTER_TITLES[key]} {snapshot[key]}" for key in COUNTERS
+             if snapshot[key] or key in ("received", "dropped", "corrupt")]
+    if not snapshot.get("sequenced"):
+        parts.append("无帧序号（旧固件），不统计丢帧")
+    return f"📶 {prefix}链路: " + "，".join(parts) + f"，丢失率 {snapshot['loss_rate'] * 100:.2f}%"
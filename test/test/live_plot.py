@@ -0,0 +1,63 @@
+"""
+实时折线图刷新调度：采样只标记脏曲线，按固定帧率统一重绘
+"""
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class PlotScheduler(QObject):
+    """
+    合并采样更新，以固定帧率刷新 pg.PlotWidget
+
+    每条曲线绑定横坐标和纵坐标两个 RingBuffer，
+    刷新时只对有新数据的曲线调用一次 setData，完成后发出 rendered 信号。
+    plot_widget 可以稍后用 attach() 传入（窗口显示后再导入 pyqtgraph），
+    之前标记的脏曲线在绑定后的第一次刷新时一起画出。
+    多个图表（如双通道时温湿度和频率各一个）可多次 attach()，共用同一个刷新定时器。
+    """
+    rendered = pyqtSignal()
+
+    def __init__(self, plot_widget=None, fps=20, window=600, parent=None):
+        super().__init__(parent)
+        self.plot_widgets = []
+        self.window = window  # 每条曲线显示的最近点数
+        self.curves = {}
+        self.dirty = set()
+        if plot_widget is not None:
+            self.attach(plot_widget)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.render)
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        self.fps = max(1, int(fps))
+        self.timer.setInterval(int(1000 / self.fps))
+
+    def attach(self, plot_widget):
+        self.plot_widgets.append(plot_widget)
+        plot_item = plot_widget.getPlotItem()
+        if plot_item is not None:
+            # 保留峰值的降采样 + 只绘制可见区间，长历史也能流畅缩放
+            plot_item.setDownsampling(auto=True, mode='peak')
+            plot_item.setClipToView(True)
+
+    def bind(self, name, curve, x_buffer, y_buffer):
+        self.curves[name] = (curve, x_buffer, y_buffer)
+
+    def mark_dirty(self, *names):
+        self.dirty.update(names)
+
+    def render(self):
+        if not self.dirty or not self.plot_widgets:
+            return
+        for name in self.dirty:
+            if name in self.curves:
+                curve, x_buffer, y_buffer = self.curves[name]
+                curve.setData(x_buffer.latest(self.window), y_buffer.latest(self.window))
+        self.dirty.clear()
+        self.rendered.emit()
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
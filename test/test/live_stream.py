@@ -0,0 +1,229 @@
+"""
+本地实时数据流：用 server-sent events（SSE）把有效采样推送给多个订阅者
+
+一块板子只需要一个程序打开串口，其他操作员和工具通过 HTTP 订阅即可实时看到数据，
+不用再开串口，也不用绕道远程服务器。
+
+接口:
+    GET /stream            - text/event-stream，事件类型为 sample / rollup，data 为上传格式的 JSON
+    GET /stream?source=COM3 - 只订阅某个串口的数据
+    GET /stats             - JSON 统计：订阅者数、已发布条数、丢弃条数、断开的慢订阅者数
+
+每条数据只编码一次，由 asyncio 事件循环分发给所有订阅者。每个订阅者有自己的有界队列：
+队列满时丢弃最早的数据（下一次发送前用 SSE 注释告知丢了多少条）；
+socket 发送缓冲在 slow_timeout 秒内都排不空的订阅者被断开，不会拖慢采集和其他订阅者。
+
+示例:
+    python collector.py --port /dev/ttyUSB0 --start --stream-port 8090
+    curl -N http://127.0.0.1:8090/stream
+"""
+import asyncio
+import collections
+import json
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+
+class _Client:
+    """一个订阅者的待发送队列"""
+    def __init__(self, writer, max_pending, source=None):
+        self.writer = writer
+        self.max_pending = max_pending
+        self.source = source
+        self.pending = collections.deque()
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.missed = 0  # 上次发送之后丢弃的条数
+
+    def offer(self, source, message):
+        if self.source and source != self.source:
+            return
+        if len(self.pending) >= self.max_pending:
+            self.pending.popleft()
+            self.dropped += 1
+            self.missed += 1
+        self.pending.append(message)
+        self.wakeup.set()
+
+
+class LiveStreamServer:
+    """
+    在后台线程运行 asyncio 事件循环的 SSE 服务器，可直接作为 AcquisitionEngine 的订阅者
+
+    publish() 可在任意线程调用：数据先放入收件箱，同一轮事件循环只唤醒一次分发
+    max_pending  - 每个订阅者最多缓存的条数，超出时丢弃最早的
+    slow_timeout - 发送缓冲排空的最长等待（秒），超时的订阅者被断开
+    max_clients  - 订阅者上限，超出时返回 503
+    heartbeat    - 没有数据时发送 SSE 注释保活的间隔（秒）
+    """
+    def __init__(self, host="127.0.0.1", port=0, max_pending=256, slow_timeout=5.0, max_clients=64,
+                 heartbeat=15.0):
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.slow_timeout = slow_timeout
+        self.max_clients = max_clients
+        self.heartbeat = heartbeat
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.inbox = []
+        self.scheduled = False
+        self.started = threading.Event()
+        self.closing = False
+        self.error = None
+        # 计数器
+        self.published = 0
+        self.dropped = 0            # 已断开订阅者丢弃的条数（在线订阅者的见 stats）
+        self.slow_disconnects = 0
+        self.rejected = 0
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/stream"
+
+    def __call__(self, event, payload):
+        if event == "sample":
+            self.publish(payload.to_server_data())
+
+    def publish(self, data):
+        """发布一条上传格式的数据（采样或滚动汇总），线程安全"""
+        event = "rollup" if data.get("type") == "rollup" else "sample"
+        message = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+        with self.lock:
+            self.published += 1
+            if not self.clients:
+                return
+            self.inbox.append((data.get("source", ""), message))
+            if self.scheduled or self.loop is None:
+                return
+            self.scheduled = True
+        self.loop.call_soon_threadsafe(self._fan_out)
+
+    def _fan_out(self):
+        with self.lock:
+            items = self.inbox
+            self.inbox = []
+            self.scheduled = False
+        for client in list(self.clients):
+            for source, message in items:
+                client.offer(source, message)
+
+    def stats(self):
+        clients = list(self.clients)
+        return {
+            "clients": len(clients),
+            "published": self.published,
+            "dropped": self.dropped + sum(c.dropped for c in clients),
+            "slow_disconnects": self.slow_disconnects,
+            "rejected": self.rejected,
+        }
+
+    # ---------- HTTP ----------
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), self.slow_timeout)
+            while (await asyncio.wait_for(reader.readline(), self.slow_timeout)) not in (b"\r\n", b"\n", b""):
+                pass  # 请求头不需要
+            parts = request.decode("latin-1").split()
+            if len(parts) < 2 or parts[0] != "GET":
+                await self._reply(writer, 405, b"")
+                return
+            url = urlsplit(parts[1])
+            if url.path == "/stream":
+                source = parse_qs(url.query).get("source", [None])[0]
+                await self._stream(writer, source)
+            elif url.path == "/stats":
+                await self._reply(writer, 200, json.dumps(self.stats()).encode(), "application/json")
+            else:
+                await self._reply(writer, 404, b"")
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _reply(self, writer, status, body, content_type="text/plain"):
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await asyncio.wait_for(writer.drain(), self.slow_timeout)
+
+    async def _stream(self, writer, source):
+        if len(self.clients) >= self.max_clients:
+            self.rejected += 1
+            await self._reply(writer, 503, b"")
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: keep-alive\r\nAccess-Control-Allow-Origin: *\r\n\r\n: connected\n\n")
+        client = _Client(writer, self.max_pending, source)
+        self.clients.add(client)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(client.wakeup.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                if self.closing:
+                    break
+                client.wakeup.clear()
+                chunks = []
+                if client.missed:
+                    chunks.append(f": dropped {client.missed}\n\n".encode())
+                    client.missed = 0
+                chunks.extend(client.pending)
+                client.sent += len(client.pending)
+                client.pending.clear()
+                writer.write(b"".join(chunks))
+                try:
+                    await asyncio.wait_for(writer.drain(), self.slow_timeout)
+                except asyncio.TimeoutError:
+                    self.slow_disconnects += 1
+                    break
+        finally:
+            self.clients.discard(client)
+            self.dropped += client.dropped
+
+    # ---------- 生命周期 ----------
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            self.loop.close()
+            return
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            # 唤醒所有订阅者让它们自行结束，不直接取消任务
+            self.closing = True
+            for client in list(self.clients):
+                client.wakeup.set()
+            tasks = asyncio.all_tasks(self.loop)
+            if tasks:
+                self.loop.run_until_complete(asyncio.wait(tasks, timeout=self.slow_timeout))
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+    def start(self):
+        """启动后台线程，端口被占用等错误在这里抛出"""
+        self.thread = threading.Thread(target=self._run, name="live-stream", daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self):
+        if self.loop is not None and self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
@@ -0,0 +1,57 @@
+"""
+有上限、批量刷新的日志窗口
+"""
+import logging
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QPlainTextEdit
+
+# 日志级别沿用 logging 模块的数值
+DEBUG = logging.DEBUG      # 每个采样的详细信息（原始行、校验通过、上传明细）
+INFO = logging.INFO        # 操作和状态变化
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+# 界面可选的日志级别
+VERBOSITY_CHOICES = [
+    ("详细", DEBUG),
+    ("常规", INFO),
+    ("仅错误", WARNING),
+]
+
+
+class LogConsole(QPlainTextEdit):
+    """
+    日志窗口：
+        - 最多保留 max_lines 行，超出自动丢弃最早的行
+        - append() 只放入缓冲，由定时器每 flush_ms 毫秒一次性写入
+        - 低于 level 的日志直接丢弃
+    """
+    def __init__(self, max_lines=2000, flush_ms=100, level=DEBUG, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self.max_lines = max_lines
+        self.level = level
+        self.pending = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(flush_ms)
+
+    def set_level(self, level):
+        self.level = level
+
+    def append(self, text, level=INFO):
+        if level < self.level:
+            return
+        self.pending.append(text)
+        if len(self.pending) > self.max_lines:
+            # 缓冲区里超出上限的部分反正不会显示，直接丢弃
+            del self.pending[:-self.max_lines]
+
+    def flush(self):
+        if not self.pending:
+            return
+        text = "\n".join(self.pending)
+        self.pending.clear()
+        self.appendPlainText(text)
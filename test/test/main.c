@@ -12,6 +12,15 @@ void UART_SendStr(char *str); // 添加函数原型声明，防止编译器警
 sbit KEY = P3^2; // 启动/停止按键
 
 bit collect_flag = 0; // 采集标志
+volatile bit binary_mode = 0; // 1=发送二进制帧（CMD:F 协商），0=文本帧
+unsigned char frame_seq = 0;  // 帧序号，文本帧和二进制帧共用，每帧加一，上位机据此统计丢帧
+
+// 二进制帧：0xA5 | 类型 | 序号 | 值1(大端) | 值2(大端) | CRC-16(大端)，共 9 字节
+#define FRAME_SYNC      0xA5
+#define FRAME_LEN       9
+#define FRAME_TEMP_HUMI 0x01
+#define FRAME_FREQ      0x02
+
 volatile char last_rx = 0;
 volatile bit rx_flag = 0;
 // char debug[17]; // 全局变量（删除，调试用局部变量）
@@ -20,7 +29,8 @@ volatile bit rx_flag = 0;
 unsigned char xdata num_buf[24]; // 放到xdata区，增加大小以容纳校验和
 unsigned char num_idx = 0;
 
-volatile unsigned char current_channel = 0; // 0=DHT11, 1=555频率
+volatile unsigned char current_channel = 0; // 0=DHT11, 1=555频率, 2=双通道交替（CMD:D）
+bit dual_freq_turn = 0; // 双通道时本周期轮到频率（1）还是温湿度（0）
 volatile bit freq_sample_flag = 0;
 volatile unsigned char t0_count = 0;
 
@@ -128,6 +138,15 @@ void handle_half_freq(const char* str) {
     Delay100ms();
 }
 
+// 按回发的数值个数区分：双通道时 "t h" 为温湿度，单个数为频率
+void handle_half(char* str) {
+    if(current_channel == 0 || (current_channel == 2 && strchr(str, ' ') != NULL)) {
+        handle_half_value(str);
+    } else {
+        handle_half_freq(str);
+    }
+}
+
 // 新增：校验和计算函数
 unsigned int calculate_checksum(char *str) {
     unsigned int checksum = 0;
@@ -137,6 +156,19 @@ unsigned int calculate_checksum(char *str) {
     return checksum;
 }
 
+// CRC-16/CCITT-FALSE（多项式 0x1021，初值 0xFFFF），比累加和多检出字节交换和多位错误
+unsigned int crc16_ccitt(unsigned char *dat, unsigned char len) {
+    unsigned int crc = 0xFFFF;
+    unsigned char i;
+    while(len--) {
+        crc ^= (unsigned int)(*dat++) << 8;
+        for(i = 0; i < 8; i++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+        }
+    }
+    return crc;
+}
+
 void UART_Init() {
     SCON = 0x50;      // 8位数据,可变波特率
     TMOD |= 0x20;     // 定时器1，8位自动重装
@@ -176,6 +208,62 @@ void UART_SendStr(char *str) {
     }
 }
 
+void UART_SendByte(unsigned char dat) {
+    SBUF = dat;
+    while(!TI);
+    TI = 0;
+}
+
+// 发送一个二进制数据帧（不用 sprintf，9 字节代替约 25 字节的文本）
+void UART_SendFrame(unsigned char type, unsigned int v1, unsigned int v2) {
+    unsigned char xdata frame[FRAME_LEN];
+    unsigned int crc;
+    unsigned char i;
+    frame[0] = FRAME_SYNC;
+    frame[1] = type;
+    frame[2] = frame_seq++;
+    frame[3] = v1 >> 8;
+    frame[4] = v1 & 0xFF;
+    frame[5] = v2 >> 8;
+    frame[6] = v2 & 0xFF;
+    crc = crc16_ccitt(frame + 1, 6);
+    frame[7] = crc >> 8;
+    frame[8] = crc & 0xFF;
+    for(i = 0; i < FRAME_LEN; i++) {
+        UART_SendByte(frame[i]);
+    }
+}
+
+// 约 2ms（11.0592MHz），大于 9600 波特率下一个字符的时间（约 1.04ms）
+void UART_WaitCharTime() {
+    unsigned char i, j;
+    i = 4;
+    j = 199;
+    do {
+        while (--j);
+    } while (--i);
+}
+
+// 切换波特率（11.0592MHz 晶振，定时器1方式2）：'0'=9600 '1'=19200 '2'=57600
+void UART_SetBaud(char baud_code) {
+    // TI 在停止位开始时就置位，UART_SendStr 返回时最后一个字节的停止位还在移出，
+    // 先等一个字符时间，否则切换波特率会损坏回复的最后一个字节（换行符）
+    UART_WaitCharTime();
+    TR1 = 0;
+    if(baud_code == '2') {
+        PCON |= 0x80; // SMOD=1 波特率加倍
+        TH1 = 0xFF;
+    } else if(baud_code == '1') {
+        PCON |= 0x80;
+        TH1 = 0xFD;
+    } else {
+        PCON &= 0x7F;
+        TH1 = 0xFD;
+    }
+    TL1 = TH1;
+    TR1 = 1;
+}
+
 void UART_ISR() interrupt 4 {
     char ch;
     char *check_pos;
@@ -195,7 +283,10 @@ void UART_ISR() interrupt 4 {
                 if(strncmp((char*)num_buf, "CMD:", 4) == 0 && num_idx >= 5) {
                     char cmd = num_buf[4];
                     // 处理命令
-                    if(cmd == 'S') collect_flag = 1;
+                    if(cmd == 'S') {
+                        collect_flag = 1;
+                        frame_seq = 0;
+                    }
                     if(cmd == 'E') collect_flag = 0;
                     if(cmd == 'A') {
                         current_channel = 0;
@@ -212,6 +303,15 @@ void UART_ISR() interrupt 4 {
                         LCD_ShowString(0,0,"                ");
                         LCD_ShowString(1,0,"                ");
                     }
+                    if(cmd == 'D') {
+                        current_channel = 2;
+                        dual_freq_turn = 0;
+                        freq_count = 0;
+                        t0_count = 0;
+                        freq_sample_flag = 0;
+                        LCD_ShowString(0,0,"                ");
+                        LCD_ShowString(1,0,"                ");
+                    }
                     if(cmd == 'X'){
                         LED1 = 0;
                         UART_SendStr("TEMPER ALARM\r\n");
@@ -236,6 +336,26 @@ void UART_ISR() interrupt 4 {
                         LED3 = 1;
                         UART_SendStr("FREQ NORMAL\r\n");
                     }
+                    // 帧格式协商：先用原波特率回复，上位机收到后再跟随切换
+                    if(cmd == 'F') {
+                        char baud_code = num_idx >= 6 ? num_buf[5] : '0';
+                        if(baud_code == '2') {
+                            UART_SendStr("[DEBUG] FORMAT BIN 57600\r\n");
+                        } else if(baud_code == '1') {
+                            UART_SendStr("[DEBUG] FORMAT BIN 19200\r\n");
+                        } else {
+                            baud_code = '0';
+                            UART_SendStr("[DEBUG] FORMAT BIN 9600\r\n");
+                        }
+                        binary_mode = 1;
+                        frame_seq = 0;
+                        UART_SetBaud(baud_code);
+                    }
+                    if(cmd == 'T') {
+                        UART_SendStr("[DEBUG] FORMAT TEXT 9600\r\n");
+                        binary_mode = 0;
+                        UART_SetBaud('0');
+                    }
                 } else {
                     // 不是命令，检查是否包含校验和
                     check_pos = strstr((char*)num_buf, " CHECKSUM:");
@@ -251,11 +371,7 @@ void UART_ISR() interrupt 4 {
                             UART_SendStr("HALF VALUE: ");
                             UART_SendStr((char*)num_buf);
                             UART_SendStr("\r\n");
-                            if(current_channel == 0) {
-                                handle_half_value((char*)num_buf);
-                            } else if(current_channel == 1) {
-                                handle_half_freq((char*)num_buf);
-                            }
+                            handle_half((char*)num_buf);
                         } else {
                             // 校验和错误
                             UART_SendStr("[DEBUG] CHECKSUM ERROR\r\n");
@@ -265,11 +381,7 @@ void UART_ISR() interrupt 4 {
                         UART_SendStr("HALF VALUE: ");
                         UART_SendStr((char*)num_buf);
                         UART_SendStr("\r\n");
-                        if(current_channel == 0) {
-                            handle_half_value((char*)num_buf);
-                        } else if(current_channel == 1) {
-                            handle_half_freq((char*)num_buf);
-                        }
+                        handle_half((char*)num_buf);
                     }
                 }
                 num_idx = 0;
@@ -295,11 +407,51 @@ void INT0_ISR() interrupt 0 {
 extern void Delay1000ms();
 sbit FREQ_IN = P3^2;
 
+// 重新开始一个完整的 1s 频率计数窗口（读 DHT11 关过总中断，之前的计数不完整）
+void Freq_RestartGate() {
+    EA = 0;
+    TH0 = (65536 - 50000) / 256;
+    TL0 = (65536 - 50000) % 256;
+    t0_count = 0;
+    freq_count = 0;
+    freq_sample_flag = 0;
+    EA = 1;
+}
+
+// 发送温湿度数据帧：二进制帧或带序号和校验和的文本帧
+void Send_TempHumi(unsigned char temp, unsigned char humi) {
+    char xdata buf[40]; // 放到xdata区，容纳 "T:255 H:255 SEQ:255 CHECKSUM:nnnn\r\n"
+    unsigned int checksum;
+    if(binary_mode) {
+        UART_SendFrame(FRAME_TEMP_HUMI, temp, humi);
+        return;
+    }
+    sprintf(buf, "T:%u H:%u SEQ:%u", (unsigned int)temp, (unsigned int)humi, (unsigned int)frame_seq);
+    checksum = calculate_checksum(buf);
+    sprintf(buf, "T:%u H:%u SEQ:%u CHECKSUM:%u\r\n", (unsigned int)temp, (unsigned int)humi,
+            (unsigned int)frame_seq, checksum);
+    frame_seq++;
+    UART_SendStr(buf);
+}
+
+// 发送频率数据帧
+void Send_Freq(unsigned int freq) {
+    char xdata buf[40];
+    unsigned int checksum;
+    if(binary_mode) {
+        UART_SendFrame(FRAME_FREQ, freq, 0);
+        return;
+    }
+    sprintf(buf, "FREQ:%u SEQ:%u", freq, (unsigned int)frame_seq);
+    checksum = calculate_checksum(buf);
+    sprintf(buf, "FREQ:%u SEQ:%u CHECKSUM:%u\r\n", freq, (unsigned int)frame_seq, checksum);
+    frame_seq++;
+    UART_SendStr(buf);
+}
+
 void main() {
     // 简化局部变量，只保留必要的
     unsigned char temp, humi;
-    char xdata buf[20]; // 放到xdata区
-    unsigned int checksum; // 新增：校验和变量声明
 
     UART_SendStr("[DEBUG] UART_Init\r\n");
     UART_Init();
@@ -315,8 +467,8 @@ void main() {
     while(1) {
         // --- 硬件状态控制器 ---
         // 根据软件状态，实时决定是否开启外部中断进行频率计数
-        if (collect_flag && current_channel == 1) {
-            EX0 = 1; // 启动采集且在频率通道时，使能外部中断
+        if (collect_flag && current_channel != 0) {
+            EX0 = 1; // 启动采集且在频率或双通道时，使能外部中断
         } else {
             EX0 = 0; // 其他所有情况（停止或在温湿度通道），都关闭外部中断
         }
@@ -335,11 +487,7 @@ void main() {
 
                     LCD_ShowString(0,0,"FREQ:       Hz");
                     LCD_ShowNum(0,6,freq_value,5);
-                    // 修改：添加校验和
-                    sprintf(buf, "FREQ:%u", freq_value);
-                    checksum = calculate_checksum(buf);
-                    sprintf(buf, "FREQ:%u CHECKSUM:%u\r\n", freq_value, checksum);
-                    UART_SendStr(buf);
+                    Send_Freq(freq_value);
                 }
             } else if(current_channel == 0) { // DHT11温湿度
                 // freq_count = 0; // 确保在DHT11模式下，频率计数器是清零的
@@ -354,11 +502,7 @@ void main() {
                         LCD_ShowString(1,0,"Humi:    %");
                         LCD_ShowNum(0,6,temp,2);
                         LCD_ShowNum(1,6,humi,2);
-                        // 修改：添加校验和
-                        sprintf(buf, "T:%u H:%u", (unsigned int)temp, (unsigned int)humi);
-                        checksum = calculate_checksum(buf);
-                        sprintf(buf, "T:%u H:%u CHECKSUM:%u\r\n", (unsigned int)temp, (unsigned int)humi, checksum);
-                        UART_SendStr(buf);
+                        Send_TempHumi(temp, humi);
                     } else {
                         EA = 1; // 恢复总中断
                         UART_SendStr("[DEBUG] DHT11 FAIL\r\n");
@@ -369,6 +513,37 @@ void main() {
                         UART_SendStr("DHT11 FAIL\r\n");
                     }
                 }
+            } else if(current_channel == 2) { // 双通道：每个 1s 周期轮流测量一种量，帧类型区分数据
+                if(freq_sample_flag) {
+                    freq_sample_flag = 0;
+                    if(dual_freq_turn) {
+                        // 上一周期没有读 DHT11，计数窗口完整
+                        EA = 0;
+                        freq_value = freq_count;
+                        freq_count = 0;
+                        EA = 1;
+                        LCD_ShowString(1,0,"FREQ:       Hz");
+                        LCD_ShowNum(1,6,freq_value,5);
+                        Send_Freq(freq_value);
+                    } else {
+                        EA = 0; // 读 DHT11 需要关总中断，期间的脉冲计数不准
+                        if(DHT11_Read(&temp, &humi) == 0) {
+                            EA = 1;
+                            LCD_ShowString(0,0,"T:  C  H:  %  ");
+                            LCD_ShowNum(0,2,temp,2);
+                            LCD_ShowNum(0,9,humi,2);
+                            Send_TempHumi(temp, humi);
+                        } else {
+                            EA = 1;
+                            UART_SendStr("[DEBUG] DHT11 FAIL\r\n");
+                            LCD_ShowString(0,0,"T:99C  H:99%  ");
+                            UART_SendStr("DHT11 FAIL\r\n");
+                        }
+                        // 下一周期测频率：从现在起重新计满 1s，不含读传感器的时间
+                        Freq_RestartGate();
+                    }
+                    dual_freq_turn = !dual_freq_turn;
+                }
             }
         } else {
             freq_count = 0; // 停止采集时，也清零频率计数器
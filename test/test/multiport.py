@@ -0,0 +1,161 @@
+"""
+多串口并发采集：一个进程、一个事件循环同时服务多个下位机
+每个串口有独立的 AcquisitionEngine（通道、阈值、报警状态互不影响）
+所有串口共用一个 AlarmEngine，每轮就绪的数据一次性判断报警
+给出 writer_options 时每个串口有自己的发送线程（serial_writer.SerialWriter），
+写串口不会阻塞事件循环
+"""
+import logging
+import selectors
+import threading
+import time
+
+import serial
+
+from acquisition import AcquisitionEngine, FrameSplitter, CHANNEL_TEMP_HUMI
+from alarms import AlarmEngine
+from link_stats import OVERFLOW_THRESHOLD
+from serial_writer import SerialWriter
+
+
+class PortChannel:
+    """单个串口的接收缓冲和采集引擎"""
+    def __init__(self, ser, engine, writer=None):
+        self.ser = ser
+        self.engine = engine
+        self.splitter = FrameSplitter()
+        self.writer = writer
+        self.writer_thread = None
+        if writer is not None:
+            engine.writer = writer
+            self.writer_thread = threading.Thread(target=writer.run, name=f"writer-{engine.name}", daemon=True)
+            self.writer_thread.start()
+
+    @property
+    def name(self):
+        return self.engine.name
+
+    def read_available(self):
+        """读取当前已到达的全部字节，按行交给采集引擎解析，返回有效采样（报警和回发由调用方处理）"""
+        waiting = self.ser.in_waiting
+        if waiting >= OVERFLOW_THRESHOLD:
+            self.engine.link.record_overflow()
+        data = self.ser.read(waiting or 1)
+        if not data:
+            return []
+        received = time.monotonic()
+        lines = self.splitter.feed(data)
+        return self.engine.ingest(lines, [received] * len(lines))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.flush()
+            self.writer.stop()
+            self.writer_thread.join()
+            self.engine.writer = None
+        if self.ser.is_open:
+            self.ser.close()
+
+
+class MultiPortCollector:
+    """
+    用 selectors 在单个线程里复用多个串口的文件描述符
+    不支持 fileno 的串口（如 Windows）退化为轮询 in_waiting
+    """
+    def __init__(self, poll_interval=0.05, alarms=None, writer_options=None):
+        self.alarms = alarms if alarms is not None else AlarmEngine()
+        self.writer_options = writer_options  # SerialWriter 的参数，None 时在事件循环中直接写串口
+        self.selector = selectors.DefaultSelector()
+        self.channels = {}
+        self.polled = []  # 无法注册到 selector 的串口
+        self.poll_interval = poll_interval
+        self.running = True
+
+    def add_port(self, port, baud=9600, channel=CHANNEL_TEMP_HUMI, thresholds=None):
+        """打开串口并返回该串口的采集引擎"""
+        ser = serial.Serial(port, baud, timeout=0)
+        engine = AcquisitionEngine(ser, channel=channel, name=port, alarms=self.alarms)
+        for name, (low, high) in (thresholds or {}).items():
+            engine.set_thresholds(name, low, high)
+        return self.add_serial(ser, engine)
+
+    def add_serial(self, ser, engine):
+        """注册已打开的串口（timeout 应为 0）"""
+        writer = None
+        if self.writer_options is not None:
+            writer = SerialWriter(ser, log=engine.log, **self.writer_options)
+        port_channel = PortChannel(ser, engine, writer)
+        self.channels[engine.name] = port_channel
+        try:
+            self.selector.register(ser.fileno(), selectors.EVENT_READ, port_channel)
+        except (AttributeError, OSError, ValueError):
+            self.polled.append(port_channel)
+        return engine
+
+    def remove_port(self, name):
+        port_channel = self.channels.pop(name, None)
+        if port_channel is None:
+            return
+        if port_channel in self.polled:
+            self.polled.remove(port_channel)
+        else:
+            self.selector.unregister(port_channel.ser.fileno())
+        port_channel.close()
+
+    @property
+    def engines(self):
+        return [c.engine for c in self.channels.values()]
+
+    def _read(self, port_channel, ready):
+        try:
+            samples = port_channel.read_available()
+        except serial.SerialException as e:
+            port_channel.engine.log(f"❌ 串口读取失败: {e}", logging.ERROR)
+            self.remove_port(port_channel.name)
+            return
+        if samples:
+            ready.append((port_channel.engine, samples))
+
+    @staticmethod
+    def _respond(ready):
+        """按报警引擎分组，所有板子的采样一次判断，再由各自的引擎回应"""
+        groups = {}
+        for engine, samples in ready:
+            if engine.port_open:
+                groups.setdefault(id(engine.alarms), []).append((engine, samples))
+        for group in groups.values():
+            alarms = group[0][0].alarms
+            edges = alarms.evaluate([sample for _, samples in group for sample in samples])
+            offset = 0
+            for engine, samples in group:
+                engine.respond(samples, edges[offset:offset + len(samples)])
+                offset += len(samples)
+
+    def run_once(self, timeout=1.0):
+        """处理一轮就绪的串口"""
+        if self.polled:
+            timeout = min(timeout, self.poll_interval)
+        if self.selector.get_map():
+            events = self.selector.select(timeout)
+        else:
+            events = []
+            time.sleep(timeout)
+        ready = []
+        for key, _ in events:
+            self._read(key.data, ready)
+        for port_channel in list(self.polled):
+            if port_channel.ser.in_waiting:
+                self._read(port_channel, ready)
+        self._respond(ready)
+
+    def run(self):
+        while self.running and self.channels:
+            self.run_once()
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        for name in list(self.channels):
+            self.remove_port(name)
+        self.selector.close()
@@ -0,0 +1,159 @@
+"""
+本地时序数据记录：定宽二进制列存，按天（UTC）分目录，读取时内存映射
+
+目录结构:
+    <root>/<board>/<YYYY-MM-DD>/<series>.<column>.bin
+
+每个序列的各列文件等长、按写入顺序排列，timestamp 列为毫秒时间戳（int64）。
+读取时用 numpy.memmap 映射文件，按时间戳二分查找区间，不会把整个文件读入内存。
+"""
+import calendar
+import os
+import re
+import struct
+import time
+
+import numpy as np
+
+from frame_decoder import CHANNEL_TEMP_HUMI
+
+# 序列名 -> [(列名, NumPy dtype)]
+SERIES = {
+    "temperature_humidity": [("timestamp", "<i8"), ("temperature", "<u1"), ("humidity", "<u1")],
+    "frequency": [("timestamp", "<i8"), ("frequency", "<u2")],
+}
+_STRUCT_CODES = {"<i8": "<q", "<u1": "<B", "<u2": "<H"}
+
+DAY_MS = 86400 * 1000
+
+
+def day_name(timestamp_ms):
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp_ms / 1000))
+
+
+def board_dir_name(board):
+    """把串口名等转换为可用作目录名的字符串"""
+    name = re.sub(r"[^0-9A-Za-z_.-]+", "_", board).strip("_")
+    return name or "default"
+
+
+class _DayWriter:
+    """一个板子、一个序列、一天的列文件"""
+    def __init__(self, directory, series):
+        os.makedirs(directory, exist_ok=True)
+        self.columns = SERIES[series]
+        self.packers = [struct.Struct(_STRUCT_CODES[dtype]).pack for _, dtype in self.columns]
+        self.files = [open(os.path.join(directory, f"{series}.{name}.bin"), "ab") for name, _ in self.columns]
+
+    def write(self, row):
+        for fp, pack, value in zip(self.files, self.packers, row):
+            fp.write(pack(value))
+
+    def flush(self):
+        for fp in self.files:
+            fp.flush()
+
+    def close(self):
+        for fp in self.files:
+            fp.close()
+
+
+class Recorder:
+    """
+    采样记录器，可直接作为 AcquisitionEngine 的订阅者
+    没有来源的采样（单串口界面）记到 default_board 下
+    写入经过文件缓冲，至少每 flush_interval 秒落盘一次，供读取方看到最新数据
+    """
+    def __init__(self, root, default_board="default", flush_interval=1.0):
+        self.root = root
+        self.default_board = default_board
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        self.writers = {}  # (board, series) -> (day, _DayWriter)
+
+    def __call__(self, event, payload):
+        if event == "sample":
+            self.record(payload)
+
+    def record(self, sample):
+        board = board_dir_name(sample.source or self.default_board)
+        if sample.channel == CHANNEL_TEMP_HUMI:
+            series = "temperature_humidity"
+        else:
+            series = "frequency"
+        day = day_name(sample.timestamp)
+        key = (board, series)
+        current = self.writers.get(key)
+        if current is None or current[0] != day:
+            # 跨天时切换到新目录
+            if current is not None:
+                current[1].close()
+            current = (day, _DayWriter(os.path.join(self.root, board, day), series))
+            self.writers[key] = current
+        current[1].write((sample.timestamp,) + tuple(sample.values))
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        for _, writer in self.writers.values():
+            writer.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        for _, writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+
+class RecordReader:
+    """
+    读取 Recorder 写下的数据
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def boards(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def days(self, board):
+        path = os.path.join(self.root, board_dir_name(board))
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.listdir(path))
+
+    def open_day(self, board, day, series):
+        """内存映射一天的全部列，返回 {列名: memmap}，文件不存在时返回 None"""
+        directory = os.path.join(self.root, board_dir_name(board), day)
+        arrays = {}
+        for name, dtype in SERIES[series]:
+            path = os.path.join(directory, f"{series}.{name}.bin")
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                return None
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r")
+        # 写入中断时各列长度可能不一致，以最短的为准
+        length = min(len(a) for a in arrays.values())
+        return {name: a[:length] for name, a in arrays.items()}
+
+    def iter_range(self, board, series, start_ms, end_ms):
+        """逐天产出 [start_ms, end_ms) 区间内的列视图（零拷贝）"""
+        for day in self.days(board):
+            day_start = calendar.timegm(time.strptime(day, "%Y-%m-%d")) * 1000
+            if day_start >= end_ms or day_start + DAY_MS <= start_ms:
+                continue
+            arrays = self.open_day(board, day, series)
+            if arrays is None:
+                continue
+            ts = arrays["timestamp"]
+            lo, hi = np.searchsorted(ts, [start_ms, end_ms])
+            if lo < hi:
+                yield {name: a[lo:hi] for name, a in arrays.items()}
+
+    def query(self, board, series, start_ms, end_ms):
+        """返回区间内各列拼接后的数组"""
+        parts = list(self.iter_range(board, series, start_ms, end_ms))
+        return {
+            name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0, dtype=dtype)
+            for name, dtype in SERIES[series]
+        }
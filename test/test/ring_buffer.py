@@ -0,0 +1,72 @@
+"""
+定长环形缓冲区，保存每个通道的采样历史
+"""
+import numpy as np
+
+
+class RingBuffer:
+    """
+    基于 NumPy 的预分配环形缓冲区
+
+    存储区长度为容量的两倍，每个值同时写入 i 和 i+capacity 两处，
+    因此最近 n 个值总是一段连续内存，latest() 返回的是零拷贝视图。
+    追加为 O(1)，内存占用固定为 2 * capacity * itemsize。
+    """
+    def __init__(self, capacity, dtype=np.float32):
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于 0")
+        self.capacity = int(capacity)
+        self._data = np.zeros(2 * self.capacity, dtype=dtype)
+        self._pos = 0     # 下一个写入位置
+        self.total = 0    # 累计写入的样本数
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def append(self, value):
+        pos = self._pos
+        self._data[pos] = value
+        self._data[pos + self.capacity] = value
+        self._pos = pos + 1 if pos + 1 < self.capacity else 0
+        self.total += 1
+
+    def extend(self, values):
+        """批量追加"""
+        values = np.asarray(values, dtype=self._data.dtype)
+        count = len(values)
+        if count > self.capacity:
+            values = values[-self.capacity:]
+        n = len(values)
+        cap = self.capacity
+        pos = self._pos
+        first = min(n, cap - pos)
+        self._data[pos:pos + first] = values[:first]
+        self._data[pos + cap:pos + cap + first] = values[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = values[first:]
+            self._data[cap:cap + rest] = values[first:]
+        self._pos = (pos + n) % cap
+        self.total += count
+
+    def latest(self, n=None):
+        """最近 n 个值（按时间先后）的只读视图，n 默认为全部"""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self._pos + self.capacity
+        view = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self):
+        if not self.total:
+            raise IndexError("缓冲区为空")
+        return self._data[self._pos + self.capacity - 1]
+
+    def clear(self):
+        self._pos = 0
+        self.total = 0
@@ -0,0 +1,236 @@
+"""
+串口发送线程：界面和采集引擎只把命令放入队列，由单独的线程写串口
+
+- 优先级：报警命令 > 普通命令（启动/停止/切换通道/调试信号） > 减半值回发
+- 回发合并：还没写出的回发被更新的回发替换，只发最新的一条
+- 确认匹配：下位机对每条带校验和的回发回复 "[DEBUG] CHECKSUM OK/ERROR"，
+  按发送顺序与回复一一对应，统计往返时间；出错或超时按重试策略重发
+"""
+import collections
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ALARM = 0
+PRIORITY_COMMAND = 1
+
+ACK_OK = "[DEBUG] CHECKSUM OK"
+ACK_ERROR = "[DEBUG] CHECKSUM ERROR"
+
+
+def log_message(message, level=logging.INFO):
+    """默认日志回调：交给 logging，保留级别"""
+    logger.log(level, message)
+
+
+class _Echo:
+    __slots__ = ("data", "received", "attempts", "sent_at")
+
+    def __init__(self, data, received):
+        self.data = data
+        self.received = received  # 对应采样的接收时刻，用于时延统计
+        self.attempts = 0
+        self.sent_at = 0.0
+
+
+class SerialWriter:
+    """
+    串口发送循环，run() 在单独的线程中执行
+
+    ack_timeout - 等待下位机确认的最长时间（秒）
+    max_retries - 确认出错或超时后最多重发的次数；已有更新的回发等待发送时不再重发旧值
+    max_inflight - 同时等待确认的回发条数。下位机在串口中断里处理回发（含两次 100ms 延时），
+                   期间收到的字节会丢失，所以默认等上一条确认后再发下一条
+    max_queue   - 命令队列上限，串口卡住时丢弃最早的命令
+    latency     - latency.LatencyTracker，记录回发时延（echo）、往返时间（echo_ack）和确认计数
+    log         - 日志回调，形式为 log(message, level)，缺省交给 logging
+    """
+    def __init__(self, ser, log=log_message, ack_timeout=1.0, max_retries=1, max_inflight=1,
+                 max_queue=256, latency=None):
+        self.ser = ser
+        self.log = log
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.latency = latency
+        self.running = True
+        self.cond = threading.Condition()
+        self.commands = []       # 堆：(优先级, 序号, 字节)
+        self.counter = itertools.count()
+        self.echo = None         # 等待发送的最新回发
+        self.inflight = collections.deque()  # 已发送、等待确认的回发
+        self.busy = False        # 正在写串口
+        # 计数器
+        self.written = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.acked = 0
+        self.nacked = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.unmatched = 0  # 没有对应回发的确认（如串口打开前下位机的回复）
+        self.rtt_count = 0
+        self.rtt_total = 0.0
+        self.rtt_max = 0.0
+
+    def stats(self):
+        with self.cond:
+            return {
+                "written": self.written,
+                "pending": len(self.commands) + (self.echo is not None),
+                "inflight": len(self.inflight),
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "acked": self.acked,
+                "nacked": self.nacked,
+                "timeouts": self.timeouts,
+                "retries": self.retries,
+                "unmatched": self.unmatched,
+                "rtt_mean_ms": round(self.rtt_total / self.rtt_count * 1000, 3) if self.rtt_count else None,
+                "rtt_max_ms": round(self.rtt_max * 1000, 3),
+            }
+
+    def _count(self, name):
+        if self.latency:
+            self.latency.count(name)
+
+    # ---------- 调用方接口（任意线程） ----------
+    def send(self, data, priority=PRIORITY_COMMAND):
+        """放入一条命令"""
+        with self.cond:
+            heapq.heappush(self.commands, (priority, next(self.counter), data))
+            if len(self.commands) > self.max_queue:
+                # 丢弃优先级最低、最早的一条
+                victim = max(self.commands, key=lambda item: (item[0], -item[1]))
+                self.commands.remove(victim)
+                heapq.heapify(self.commands)
+                self.dropped += 1
+            self.cond.notify_all()
+
+    def send_echo(self, data, received=None):
+        """放入一条减半值回发，替换尚未发送的旧回发"""
+        with self.cond:
+            if self.echo is not None:
+                self.coalesced += 1
+                self._count("echo_coalesced")
+            self.echo = _Echo(data, received)
+            self.cond.notify_all()
+
+    def on_line(self, line):
+        """把下位机发来的行交给发送线程匹配确认，是确认行时返回 True"""
+        if line == ACK_OK:
+            ok = True
+        elif line == ACK_ERROR:
+            ok = False
+        else:
+            return False
+        now = time.monotonic()
+        with self.cond:
+            if not self.inflight:
+                self.unmatched += 1
+                return True
+            echo = self.inflight.popleft()
+            rtt = now - echo.sent_at
+            self.rtt_count += 1
+            self.rtt_total += rtt
+            self.rtt_max = max(self.rtt_max, rtt)
+            if ok:
+                self.acked += 1
+                self._count("echo_acked")
+            else:
+                self.nacked += 1
+                self._count("echo_nacked")
+                self._retry(echo, "下位机校验和错误")
+            self.cond.notify_all()
+        if self.latency:
+            self.latency.record("echo_ack", echo.sent_at, now)
+        return True
+
+    # ---------- 发送线程 ----------
+    def _retry(self, echo, reason):
+        """按重试策略重发，调用时已持有锁"""
+        if self.echo is not None:
+            # 已有更新的数据等待发送，旧值不必重发
+            self.coalesced += 1
+            self._count("echo_coalesced")
+            return
+        if echo.attempts > self.max_retries:
+            self.log(f"⚠️ 回发失败（{reason}），已重试 {self.max_retries} 次: {echo.data.decode(errors='ignore').strip()}", logging.WARNING)
+            return
+        self.retries += 1
+        self._count("echo_retries")
+        self.echo = echo
+
+    def _expire(self, now):
+        """处理确认超时的回发，调用时已持有锁"""
+        while self.inflight and now - self.inflight[0].sent_at >= self.ack_timeout:
+            echo = self.inflight.popleft()
+            self.timeouts += 1
+            self._count("echo_timeouts")
+            self._retry(echo, "等待确认超时")
+
+    def _next(self):
+        """等待并取出下一条要写的数据，返回 (字节, 回发或 None)"""
+        with self.cond:
+            while self.running:
+                now = time.monotonic()
+                self._expire(now)
+                if self.commands:
+                    _, _, data = heapq.heappop(self.commands)
+                    self.busy = True
+                    return data, None
+                if self.echo is not None and len(self.inflight) < self.max_inflight:
+                    echo, self.echo = self.echo, None
+                    self.busy = True
+                    return echo.data, echo
+                timeout = None
+                if self.inflight:
+                    timeout = max(0.0, self.inflight[0].sent_at + self.ack_timeout - now)
+                self.cond.wait(timeout)
+            return None, None
+
+    def run(self):
+        while self.running:
+            data, echo = self._next()
+            if data is None:
+                break
+            if echo is not None:
+                with self.cond:
+                    echo.attempts += 1
+                    echo.sent_at = time.monotonic()
+                    self.inflight.append(echo)
+            try:
+                if not self.ser.is_open:
+                    raise OSError("串口未打开")
+                self.ser.write(data)
+            except Exception as e:
+                self.log(f"❌ 串口写入失败: {e}", logging.ERROR)
+                with self.cond:
+                    self.dropped += 1
+                    self.busy = False
+                    if echo is not None and echo in self.inflight:
+                        self.inflight.remove(echo)
+                    self.cond.notify_all()
+                continue
+            with self.cond:
+                self.written += 1
+                self.busy = False
+                self.cond.notify_all()
+            if echo is not None and echo.received is not None and self.latency:
+                self.latency.record("echo", echo.received)
+
+    def flush(self, timeout=1.0):
+        """等待队列中的命令和回发写完（不等待确认），超时返回 False"""
+        with self.cond:
+            return self.cond.wait_for(lambda: not (self.commands or self.echo or self.busy) or not self.running,
+                                      timeout)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
@@ -0,0 +1,57 @@
+"""
+上传落盘缓冲（store-and-forward）：服务器不可达或程序退出时数据不丢失
+
+使用 SQLite WAL 模式，按写入顺序回放；行数有上限，超出时淘汰最早的数据。
+同一个 Spool 对象只能在创建它的线程中使用。
+"""
+import sqlite3
+
+
+class Spool:
+    def __init__(self, path, max_rows=1000000):
+        self.path = path
+        self.max_rows = max_rows
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # 只对新建的库生效
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)")
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def append(self, payloads):
+        """
+        追加若干条已编码的 JSON 文本，返回因超出上限被淘汰的条数
+        """
+        if not payloads:
+            return 0
+        with self.conn:
+            self.conn.executemany("INSERT INTO spool (payload) VALUES (?)", ((p,) for p in payloads))
+            self._count += len(payloads)
+            evicted = max(0, self._count - self.max_rows)
+            if evicted:
+                self.conn.execute(
+                    "DELETE FROM spool WHERE id IN (SELECT id FROM spool ORDER BY id LIMIT ?)", (evicted,))
+                self._count -= evicted
+        return evicted
+
+    def peek(self, limit):
+        """按写入顺序取出最早的 limit 条，返回 [(id, payload), ...]，不删除"""
+        return self.conn.execute("SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def ack(self, last_id):
+        """确认 last_id 及之前的数据已送达，从缓冲中删除"""
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM spool WHERE id <= ?", (last_id,)).rowcount
+            self._count -= deleted
+        if not self._count:
+            # 积压清空后归还磁盘空间
+            self.conn.execute("PRAGMA incremental_vacuum")
+        return deleted
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,117 @@
+"""
+本地替身服务器：代替 data.cancanjiao.xyz 接收上传，用于联调、断网演练和基准测试
+
+示例:
+    python stub_server.py --port 8000
+    python stub_server.py --port 8000 --down-for 30     # 前30秒返回503，模拟断网恢复
+    python stub_server.py --port 8000 --json-only       # 只接受不压缩的 JSON，模拟旧服务器
+    python collector.py --port /dev/ttyUSB0 --upload --server-url http://127.0.0.1:8000/data
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from upload_codec import decode_columns, decompress, CodecError, CONTENT_TYPE_COLUMNS
+
+
+class StubServer:
+    """
+    在后台线程运行的替身服务器，记录收到的采样
+    down_until 之前的请求一律返回 503
+    接受 JSON 和 upload_codec 的列存格式，支持 Content-Encoding: deflate/gzip；
+    json_only 时其它格式返回 415，用于验证上传端退回 JSON
+    """
+    def __init__(self, host="127.0.0.1", port=0, down_for=0.0, json_only=False):
+        self.samples = []
+        self.requests = 0
+        self.bytes_received = 0
+        self.json_only = json_only
+        self.down_until = time.monotonic() + down_for
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/data"
+
+    def set_down(self, seconds):
+        """从现在起 seconds 秒内模拟服务器不可用"""
+        self.down_until = time.monotonic() + seconds
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持长连接
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if time.monotonic() < server.down_until:
+                    self._reply(503)
+                    return
+                content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+                content_encoding = self.headers.get("Content-Encoding")
+                columns = content_type == CONTENT_TYPE_COLUMNS
+                if server.json_only and (columns or content_encoding):
+                    self._reply(415)
+                    return
+                try:
+                    raw = decompress(body, content_encoding)
+                    data = decode_columns(raw) if columns else json.loads(raw)
+                except CodecError:
+                    self._reply(415)
+                    return
+                except ValueError:
+                    self._reply(400)
+                    return
+                with server.lock:
+                    server.requests += 1
+                    server.bytes_received += len(body)
+                    server.samples.extend(data if isinstance(data, list) else [data])
+                self._reply(200)
+
+            def _reply(self, status):
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上传接口本地替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--down-for", type=float, default=0.0, help="启动后前若干秒返回503")
+    parser.add_argument("--json-only", action="store_true", help="只接受不压缩的 JSON，其它格式返回415")
+    args = parser.parse_args()
+    server = StubServer(args.host, args.port, args.down_for, args.json_only).start()
+    print(f"替身服务器已启动: {server.url}", flush=True)
+    try:
+        while True:
+            time.sleep(5)
+            with server.lock:
+                print(f"请求 {server.requests} 次，采样 {len(server.samples)} 条，"
+                      f"请求体 {server.bytes_received} 字节", flush=True)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+上传数据的紧凑编码：按列存放、整数差分、变长整数，可再加 zlib/gzip 压缩
+
+JSON 每个采样都带 "half_temperature"、"timestamp" 等键名和服务器可以自行计算的减半值，
+列存编码去掉这些冗余，温湿度采样通常只占 4~5 个字节。
+
+请求体格式（Content-Type: application/x-8051-columns）:
+    b"8051" | 版本 u8 | 组 ...
+    组 = 类型 u8 | 来源长度 varint | 来源 UTF-8 | 条数 varint | 各列
+        类型 0x01 温湿度（列: timestamp, temperature, humidity）
+        类型 0x02 频率  （列: timestamp, frequency）
+        类型 0x00 其它记录（如滚动汇总），"各列"为 UTF-8 JSON 数组的长度 varint 和内容
+    列 = 第一个值 + 其后每个值与前一个值的差，均为 zigzag 编码的 varint
+
+采样按 (类型, 来源) 分组，组内保持原顺序；减半值由解码方重新计算。
+压缩时使用 HTTP 的 Content-Encoding：deflate（zlib）或 gzip。
+"""
+import gzip
+import json
+import zlib
+
+from frame_decoder import BINARY_TYPE_CODES, CHANNEL_TEMP_HUMI, CHANNEL_FREQ
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_COLUMNS = "application/x-8051-columns"
+MAGIC = b"8051"
+VERSION = 1
+
+# 上传编码：json 为原格式；columns 为列存；auto 先用列存，服务器返回 415 时退回 JSON
+WIRE_JSON = "json"
+WIRE_COLUMNS = "columns"
+WIRE_AUTO = "auto"
+WIRE_FORMATS = (WIRE_JSON, WIRE_COLUMNS, WIRE_AUTO)
+
+# 压缩方式 -> Content-Encoding
+COMPRESSIONS = {"none": None, "zlib": "deflate", "gzip": "gzip"}
+
+KIND_OTHER = 0x00
+# 序列名 -> (类型码, 数值字段)，类型码与二进制串口帧一致
+SERIES = {
+    "temperature_humidity": (BINARY_TYPE_CODES[CHANNEL_TEMP_HUMI], ("temperature", "humidity")),
+    "frequency": (BINARY_TYPE_CODES[CHANNEL_FREQ], ("frequency",)),
+}
+KIND_SERIES = {code: (name, fields) for name, (code, fields) in SERIES.items()}
+
+
+class CodecError(ValueError):
+    """请求体无法解码"""
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(body, pos):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(body):
+            raise CodecError("变长整数被截断")
+        byte = body[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_column(out, values):
+    """差分后 zigzag 编码：小的正负差值都只占一个字节"""
+    previous = 0
+    for value in values:
+        delta = value - previous
+        previous = value
+        _write_varint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+
+
+def _read_column(body, pos, count):
+    values = []
+    previous = 0
+    for _ in range(count):
+        raw, pos = _read_varint(body, pos)
+        previous += (raw >> 1) ^ -(raw & 1)
+        values.append(previous)
+    return values, pos
+
+
+def _write_bytes(out, data):
+    _write_varint(out, len(data))
+    out += data
+
+
+def _read_bytes(body, pos):
+    length, pos = _read_varint(body, pos)
+    if pos + length > len(body):
+        raise CodecError("数据被截断")
+    return bytes(body[pos:pos + length]), pos + length
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def encode_columns(records):
+    """把上传格式的 dict 列表编码为列存请求体（bytes）"""
+    groups = {}  # (类型码, 来源) -> 记录列表，dict 保持首次出现的顺序
+    other = []
+    for record in records:
+        series = SERIES.get(record.get("type"))
+        if series is None or not all(_is_int(record.get(f)) for f in ("timestamp",) + series[1]):
+            other.append(record)
+            continue
+        groups.setdefault((series[0], record.get("source", "")), []).append(record)
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    for (kind, source), group in groups.items():
+        out.append(kind)
+        _write_bytes(out, source.encode("utf-8"))
+        _write_varint(out, len(group))
+        for field in ("timestamp",) + KIND_SERIES[kind][1]:
+            _write_column(out, [record[field] for record in group])
+    if other:
+        out.append(KIND_OTHER)
+        _write_bytes(out, b"")
+        _write_varint(out, len(other))
+        _write_bytes(out, json.dumps(other, separators=(",", ":")).encode("utf-8"))
+    return bytes(out)
+
+
+def decode_columns(body):
+    """解码列存请求体，返回上传格式的 dict 列表（重新计算减半值）"""
+    if body[:len(MAGIC)] != MAGIC:
+        raise CodecError("不是列存格式")
+    if len(body) <= len(MAGIC) or body[len(MAGIC)] != VERSION:
+        raise CodecError("不支持的列存格式版本")
+    pos = len(MAGIC) + 1
+    records = []
+    while pos < len(body):
+        kind = body[pos]
+        source, pos = _read_bytes(body, pos + 1)
+        source = source.decode("utf-8")
+        count, pos = _read_varint(body, pos)
+        if kind == KIND_OTHER:
+            data, pos = _read_bytes(body, pos)
+            records.extend(json.loads(data))
+            continue
+        if kind not in KIND_SERIES:
+            raise CodecError(f"未知的记录类型: {kind}")
+        name, fields = KIND_SERIES[kind]
+        columns = []
+        for _ in ("timestamp",) + fields:
+            column, pos = _read_column(body, pos, count)
+            columns.append(column)
+        for row in zip(*columns):
+            record = {"type": name}
+            for field, value in zip(fields, row[1:]):
+                record[field] = value
+                record["half_" + field] = value // 2
+            record["timestamp"] = row[0]
+            if source:
+                record["source"] = source
+            records.append(record)
+    return records
+
+
+def compress(body, compression):
+    """按 COMPRESSIONS 压缩，返回 (请求体, Content-Encoding 或 None)"""
+    encoding = COMPRESSIONS[compression]
+    if encoding == "deflate":
+        return zlib.compress(body), encoding
+    if encoding == "gzip":
+        return gzip.compress(body), encoding
+    return body, None
+
+
+def decompress(body, content_encoding):
+    """按请求头 Content-Encoding 解压，不支持的编码抛出 CodecError"""
+    encoding = (content_encoding or "identity").strip().lower()
+    try:
+        if encoding == "deflate":
+            return zlib.decompress(body)
+        if encoding == "gzip":
+            return gzip.decompress(body)
+    except (OSError, zlib.error) as e:
+        raise CodecError(f"解压失败: {e}") from e
+    if encoding != "identity":
+        raise CodecError(f"不支持的 Content-Encoding: {encoding}")
+    return body
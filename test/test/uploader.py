@@ -0,0 +1,341 @@
+"""
+服务器上传核心，不依赖GUI
+NetworkThread 和无界面采集程序共用
+"""
+import collections
+import json
+import logging
+import threading
+import time
+
+from spool import Spool
+from upload_codec import (
+    encode_columns, compress, CONTENT_TYPE_JSON, CONTENT_TYPE_COLUMNS,
+    WIRE_JSON, WIRE_AUTO, WIRE_FORMATS, COMPRESSIONS,
+)
+
+# 队列满时的处理策略
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # 丢弃最早的数据
+OVERFLOW_DROP_NEWEST = "drop_newest"  # 丢弃新来的数据
+OVERFLOW_BLOCK = "block"              # 阻塞调用方直到有空位
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK)
+
+# 一次 POST 的结果
+POST_OK = "ok"              # 服务器已确认
+POST_RETRY = "retry"        # 连接失败、超时、5xx、408/429，稍后重发
+POST_REJECTED = "rejected"  # 其它 4xx，服务器不会接受这批数据，重发也没用，丢弃
+POST_FALLBACK = "fallback"  # auto 模式下列存格式被拒绝（400/415），已改用 JSON，立即重发，不算失败
+# 4xx 中可以重试的状态码：请求超时、请求过多
+RETRYABLE_4XX = (408, 429)
+
+
+def print_log(message, level=logging.INFO):
+    print(message, flush=True)
+
+
+class Uploader:
+    """
+    上传循环：有界队列接收每一个采样，攒批后以 JSON 数组（或 upload_codec 的列存格式）POST 到服务器
+    使用 requests.Session 复用长连接
+
+    指定 spool_path 时启用落盘缓冲：队列中的数据先写入 spool.Spool，
+    再按顺序从磁盘取批发送，服务器确认后才删除，断网或重启后自动补发。
+
+    log 为日志回调，形式为 log(message, level)
+    batch_size     - 每次 POST 最多携带的采样数
+    flush_interval - 不足一批时最长等待时间（秒），也是失败后的重试间隔
+    max_queue      - 队列上限
+    overflow       - 队列满时的策略，见 OVERFLOW_POLICIES
+    max_backoff    - 连续失败时重试间隔从 flush_interval 起翻倍，最长不超过该值（秒）
+    spool_path     - 落盘缓冲文件路径，None 表示不落盘
+    max_spool      - 落盘缓冲最多保存的采样数，超出时淘汰最早的数据
+    replay_rate    - 补发积压数据时每秒最多发送的采样数，0 表示不限速
+    latency        - latency.LatencyTracker，记录采样从收到到服务器确认的时延
+    wire           - 上传编码，见 upload_codec.WIRE_FORMATS；auto 先用列存，
+                     列存请求在第一次成功之前被服务器拒绝（400/415）时退回 JSON
+    服务器以其它 4xx 拒绝的批次不再重发，计入 dropped
+    compression    - 请求体压缩方式，见 upload_codec.COMPRESSIONS
+    """
+    def __init__(self, url, log=print_log, batch_size=50, flush_interval=1.0,
+                 max_queue=10000, overflow=OVERFLOW_DROP_OLDEST, timeout=5,
+                 max_backoff=60.0, spool_path=None, max_spool=1000000, replay_rate=0,
+                 latency=None, wire=WIRE_JSON, compression="none"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的队列溢出策略: {overflow}")
+        if wire not in WIRE_FORMATS:
+            raise ValueError(f"未知的上传编码: {wire}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"未知的压缩方式: {compression}")
+        self.url = url
+        self.log = log
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.backoff = flush_interval
+        self.spool_path = spool_path
+        self.max_spool = max_spool
+        self.replay_rate = replay_rate
+        self.latency = latency
+        self.wire = wire
+        self.compression = compression
+        self.wire_confirmed = wire != WIRE_AUTO  # auto 模式下服务器是否已接受过列存请求
+        self.running = True
+        self.queue = collections.deque()  # (采样 dict, 接收时刻)
+        self.cond = threading.Condition()
+        self.session = None
+        # 计数器
+        self.queued = 0   # 累计入队的采样数
+        self.sent = 0     # 服务器已确认的采样数
+        self.dropped = 0  # 因队列满或被服务器拒绝而丢弃的采样数
+        self.failed_posts = 0
+        self.spooled = 0  # 落盘缓冲中的采样数（由上传线程更新）
+        self.bytes_sent = 0  # 服务器已确认的请求体字节数（压缩后）
+
+    def stats(self):
+        """上传计数快照"""
+        with self.cond:
+            return {
+                "queued": self.queued,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "pending": len(self.queue),
+                "spooled": self.spooled,
+                "failed_posts": self.failed_posts,
+                "bytes_sent": self.bytes_sent,
+                "bytes_per_sample": round(self.bytes_sent / self.sent, 2) if self.sent else None,
+            }
+
+    def send_data(self, data, received=None):
+        """
+        把一个采样（dict）放入上传队列，被丢弃时返回 False
+        received 为串口收到该采样时 time.monotonic() 的读数，用于统计确认时延
+        """
+        with self.cond:
+            if len(self.queue) >= self.max_queue:
+                if self.overflow == OVERFLOW_DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.overflow == OVERFLOW_BLOCK:
+                    while self.running and len(self.queue) >= self.max_queue:
+                        self.cond.wait(self.flush_interval)
+                while len(self.queue) >= self.max_queue:
+                    self.queue.popleft()
+                    self.dropped += 1
+            self.queue.append((data, received))
+            self.queued += 1
+            if len(self.queue) >= self.batch_size:
+                self.cond.notify_all()
+        return True
+
+    def _next_batch(self):
+        """等到攒够一批或超过 flush_interval，取出一批"""
+        with self.cond:
+            deadline = time.monotonic() + self.flush_interval
+            while self.running and len(self.queue) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            count = min(self.batch_size, len(self.queue))
+            batch = [self.queue.popleft() for _ in range(count)]
+            if batch:
+                self.cond.notify_all()  # 唤醒阻塞在队列满上的调用方
+            return batch
+
+    def _requeue(self, batch):
+        """发送失败的数据放回队首，保持顺序"""
+        with self.cond:
+            self.queue.extendleft(reversed(batch))
+            while len(self.queue) > self.max_queue:
+                if self.overflow == OVERFLOW_DROP_NEWEST:
+                    self.queue.pop()
+                else:
+                    self.queue.popleft()
+                self.dropped += 1
+
+    def post(self, batch, json_body=None):
+        """
+        按当前上传编码 POST 一批数据（dict 列表），返回 POST_OK / POST_RETRY / POST_REJECTED
+        json_body 为已编码的 JSON 数组，退回 JSON 时直接使用
+        """
+        if self.wire != WIRE_JSON:
+            result = self.post_body(encode_columns(batch), len(batch), CONTENT_TYPE_COLUMNS)
+            if result != POST_FALLBACK:
+                return result
+            # 服务器不支持列存格式，已退回 JSON，立即重发
+        return self.post_body(json_body if json_body is not None else json.dumps(batch), len(batch))
+
+    def _record_ack(self, stamps):
+        """记录服务器确认的采样时延，没有接收时刻的（如上次运行留下的积压）跳过"""
+        if self.latency:
+            stamps = [received for received in stamps if received is not None]
+            self.latency.record_many("ack", stamps)
+            self.latency.count("acked", len(stamps))
+
+    def post_body(self, body, count, content_type=CONTENT_TYPE_JSON):
+        """
+        POST 已编码的请求体（count 条采样），按 compression 压缩，
+        返回 POST_OK / POST_RETRY / POST_REJECTED / POST_FALLBACK
+        """
+        import requests  # 第一次上传时才导入，缩短上位机和采集程序的启动时间
+        if self.session is None:
+            self.session = requests.Session()
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        body, content_encoding = compress(body, self.compression)
+        result = POST_RETRY
+        try:
+            # 使用HTTP POST请求发送数据
+            headers = {'Content-Type': content_type}
+            if content_encoding:
+                headers['Content-Encoding'] = content_encoding
+            response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+            if response.status_code == 200:
+                with self.cond:
+                    self.sent += count
+                    self.bytes_sent += len(body)
+                self.backoff = self.flush_interval
+                self.wire_confirmed = True
+                self.log(f"✅ 已发送到服务器: {count} 条，{len(body)} 字节", logging.DEBUG)
+                return POST_OK
+            status = response.status_code
+            if status in (400, 415) and not self.wire_confirmed:
+                self._fall_back_to_json(status)
+                return POST_FALLBACK
+            elif 400 <= status < 500 and status not in RETRYABLE_4XX:
+                self.log(f"❌ 服务器拒绝了这批数据（{status}），丢弃 {count} 条", logging.ERROR)
+                result = POST_REJECTED
+            else:
+                self.log(f"⚠️ 服务器响应异常: {status}", logging.WARNING)
+        except requests.exceptions.ConnectionError:
+            self.log(f"❌ 连接服务器失败: {self.url}", logging.ERROR)
+        except requests.exceptions.Timeout:
+            self.log(f"❌ 请求超时: {self.url}", logging.ERROR)
+        except Exception as e:
+            self.log(f"❌ 发送到服务器失败: {e}", logging.ERROR)
+        with self.cond:
+            self.failed_posts += 1
+            if result == POST_REJECTED:
+                self.dropped += count
+        return result
+
+    def _fall_back_to_json(self, status):
+        """auto 模式下服务器拒绝了第一个列存请求：改用不压缩的 JSON"""
+        self.wire = WIRE_JSON
+        self.compression = "none"
+        self.wire_confirmed = True
+        self.log(f"⚠️ 服务器不接受列存/压缩格式（{status}），改用 JSON 上传", logging.WARNING)
+
+    def _wait_backoff(self):
+        """失败后按指数退避等待再试，避免频繁连接"""
+        self._wait(self.backoff)
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    def run(self):
+        if self.spool_path:
+            self._run_spooled()
+        else:
+            self._run_memory()
+        if self.session is not None:
+            self.session.close()
+
+    def _run_memory(self):
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            result = self.post([data for data, _ in batch])
+            if result == POST_OK:
+                self._record_ack([received for _, received in batch])
+            elif result == POST_RETRY:
+                self._requeue(batch)
+                self._wait_backoff()
+        # 退出前把剩余数据再尝试发送一次
+        while self.queue:
+            batch = self._next_batch()
+            result = self.post([data for data, _ in batch])
+            if result == POST_RETRY:
+                self._requeue(batch)
+                break
+            if result == POST_OK:
+                self._record_ack([received for _, received in batch])
+
+    def _drain_to_spool(self, spool, stamps, wait):
+        """
+        把内存队列中的数据写入落盘缓冲，wait 为 True 时先等待攒批
+        stamps 与落盘缓冲中的行一一对应，保存接收时刻
+        """
+        with self.cond:
+            if wait:
+                deadline = time.monotonic() + self.flush_interval
+                while self.running and len(self.queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+            items = list(self.queue)
+            self.queue.clear()
+            if items:
+                self.cond.notify_all()
+        if items:
+            evicted = spool.append([json.dumps(data) for data, _ in items])
+            stamps.extend(received for _, received in items)
+            self._pop_stamps(stamps, evicted)
+            with self.cond:
+                self.dropped += evicted
+                self.spooled = len(spool)
+
+    @staticmethod
+    def _pop_stamps(stamps, count):
+        """按顺序取出落盘缓冲最早 count 行的接收时刻"""
+        return [stamps.popleft() for _ in range(min(count, len(stamps)))]
+
+    def _run_spooled(self):
+        spool = Spool(self.spool_path, max_rows=self.max_spool)
+        if len(spool):
+            self.log(f"📦 落盘缓冲中有 {len(spool)} 条待补发数据", logging.INFO)
+        # 上次运行留下的积压没有接收时刻
+        stamps = collections.deque([None] * len(spool))
+        try:
+            while self.running:
+                # 没有积压时才等待攒批，有积压时尽快补发
+                self._drain_to_spool(spool, stamps, wait=not len(spool))
+                rows = spool.peek(self.batch_size)
+                if not rows:
+                    continue
+                started = time.monotonic()
+                body = "[" + ",".join(payload for _, payload in rows) + "]"
+                if self.wire == WIRE_JSON:
+                    result = self.post_body(body, len(rows))
+                else:
+                    result = self.post([json.loads(payload) for _, payload in rows], body)
+                if result == POST_RETRY:
+                    self._wait_backoff()
+                    continue
+                # 被拒绝的批次也从落盘缓冲删除（已计入 dropped），不会堵住后面的数据
+                spool.ack(rows[-1][0])
+                batch_stamps = self._pop_stamps(stamps, len(rows))
+                if result == POST_OK:
+                    self._record_ack(batch_stamps)
+                with self.cond:
+                    self.spooled = len(spool)
+                if self.replay_rate and len(spool):
+                    # 补发限速，避免恢复连接后瞬间压垮服务器
+                    self._wait(len(rows) / self.replay_rate - (time.monotonic() - started))
+        finally:
+            # 退出时未发送的数据全部落盘，下次启动后补发
+            self._drain_to_spool(spool, stamps, wait=False)
+            spool.close()
+
+    def _wait(self, seconds):
+        with self.cond:
+            if self.running and seconds > 0:
+                self.cond.wait(seconds)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
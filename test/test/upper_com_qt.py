@@ -1,94 +1,136 @@
 import sys
-import serial
-import serial.tools.list_ports
-import re
-import requests
+import os
 import json
-import time
+import argparse
+import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
-    QComboBox, QTextEdit, QMessageBox, QLineEdit, QFormLayout, QSlider
+    QComboBox, QMessageBox, QLineEdit, QFormLayout, QSlider, QSizePolicy
 )
 from PyQt5.QtCore import QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QPalette, QBrush, QPixmap, QPainter, QColor, QImage
+from PyQt5.QtGui import QPalette, QBrush, QColor
 from PyQt5.QtWidgets import QGraphicsDropShadowEffect
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QMenu
 import PyQt5.QtCore as QtCore
-import pyqtgraph as pg  
 from PyQt5.QtWidgets import QDial
+from acquisition import AcquisitionEngine, LineReader, ChunkReader, DEFAULT_THRESHOLDS
+from frame_decoder import BINARY_BAUD_CODES, CHANNEL_TEMP_HUMI, CHANNEL_FREQ, channel_kinds
+from alarms import AlarmEngine, RULES
+from uploader import Uploader
+from upload_codec import WIRE_FORMATS, WIRE_JSON, COMPRESSIONS
+from serial_writer import SerialWriter
+from ring_buffer import RingBuffer
+from live_plot import PlotScheduler
+from dashboard import ValueBoard
+from background import BackgroundCompositor
+import log_console
+from log_console import LogConsole
+from recorder import Recorder
+from latency import LatencyTracker, LatencyReporter, LatencyEndpoint
+from latency_panel import LatencyPanel
+from aggregator import RollingAggregator, format_rollup
+from link_stats import format_link_stats
 
+HISTORY_LEN = 100000  # 每个通道保留的采样历史点数
+PLOT_LEN = 600        # 折线图显示的最近点数
+PLOT_FPS = 20         # 折线图最高刷新帧率
+LOG_MAX_LINES = 2000  # 日志窗口最多保留的行数
+LOG_FLUSH_MS = 100    # 日志批量刷新间隔（毫秒）
+ISOLATED_POLL_MS = 20  # 独立采集进程模式下界面读取共享内存的间隔（毫秒）
+RECORD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "records")  # 本地记录目录
 
 
 class SerialThread(QThread):
-    data_received = pyqtSignal(str)
+    data_received = pyqtSignal(str, float)   # (行, 接收时刻 time.monotonic())
+    batch_received = pyqtSignal(list, list)  # 批量模式下每次发出多行及各行的接收时刻
 
-    def __init__(self, ser):
+    def __init__(self, ser, batch=False, max_batch=64, max_latency=0.05, link=None):
         super().__init__()
         self.ser = ser
-        self.running = True
+        if batch:
+            self.reader = ChunkReader(ser, self.batch_received.emit, max_batch, max_latency, link)
+        else:
+            self.reader = LineReader(ser, self.data_received.emit)
+
+    def run(self):
+        self.reader.run()
+
+    def stop(self):
+        self.reader.stop()
+        self.quit()
+        self.wait()
+class SerialWriterThread(QThread):
+    """
+    串口发送线程：报警命令、普通命令和减半值回发排队写出，并匹配下位机的确认
+    """
+    send_log = pyqtSignal(str, int)  # 用于向UI发送日志（文本, 级别）
+
+    def __init__(self, ser, **options):
+        super().__init__()
+        self.writer = SerialWriter(ser, log=self.emit_log, **options)
+
+    def emit_log(self, message, level=log_console.INFO):
+        self.send_log.emit(message, level)
 
     def run(self):
-        while self.running:
-            if self.ser.is_open:
-                try:
-                    line = self.ser.readline().decode(errors='ignore').strip()
-                    if line:
-                        self.data_received.emit(line)
-                except Exception:
-                    pass
+        self.writer.run()
 
     def stop(self):
-        self.running = False
+        self.writer.flush()
+        self.writer.stop()
         self.quit()
         self.wait()
+
+
+class PortScanner(QThread):
+    """
+    后台枚举串口，启动和点击“刷新”时不阻塞界面
+    """
+    ports_found = pyqtSignal(list)
+
+    def run(self):
+        from serial.tools import list_ports
+        self.ports_found.emit([port.device for port in list_ports.comports()])
+
+
 class NetworkThread(QThread):
     """
     网络线程，负责发送网络数据
     """
-    send_log = pyqtSignal(str)#用于向UI发送日志
-    def __init__(self,url):
+    send_log = pyqtSignal(str, int)#用于向UI发送日志（文本, 级别）
+    def __init__(self,url, **options):
         super().__init__()
         self.url = url
-        self.running = True
-        self.data_to_send = None #存储待发送的数据
-        
+        self.uploader = Uploader(url, log=self.emit_log, **options)
+
+    def emit_log(self, message, level=log_console.INFO):
+        self.send_log.emit(message, level)
+
     def run(self):
-        while self.running:
-            if self.data_to_send:
-                try:
-                    # 使用HTTP POST请求发送数据
-                    headers = {'Content-Type': 'application/json'}
-                    response = requests.post(self.url, data=self.data_to_send, headers=headers, timeout=5)
-                    
-                    if response.status_code == 200:
-                        self.send_log.emit(f"✅ 已发送到服务器: {self.data_to_send}")
-                    else:
-                        self.send_log.emit(f"⚠️ 服务器响应异常: {response.status_code}")
-                    
-                    self.data_to_send = None # 发送成功后清空
-                except requests.exceptions.ConnectionError:
-                    self.send_log.emit(f"❌ 连接服务器失败: {self.url}")
-                except requests.exceptions.Timeout:
-                    self.send_log.emit(f"❌ 请求超时: {self.url}")
-                except Exception as e:
-                    self.send_log.emit(f"❌ 发送到服务器失败: {e}")
-            self.msleep(1000) # 每秒尝试发送一次，避免频繁连接
-
-    def send_data(self, data):
+        self.uploader.run()
+
+    def send_data(self, data, received=None):
         """
-        设置要发送的数据。
+        把一个采样放入上传队列。
         """
-        self.data_to_send = data
+        return self.uploader.send_data(data, received)
+
+    def stats(self):
+        return self.uploader.stats()
 
     def stop(self):
-        self.running = False
+        self.uploader.stop()
         self.quit()
         self.wait()
             
 
 class MainWindow(QWidget):
-    def __init__(self):
+    def __init__(self, history_len=HISTORY_LEN, plot_len=PLOT_LEN, plot_fps=PLOT_FPS, record_dir=RECORD_DIR,
+                 latency_file=None, latency_port=None, alarm_hysteresis=None, alarm_dwell=0.0,
+                 ack_timeout=1.0, echo_retries=1, binary_baud=None, lightweight=False,
+                 rollup_windows=None, rollup_only=False, upload_format="json", upload_compression="none",
+                 stream_port=None, isolated=False):
         super().__init__()
         # 先定义 set_label_shadow，确保后续所有 label 创建前可用
         def set_label_shadow(label):
@@ -101,15 +143,83 @@ class MainWindow(QWidget):
         self.setWindowTitle("温湿度/频率监控上位机")
         self.ser = None
         self.serial_thread = None
+        self.writer_thread = None  # 串口发送线程
         self.network_thread = None #新增网络线程
-        self.current_channel = 1 # 0=温湿度, 1=频率
+        self.current_channel = 1 # 0=温湿度, 1=频率, 2=双通道交替
 
         # 网络配置 - 固定服务器地址
         self.server_url = "http://data.cancanjiao.xyz/data"  # 固定服务器URL
-        # 报警状态标志
-        self.temp_alarm_on = False
-        self.humi_alarm_on = False
-        self.freq_alarm_on = False
+        # 上传队列：每批条数、攒批最长等待（秒）、队列上限、队列满时策略
+        # 断网或退出时未发送的数据落盘保存，恢复后按顺序限速补发
+        self.upload_options = {
+            "batch_size": 50,
+            "flush_interval": 1.0,
+            "max_queue": 10000,
+            "overflow": "drop_oldest",
+            "spool_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "upload_spool.db"),
+            "max_spool": 1000000,
+            "replay_rate": 200,
+            # 上传编码（json/columns/auto）和请求体压缩方式，见 upload_codec
+            "wire": upload_format,
+            "compression": upload_compression,
+        }
+        # 串口批量读取：每次信号最多携带的行数和最长等待时间（秒）
+        self.serial_max_batch = 64
+        self.serial_max_latency = 0.05
+        # 打开串口后协商二进制帧时使用的波特率，None 为只用文本帧
+        self.binary_baud = binary_baud
+        # 串口发送：等待下位机确认回发的超时（秒）和出错/超时后的重发次数
+        self.writer_options = {
+            "ack_timeout": ack_timeout,
+            "max_retries": echo_retries,
+        }
+        # 采集引擎（校验、解析、报警、回发），界面只是它的订阅者
+        # 报警回差（各通道单位）和最短持续时间（秒），避免读数在阈值附近抖动时反复发送报警命令
+        # isolated 时采集引擎运行在单独的进程中（acquisition_process），界面卡顿不会耽误串口数据，
+        # 采样经共享内存环形缓冲区交给界面，由 poll_timer 按界面自己的节奏读取
+        self.isolated = isolated
+        if isolated:
+            # 只在 --isolated 时导入（multiprocessing、shared_memory），缩短启动时间
+            from acquisition_process import AcquisitionProcess
+            self.engine = AcquisitionProcess(channel=self.current_channel, hysteresis=alarm_hysteresis,
+                                             dwell={rule.name: alarm_dwell for rule in RULES},
+                                             writer_options=self.writer_options)
+            self.poll_timer = QTimer(self)
+            self.poll_timer.timeout.connect(self.engine.poll)
+            self.poll_timer.setInterval(ISOLATED_POLL_MS)
+        else:
+            alarms = AlarmEngine(hysteresis=alarm_hysteresis,
+                                 dwell={rule.name: alarm_dwell for rule in RULES})
+            self.engine = AcquisitionEngine(channel=self.current_channel, alarms=alarms)
+        self.engine.subscribe(self.on_engine_event)
+        # 逐帧时延统计：校验、绘图、回发、上传确认，可写入文件或通过 HTTP 读取
+        # isolated 时校验、回发时延由采集进程记录，随链路快照一起发回并入
+        self.latency = LatencyTracker()
+        self.engine.latency = self.latency
+        self.plot_pending = []  # 已收到、尚未画到折线图上的采样的接收时刻
+        self.latency_reporter = LatencyReporter(self.latency, latency_file).start() if latency_file else None
+        self.latency_endpoint = LatencyEndpoint(self.latency, port=latency_port).start() if latency_port is not None else None
+        self.latency_panel = None
+        # 本地记录每个有效采样（按天分目录的二进制列存）
+        self.recorder = Recorder(record_dir) if record_dir else None
+        if self.recorder:
+            self.engine.subscribe(self.recorder)
+        # 本地实时数据流：其他操作员和工具通过 GET /stream 订阅，不用再打开串口
+        self.live_stream = None
+        if stream_port is not None:
+            from live_stream import LiveStreamServer  # 只在启用数据流时导入（asyncio），缩短启动时间
+            self.live_stream = LiveStreamServer(port=stream_port).start()
+            self.engine.subscribe(self.live_stream)
+        # 滚动统计：按窗口汇总最小/最大/均值/标准差/分位数，写入日志，上传时一并发送
+        # rollup_only 时只上传汇总，不上传原始采样
+        self.rollup_only = bool(rollup_windows) and rollup_only
+        self.aggregator = None
+        if rollup_windows:
+            self.aggregator = RollingAggregator(rollup_windows, on_rollup=self.on_rollup)
+            self.engine.subscribe(self.aggregator)
+            self.rollup_timer = QTimer(self)
+            self.rollup_timer.timeout.connect(self.aggregator.poll)
+            self.rollup_timer.start(1000)
 
         # 固定窗口初始大小和比例
         self.setFixedSize(960, 540)
@@ -117,20 +227,18 @@ class MainWindow(QWidget):
         # 通道选择
         self.channel_label = QLabel("采集通道:")
         self.channel_combo = QComboBox()
-        self.channel_combo.addItems(["温湿度", "频率"])
+        self.channel_combo.addItems(["温湿度", "频率", "双通道"])  # 下标即通道号
         self.channel_combo.setCurrentIndex(0)  # 默认选择温湿度
         self.channel_combo.currentIndexChanged.connect(self.change_channel)
 
         # 串口选择
         self.port_label = QLabel("串口号:")
         self.port_combo = QComboBox()
-        self.refresh_ports()
-        # 默认选择COM2（如果存在）
-        idx = self.port_combo.findText("COM2")
-        if idx != -1:
-            self.port_combo.setCurrentIndex(idx)
+        self.preferred_port = "COM2"  # 默认选择COM2（如果存在）
+        self.port_scanner = None
         self.refresh_btn = QPushButton("刷新")
         self.refresh_btn.clicked.connect(self.refresh_ports)
+        self.refresh_ports()
 
         # 打开/关闭串口
         self.open_btn = QPushButton("打开串口")
@@ -161,25 +269,45 @@ class MainWindow(QWidget):
         self.half_temp_label = QLabel("减半温度: -- ℃")
         self.half_humi_label = QLabel("减半湿度: -- %")
         self.half_freq_label = QLabel("减半频率: -- Hz")
-        self.text_area = QTextEdit()
-        self.text_area.setReadOnly(True)
-
-        # 折线图相关
-        self.plot_widget = pg.PlotWidget()
-        self.plot_widget.setBackground(QColor(255, 255, 255, 220))  # 半透明白色背景
-        self.plot_widget.showGrid(x=True, y=True)
-        self.plot_widget.setLabel('left', '数值')
-        self.plot_widget.setLabel('bottom', '采样点')
-        plot_item = self.plot_widget.getPlotItem()
-        if plot_item is not None:
-            plot_item.getAxis('bottom').setTicks([[(i, str(i+1)) for i in range(10)]])
-        self.temp_curve = self.plot_widget.plot(pen=pg.mkPen('r', width=2), name='温度')
-        self.humi_curve = self.plot_widget.plot(pen=pg.mkPen('b', width=2), name='湿度')
-        self.freq_curve = self.plot_widget.plot(pen=pg.mkPen('g', width=2), name='频率')
-        self.data_len = 100
-        self.temp_data = []
-        self.humi_data = []
-        self.freq_data = []
+        # 链路质量：按帧序号统计的丢帧、坏帧，每秒刷新
+        self.link_label = QLabel("链路: --")
+        self.link_timer = QTimer(self)
+        self.link_timer.timeout.connect(self.update_link_label)
+        # 轻量模式：逐帧变化的数值不用带阴影效果的 QLabel，改由一个自绘的 ValueBoard 显示，适合低配工控机
+        self.value_board = None
+        if lightweight:
+            self.value_board = ValueBoard({
+                0: ([("temp", "温度: {} ℃"), ("humi", "湿度: {} %")],
+                    [("half_temp", "减半温度: {} ℃"), ("half_humi", "减半湿度: {} %")]),
+                1: ([("freq", "频率: {} Hz")], [("half_freq", "减半频率: {} Hz")]),
+            })
+        # 日志窗口：行数有上限，定时批量刷新，可按级别过滤
+        self.text_area = LogConsole(max_lines=LOG_MAX_LINES, flush_ms=LOG_FLUSH_MS)
+        self.log_level_label = QLabel("日志级别:")
+        self.log_level_combo = QComboBox()
+        for title, level in log_console.VERBOSITY_CHOICES:
+            self.log_level_combo.addItem(title, level)
+        self.log_level_combo.currentIndexChanged.connect(self.change_log_level)
+
+        # 折线图相关：pyqtgraph 导入较慢，窗口显示后再由 create_plot 创建，之前的采样照常写入缓冲区
+        self.plot_widget = None       # 温湿度图表
+        self.freq_plot_widget = None  # 频率图表
+        self.plot_container = QWidget()
+        self.plot_container.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.plot_layout = QVBoxLayout(self.plot_container)
+        self.plot_layout.setContentsMargins(0, 0, 0, 0)
+        # 采样历史：预分配环形缓冲区，plot_len 为折线图显示的最近点数
+        self.data_len = history_len
+        self.plot_len = min(plot_len, history_len)
+        self.temp_data = RingBuffer(self.data_len)
+        self.humi_data = RingBuffer(self.data_len)
+        self.freq_data = RingBuffer(self.data_len)
+        self.temp_humi_x = RingBuffer(self.data_len, dtype=np.float64)  # 温湿度采样序号
+        self.freq_x = RingBuffer(self.data_len, dtype=np.float64)       # 频率采样序号
+        # 折线图按固定帧率合并刷新
+        self.plot_scheduler = PlotScheduler(fps=plot_fps, window=self.plot_len, parent=self)
+        self.plot_scheduler.rendered.connect(self.on_plot_rendered)
+        self.plot_scheduler.start()
 
         # 阈值标题标签和单位/分隔符，必须在布局前定义
         self.temp_thresh_title = QLabel("温度范围:")
@@ -210,14 +338,16 @@ class MainWindow(QWidget):
         set_small_label_shadow(self.freq_range_unit)
 
         # 阈值输入框（QLineEdit）
-        self.temp_min_edit = QLineEdit("0")
-        self.temp_max_edit = QLineEdit("40")
-        self.humi_min_edit = QLineEdit("0")
-        self.humi_max_edit = QLineEdit("90")
-        self.freq_min_edit = QLineEdit("0")
-        self.freq_max_edit = QLineEdit("6000")
+        self.temp_min_edit = QLineEdit(str(DEFAULT_THRESHOLDS["temp"][0]))
+        self.temp_max_edit = QLineEdit(str(DEFAULT_THRESHOLDS["temp"][1]))
+        self.humi_min_edit = QLineEdit(str(DEFAULT_THRESHOLDS["humi"][0]))
+        self.humi_max_edit = QLineEdit(str(DEFAULT_THRESHOLDS["humi"][1]))
+        self.freq_min_edit = QLineEdit(str(DEFAULT_THRESHOLDS["freq"][0]))
+        self.freq_max_edit = QLineEdit(str(DEFAULT_THRESHOLDS["freq"][1]))
         for edit in [self.temp_min_edit, self.temp_max_edit, self.humi_min_edit, self.humi_max_edit, self.freq_min_edit, self.freq_max_edit]:
             edit.setFixedWidth(60)
+            # 输入完成（回车或失去焦点）后再同步，输入过程中的中间值（如把 30 改成 35 时的 3）不会触发报警判断
+            edit.editingFinished.connect(self.apply_thresholds)
             edit.setStyleSheet("background: rgba(255,255,255,180); color: #222; border-radius: 6px; border: 1px solid #bbb; font-size: 15px; font-family: 'Microsoft YaHei', '微软雅黑', sans-serif; padding: 2px 6px;")
 
         # 阈值布局（输入框+单位）
@@ -294,6 +424,7 @@ class MainWindow(QWidget):
             btn.setStyleSheet(button_style)
         self.channel_combo.setStyleSheet(combo_style)
         self.port_combo.setStyleSheet(combo_style)
+        self.log_level_combo.setStyleSheet(combo_style)
 
         # 合并调试按钮为一个下拉菜单弹窗选择信号发送
         self.debug_btn = QPushButton("调试信号发送")
@@ -312,6 +443,12 @@ class MainWindow(QWidget):
         for label, sig in debug_signals:
             self.debug_menu.addAction(label, lambda checked=False, s=sig: self.send_debug_signal(s))
         self.debug_btn.setMenu(self.debug_menu)
+        # 时延统计面板
+        self.latency_btn = QPushButton("时延统计")
+        self.latency_btn.setMinimumWidth(120)
+        self.latency_btn.setMinimumHeight(36)
+        self.latency_btn.setStyleSheet(button_style)
+        self.latency_btn.clicked.connect(self.show_latency_panel)
         # 调试按钮布局
         self.debug_btn_layout = QHBoxLayout()
         self.debug_btn_layout.addWidget(self.debug_btn)
@@ -324,7 +461,7 @@ class MainWindow(QWidget):
         h0.addWidget(self.channel_label)
         h0.addWidget(self.channel_combo)
         h0.addStretch(1)
-        for btn in [self.debug_btn]:
+        for btn in [self.latency_btn, self.debug_btn]:
             h0.addWidget(btn)
 
         h1 = QHBoxLayout()
@@ -377,13 +514,17 @@ class MainWindow(QWidget):
         temp_humi_full_row.addLayout(temp_humi_left)
         temp_humi_full_row.addStretch(1)
         temp_humi_full_row.addLayout(temp_humi_right)
-        left_v.addLayout(temp_humi_full_row)
         # 频率两端对齐
         freq_row = QHBoxLayout()
         freq_row.addWidget(self.freq_label)
         freq_row.addWidget(self.half_freq_label)
-        left_v.addLayout(freq_row)
-        left_v.addWidget(self.plot_widget)  # 恢复为最初的折线图布局
+        if self.value_board is not None:
+            left_v.addWidget(self.value_board)
+        else:
+            left_v.addLayout(temp_humi_full_row)
+            left_v.addLayout(freq_row)
+        left_v.addWidget(self.link_label)
+        left_v.addWidget(self.plot_container)  # 恢复为最初的折线图布局
         left_v.addStretch(1)
         left_v.addLayout(self.debug_btn_layout)
         
@@ -391,6 +532,11 @@ class MainWindow(QWidget):
 
         # 右侧区域（串口信息区）
         right_v = QVBoxLayout()
+        log_level_row = QHBoxLayout()
+        log_level_row.addStretch(1)
+        log_level_row.addWidget(self.log_level_label)
+        log_level_row.addWidget(self.log_level_combo)
+        right_v.addLayout(log_level_row)
         self.text_area.setMaximumWidth(int(self.width() * 0.4))
         self.text_area.setStyleSheet("background: rgba(0,0,0,128); color: white; border: 2px solid #fff; border-radius: 8px;")
         right_v.addWidget(self.text_area)
@@ -411,7 +557,7 @@ class MainWindow(QWidget):
         self.text_area.setStyleSheet("background: rgba(0,0,0,128); color: white;")
 
         # 统一所有label样式为频率样式
-        for label in [self.channel_label, self.port_label, self.temp_label, self.humi_label, self.freq_label, self.half_temp_label, self.half_humi_label, self.half_freq_label]:
+        for label in [self.channel_label, self.port_label, self.log_level_label, self.temp_label, self.humi_label, self.freq_label, self.half_temp_label, self.half_humi_label, self.half_freq_label]:
             set_label_shadow(label)
 
         # 设置温度、湿度、减半温度、减半湿度、频率、减半频率字号调小，两端对齐
@@ -429,49 +575,106 @@ class MainWindow(QWidget):
         set_small_label_shadow_align(self.half_humi_label, Qt.AlignRight) # type: ignore
         set_small_label_shadow_align(self.freq_label, Qt.AlignLeft) # type: ignore
         set_small_label_shadow_align(self.half_freq_label, Qt.AlignRight) # type: ignore
+        set_small_label_shadow_align(self.link_label, Qt.AlignLeft) # type: ignore
 
         # 设置背景图片（自适应窗口大小+淡灰色蒙版）
-        import os
+        # 图片在窗口显示后再加载
         self.bg_path = os.path.join(os.path.dirname(__file__), "bg.jpg")
-        self.bg_pixmap = QPixmap(self.bg_path) if os.path.exists(self.bg_path) else None
+        self.background = None  # BackgroundCompositor，按窗口尺寸在后台线程合成并缓存
         self.setAutoFillBackground(True)
-        self.update_background()
-
-    def update_background(self):
-        if self.bg_pixmap:
-            palette = QPalette()
-            # 兼容不同PyQt5版本，动态获取枚举值
-            aspect = getattr(Qt, 'KeepAspectRatioByExpanding', 1)
-            trans = getattr(Qt, 'SmoothTransformation', 2)
-            img = self.bg_pixmap.toImage().scaled(
-                self.size(),
-                aspect,
-                trans   # type: ignore
-            )  # type: ignore
-            # 创建淡灰色蒙版
-            overlay = QImage(img.size(), QImage.Format_ARGB32)
-            overlay.fill(QColor(200, 200, 200, 80))  # 80为透明度
-            painter = QPainter(img)
-            painter.drawImage(0, 0, overlay)
-            painter.end()
-            scaled = QPixmap.fromImage(img)
-            palette.setBrush(QPalette.Window, QBrush(scaled))
-            self.setPalette(palette)
+
+        # 折线图和背景图不影响窗口出现，画出第一帧后再创建
+        self.startup_finished = False
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.startup_finished:
+            self.startup_finished = True
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        self.create_plot()
+        self.load_background()
+
+    def create_plot(self):
+        """创建折线图，第一次调用时才导入 pyqtgraph"""
+        if self.plot_widget is not None:
+            return
+        import pyqtgraph as pg
+
+        def new_plot(label):
+            plot = pg.PlotWidget()
+            plot.setBackground(QColor(255, 255, 255, 220))  # 半透明白色背景
+            plot.showGrid(x=True, y=True)
+            plot.setLabel('left', label)
+            plot.setLabel('bottom', '采样点')  # 横坐标为采样序号，刻度随可见区间自动变化
+            self.plot_scheduler.attach(plot)
+            self.plot_layout.addWidget(plot)
+            return plot
+        # 温湿度和频率量级不同、采样序号各自计数，各用一个图表，双通道时上下排列同时显示
+        self.plot_widget = new_plot('数值')
+        self.freq_plot_widget = new_plot('频率 (Hz)')
+        self.temp_curve = self.plot_widget.plot(pen=pg.mkPen('r', width=2), name='温度')
+        self.humi_curve = self.plot_widget.plot(pen=pg.mkPen('b', width=2), name='湿度')
+        self.freq_curve = self.freq_plot_widget.plot(pen=pg.mkPen('g', width=2), name='频率')
+        self.plot_scheduler.bind("temp", self.temp_curve, self.temp_humi_x, self.temp_data)
+        self.plot_scheduler.bind("humi", self.humi_curve, self.temp_humi_x, self.humi_data)
+        self.plot_scheduler.bind("freq", self.freq_curve, self.freq_x, self.freq_data)
+        self.update_plot_visibility()
+        # 画出创建之前已收到的采样
+        self.plot_scheduler.mark_dirty("temp", "humi", "freq")
+
+    def load_background(self):
+        if self.background is None and os.path.exists(self.bg_path):
+            self.background = BackgroundCompositor(self.bg_path, parent=self)
+            self.background.ready.connect(self.set_background_pixmap)
+            self.background.start()
+            # 切换到不同缩放比例的显示器时按新的像素比重新合成
+            if self.windowHandle() is not None:
+                self.windowHandle().screenChanged.connect(lambda _screen: self.update_background())
+            self.update_background(immediate=True)
+
+    def update_background(self, immediate=False):
+        """请求当前尺寸的背景图，缓存命中时立即生效，否则等合成线程发出 ready"""
+        if self.background is None:
+            return
+        pixmap = self.background.request(self.width(), self.height(), self.devicePixelRatioF(), immediate)
+        if pixmap is not None:
+            self.set_background_pixmap(pixmap)
+
+    def set_background_pixmap(self, pixmap):
+        palette = self.palette()
+        palette.setBrush(QPalette.Window, QBrush(pixmap))
+        self.setPalette(palette)
 
     def resizeEvent(self, event):
         # 固定宽高比为1920:1080
         w = self.width()
         h = int(w * 1080 / 1920)
         if h != self.height():
+            # 修正高度后会再收到一次 resizeEvent，届时再请求背景图
             self.setFixedSize(w, h)
-        self.update_background()
+        else:
+            self.update_background()
         super().resizeEvent(event)
 
     def refresh_ports(self):
+        """在后台线程枚举串口，结果由 on_ports_found 填入下拉框"""
+        if self.port_scanner is not None and self.port_scanner.isRunning():
+            return
+        self.refresh_btn.setEnabled(False)
+        self.port_scanner = PortScanner()
+        self.port_scanner.ports_found.connect(self.on_ports_found)
+        self.port_scanner.start()
+
+    def on_ports_found(self, ports):
+        current = self.port_combo.currentText() or self.preferred_port
         self.port_combo.clear()
-        ports = serial.tools.list_ports.comports()
-        for port in ports:
-            self.port_combo.addItem(port.device)
+        self.port_combo.addItems(ports)
+        idx = self.port_combo.findText(current)
+        if idx != -1:
+            self.port_combo.setCurrentIndex(idx)
+        self.refresh_btn.setEnabled(True)
 
     def open_serial(self):
         port = self.port_combo.currentText()
@@ -479,10 +682,29 @@ class MainWindow(QWidget):
             QMessageBox.warning(self, "错误", "请选择串口号")
             return
         try:
-            self.ser = serial.Serial(port, 9600, timeout=1)
-            self.serial_thread = SerialThread(self.ser)
-            self.serial_thread.data_received.connect(self.on_data_received)
-            self.serial_thread.start()
+            if self.isolated:
+                # 串口读取、解码、报警和回发都在采集进程中，界面只轮询共享内存
+                self.engine.open(port, 9600, binary_baud=self.binary_baud,
+                                 max_batch=self.serial_max_batch, max_latency=self.serial_max_latency)
+                self.poll_timer.start()
+            else:
+                import serial
+                self.ser = serial.Serial(port, 9600, timeout=1)
+                self.engine.ser = self.ser
+                self.writer_thread = SerialWriterThread(self.ser, latency=self.latency, **self.writer_options)
+                self.writer_thread.send_log.connect(self.text_area.append)
+                self.writer_thread.start()
+                self.engine.writer = self.writer_thread.writer
+                self.engine.link.reset()
+                self.serial_thread = SerialThread(self.ser, batch=True,
+                                                  max_batch=self.serial_max_batch,
+                                                  max_latency=self.serial_max_latency,
+                                                  link=self.engine.link)
+                self.serial_thread.batch_received.connect(self.on_batch_received)
+                self.serial_thread.start()
+            if self.recorder:
+                self.recorder.default_board = port
+            self.link_timer.start(1000)
             self.open_btn.setEnabled(False)
             self.close_btn.setEnabled(True)
             self.start_btn.setEnabled(True)
@@ -490,14 +712,40 @@ class MainWindow(QWidget):
             self.text_area.append("串口已打开")
             # 打开串口后立即同步通道
             self.send_channel_cmd()
+            if self.binary_baud is not None and not self.isolated:
+                self.engine.request_binary(self.binary_baud)
         except Exception as e:
             QMessageBox.critical(self, "错误", f"打开串口失败: {e}")
 
     def close_serial(self):
+        if self.isolated and self.engine.process is not None:
+            self.engine.close()
+            self.poll_timer.stop()
+            stats = self.engine.writer_stats
+            if stats:
+                self.text_area.append(f"📊 串口发送统计: 已写出 {stats['written']}，回发确认 {stats['acked']}，"
+                                      f"校验错 {stats['nacked']}，超时 {stats['timeouts']}，重发 {stats['retries']}，"
+                                      f"合并 {stats['coalesced']}，平均往返 {stats['rtt_mean_ms']} ms")
+            self.text_area.append(f"📊 采集进程: 界面收到 {self.engine.received} 个采样，"
+                                  f"来不及显示 {self.engine.overruns} 个")
         if self.serial_thread:
             self.serial_thread.stop()
+        if self.writer_thread:
+            self.writer_thread.stop()
+            stats = self.writer_thread.writer.stats()
+            self.text_area.append(f"📊 串口发送统计: 已写出 {stats['written']}，回发确认 {stats['acked']}，"
+                                  f"校验错 {stats['nacked']}，超时 {stats['timeouts']}，重发 {stats['retries']}，"
+                                  f"合并 {stats['coalesced']}，平均往返 {stats['rtt_mean_ms']} ms")
+            self.engine.writer = None
+            self.writer_thread = None
         if self.ser and self.ser.is_open:
             self.ser.close()
+        self.link_timer.stop()
+        link = self.engine.link_stats()
+        if link and link["received"]:
+            self.text_area.append(format_link_stats(link))
+        if self.recorder:
+            self.recorder.close()
         # 停止网络发送
         if self.network_sending:
             self.stop_network_send()
@@ -510,18 +758,14 @@ class MainWindow(QWidget):
         self.text_area.append("串口已关闭")
 
     def start_collect(self):
-        if self.ser and self.ser.is_open:
-            self.ser.write(b'CMD:S\r\n')
-            self.text_area.append("已发送启动命令")
+        if self.engine.start_collect():
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
             self.channel_combo.setEnabled(False) # 锁定通道选择
             self.close_btn.setEnabled(False) # 采集时不能关闭串口
 
     def stop_collect(self):
-        if self.ser and self.ser.is_open:
-            self.ser.write(b'CMD:E\r\n')
-            self.text_area.append("已发送停止命令")
+        if self.engine.stop_collect():
             self.start_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
             self.channel_combo.setEnabled(True) # 解锁通道选择
@@ -530,290 +774,133 @@ class MainWindow(QWidget):
     def change_channel(self, idx):
         self.current_channel = idx
         self.update_channel_ui()
-        self.send_channel_cmd()
+        # 只显示当前通道的图表，另一通道的历史保留，切换回来时接着显示
+        self.update_plot_visibility()
+        self.engine.set_channel(idx)
+
+    def update_plot_visibility(self):
+        if self.plot_widget is None:
+            return
+        kinds = channel_kinds(self.current_channel)
+        self.plot_widget.setVisible(CHANNEL_TEMP_HUMI in kinds)
+        self.freq_plot_widget.setVisible(CHANNEL_FREQ in kinds)
 
     def send_channel_cmd(self):
-        if self.ser and self.ser.is_open:
-            if self.current_channel == 0:
-                self.ser.write(b'CMD:A\r\n')  # 温湿度
-                self.text_area.append("切换到温湿度通道")
-            else:
-                self.ser.write(b'CMD:B\r\n')  # 频率
-                self.text_area.append("切换到频率通道")
+        self.engine.send_channel_cmd()
+
+    def apply_thresholds(self):
+        """阈值编辑后同步到采集引擎"""
+        self.engine.set_thresholds("temp", self.temp_min_edit.text(), self.temp_max_edit.text())
+        self.engine.set_thresholds("humi", self.humi_min_edit.text(), self.humi_max_edit.text())
+        self.engine.set_thresholds("freq", self.freq_min_edit.text(), self.freq_max_edit.text())
 
     def update_channel_ui(self):
-        if self.current_channel == 0:
-            self.temp_label.setVisible(True)
-            self.humi_label.setVisible(True)
-            self.freq_label.setVisible(False)
-            self.half_temp_label.setVisible(True)
-            self.half_humi_label.setVisible(True)
-            self.half_freq_label.setVisible(False)
-            # 显示温湿度阈值，隐藏频率阈值
-            for l in [self.temp_thresh_layout, self.humi_thresh_layout]:
-                for i in range(l.count()):
-                    item = l.itemAt(i)
-                    w = item.widget() # type: ignore
-                    if w is not None:
-                        w.setVisible(True)
-            for i in range(self.freq_thresh_layout.count()):
-                item = self.freq_thresh_layout.itemAt(i)
-                w = item.widget() # type: ignore
-                if w is not None:
-                    w.setVisible(False)
+        # 双通道时温湿度和频率的数值、阈值同时显示
+        kinds = channel_kinds(self.current_channel)
+        show_temp_humi = CHANNEL_TEMP_HUMI in kinds
+        show_freq = CHANNEL_FREQ in kinds
+        if self.value_board is not None:
+            self.value_board.set_channels(kinds)
         else:
-            self.temp_label.setVisible(False)
-            self.humi_label.setVisible(False)
-            self.freq_label.setVisible(True)
-            self.half_temp_label.setVisible(False)
-            self.half_humi_label.setVisible(False)
-            self.half_freq_label.setVisible(True)
-            # 显示频率阈值，隐藏温湿度阈值
-            for l in [self.temp_thresh_layout, self.humi_thresh_layout]:
-                for i in range(l.count()):
-                    item = l.itemAt(i)
-                    w = item.widget() # type: ignore
-                    if w is not None:
-                        w.setVisible(False)
-            for i in range(self.freq_thresh_layout.count()):
-                item = self.freq_thresh_layout.itemAt(i)
+            for label in [self.temp_label, self.humi_label, self.half_temp_label, self.half_humi_label]:
+                label.setVisible(show_temp_humi)
+            for label in [self.freq_label, self.half_freq_label]:
+                label.setVisible(show_freq)
+        for l, visible in [(self.temp_thresh_layout, show_temp_humi), (self.humi_thresh_layout, show_temp_humi),
+                           (self.freq_thresh_layout, show_freq)]:
+            for i in range(l.count()):
+                item = l.itemAt(i)
                 w = item.widget() # type: ignore
                 if w is not None:
-                    w.setVisible(True)
-
-    def calculate_checksum(self, data_str):
-        """计算字符串的校验和"""
-        checksum = 0
-        for char in data_str:
-            checksum += ord(char)
-        return checksum  
-
-    def validate_checksum(self, line):
-        """校验和验证"""
-        if "CHECKSUM:" not in line:
-            return False, "缺少校验和"
-        
-        # 分离数据和校验和
-        parts = line.split(" CHECKSUM:")
-        if len(parts) != 2:
-            return False, "校验和格式错误"
-        
-        data_part = parts[0]
-        try:
-            received_checksum = int(parts[1])
-        except ValueError:
-            return False, "校验和数值格式错误"
-        
-        # 计算校验和
-        calculated_checksum = self.calculate_checksum(data_part)
-        
-        if received_checksum != calculated_checksum:
-            return False, f"校验和不匹配: 接收={received_checksum}, 计算={calculated_checksum}"
-        
-        return True, f"校验和正确: {calculated_checksum}"
+                    w.setVisible(visible)
 
-    def validate_data_format(self, data_part):
-        """数据格式和范围校验（不包含校验和）"""
-        try:
-            if self.current_channel == 0:
-                # 温湿度通道校验
-                if not re.match(r"T:\d+\s+H:\d+", data_part):
-                    return False, "温湿度数据格式错误"
-                t, h = map(int, re.findall(r"\d+", data_part))
-                if not (0 <= t <= 100):
-                    return False, f"温度数值超出范围: {t}℃"
-                if not (0 <= h <= 100):
-                    return False, f"湿度数值超出范围: {h}%"
-                return True, f"温湿度数据有效: T={t}℃, H={h}%"
-            else:
-                # 频率通道校验
-                if not re.match(r"FREQ:\d+", data_part):
-                    return False, "频率数据格式错误"
-                match = re.search(r"\d+", data_part)
-                if not match:
-                    return False, "频率数值提取失败"
-                f = int(match.group())
-                if not (0 <= f <= 10000):
-                    return False, f"频率数值超出范围: {f}Hz"
-                return True, f"频率数据有效: {f}Hz"
-        except Exception as e:
-            return False, f"数据解析异常: {str(e)}"
-
-    def validate_data_with_checksum(self, line):
-        """带校验和的完整数据校验"""
-        # 1. 校验和验证
-        checksum_valid, checksum_msg = self.validate_checksum(line)
-        if not checksum_valid:
-            return False, checksum_msg
-        
-        # 2. 数据格式和范围校验
-        data_part = line.split(" CHECKSUM:")[0]
-        format_valid, format_msg = self.validate_data_format(data_part)
-        if not format_valid:
-            return False, format_msg
-        
-        return True, f"{format_msg} | {checksum_msg}"
+    def change_log_level(self, index):
+        level = self.log_level_combo.itemData(index)
+        self.text_area.set_level(level)
+        if self.isolated:
+            # 采集进程只发回该级别以上的日志，省去逐帧明细的进程间传输
+            self.engine.set_log_level(level)
 
-    def on_data_received(self, line):
-        self.text_area.append(line)
-        
-        # 只处理包含校验和的数据，忽略调试信息
-        if "CHECKSUM:" not in line:
-            return
-        
-        # 数据校验（包含校验和）
-        is_valid, message = self.validate_data_with_checksum(line)
-        if not is_valid:
-            self.text_area.append(f"❌ 数据校验失败: {message}")
+    def update_link_label(self):
+        """刷新链路质量：丢失率和各类坏帧计数"""
+        link = self.engine.link_stats()
+        if not link:
             return
+        if link["sequenced"]:
+            text = f"链路: 丢失率 {link['loss_rate'] * 100:.2f}%  丢帧 {link['dropped']}  损坏 {link['corrupt']}"
         else:
-            self.text_area.append(f"✅ {message}")
-        
-        # 提取数据部分（不含校验和）
-        data_part = line.split(" CHECKSUM:")[0]
-        
-        if self.current_channel == 0:
-            # 解析温湿度
-            match = re.search(r"T:(\d+)\s+H:(\d+)", data_part)
-            if match:
-                t = int(match.group(1))
-                h = int(match.group(2))
+            text = f"链路: 损坏 {link['corrupt']}（无帧序号）"
+        bad = link["malformed"] + link["out_of_range"] + link["unexpected"]
+        if bad:
+            text += f"  其它错误 {bad}"
+        if link["overflows"]:
+            text += f"  缓冲溢出 {link['overflows']}"
+        self.link_label.setText(text)
+
+    def on_data_received(self, line, received=None):
+        self.engine.process_line(line, received)
+
+    def on_batch_received(self, lines, stamps=None):
+        self.engine.process_lines(lines, stamps)
+
+    def on_engine_event(self, event, payload):
+        """采集引擎事件回调"""
+        if event == "line":
+            self.text_area.append(payload, log_console.DEBUG)
+        elif event == "log":
+            level, message = payload
+            self.text_area.append(message, level)
+        elif event == "sample":
+            self.on_sample(payload)
+        elif event == "upload":
+            self.send_data_to_server(payload)
+
+    def on_sample(self, sample):
+        self.plot_pending.append(sample.received)
+        if sample.channel == 0:
+            t, h = sample.values
+            half_t, half_h = sample.halves
+            if self.value_board is not None:
+                self.value_board.set_values(temp=t, humi=h, half_temp=half_t, half_humi=half_h)
+            else:
                 self.temp_label.setText(f"温度: {t} ℃")
                 self.humi_label.setText(f"湿度: {h} %")
-                half_t = t // 2
-                half_h = h // 2
                 self.half_temp_label.setText(f"减半温度: {half_t} ℃")
                 self.half_humi_label.setText(f"减半湿度: {half_h} %")
-                # 折线图数据更新
-                self.temp_data.append(t)
-                self.humi_data.append(h)
-                if len(self.temp_data) > self.data_len:
-                    self.temp_data = self.temp_data[-self.data_len:]
-                if len(self.humi_data) > self.data_len:
-                    self.humi_data = self.humi_data[-self.data_len:]
-                temp_y = self.temp_data[-10:]
-                humi_y = self.humi_data[-10:]
-                x = list(range(1, len(temp_y) + 1))
-                self.temp_curve.setData(x, temp_y)
-                self.humi_curve.setData(x, humi_y)
-                self.freq_curve.setData([], [])  # 清空频率曲线
-                
-                # 向服务器发送数据
-                if self.network_sending:
-                    server_data = {
-                        "type": "temperature_humidity",
-                        "temperature": t,
-                        "humidity": h,
-                        "half_temperature": half_t,
-                        "half_humidity": half_h,
-                        "timestamp": int(time.time() * 1000)
-                    }
-                    self.send_data_to_server(json.dumps(server_data))
-                
-                # 阈值判断
-                try:
-                    tmin = float(self.temp_min_edit.text())
-                    tmax = float(self.temp_max_edit.text())
-                    hmin = float(self.humi_min_edit.text())
-                    hmax = float(self.humi_max_edit.text())
-                except Exception:
-                    tmin, tmax, hmin, hmax = 0, 100, 0, 100
-                
-                # 检查是否需要发送报警信号
-                temp_alarm_needed = (t < tmin or t > tmax) != self.temp_alarm_on
-                humi_alarm_needed = (h < hmin or h > hmax) != self.humi_alarm_on
-                
-                if self.ser and self.ser.is_open:
-                    # 如果需要发送报警信号，则不回发减半数据
-                    if temp_alarm_needed or humi_alarm_needed:
-                        # 温度报警逻辑
-                        if t < tmin or t > tmax:
-                            if not self.temp_alarm_on:
-                                self.send_debug_signal(b'X')
-                                self.text_area.append("温度超出阈值，已发送'X'")
-                                self.temp_alarm_on = True
-                        else:
-                            if self.temp_alarm_on:
-                                self.send_debug_signal(b'x')
-                                self.text_area.append("温度恢复正常，已发送'x'")
-                                self.temp_alarm_on = False
-                        # 湿度报警逻辑
-                        if h < hmin or h > hmax:
-                            if not self.humi_alarm_on:
-                                self.send_debug_signal(b'Y')
-                                self.text_area.append("湿度超出阈值，已发送'Y'")
-                                self.humi_alarm_on = True
-                        else:
-                            if self.humi_alarm_on:
-                                self.send_debug_signal(b'y')
-                                self.text_area.append("湿度恢复正常，已发送'y'")
-                                self.humi_alarm_on = False
-                    else:
-                        # 不需要报警时，回发减半数据（带校验和）
-                        half_data = f"{half_t} {half_h}"
-                        checksum = self.calculate_checksum(half_data)
-                        self.ser.write(f"{half_data} CHECKSUM:{checksum}\r\n".encode())
+            # 折线图数据更新
+            self.temp_data.append(t)
+            self.humi_data.append(h)
+            self.temp_humi_x.append(self.temp_humi_x.total + 1)
+            self.plot_scheduler.mark_dirty("temp", "humi")
         else:
-            # 解析频率
-            match = re.search(r"FREQ:(\d+)", data_part)
-            if match:
-                f = int(match.group(1))
+            f, = sample.values
+            half_f, = sample.halves
+            if self.value_board is not None:
+                self.value_board.set_values(freq=f, half_freq=half_f)
+            else:
                 self.freq_label.setText(f"频率: {f} Hz")
-                half_f = f // 2
                 self.half_freq_label.setText(f"减半频率: {half_f} Hz")
-                # 折线图数据更新
-                self.freq_data.append(f)
-                if len(self.freq_data) > self.data_len:
-                    self.freq_data = self.freq_data[-self.data_len:]
-                freq_y = self.freq_data[-10:]
-                x = list(range(1, len(freq_y) + 1))
-                self.freq_curve.setData(x, freq_y)
-                self.temp_curve.setData([], [])  # 清空温度曲线
-                self.humi_curve.setData([], [])  # 清空湿度曲线
-                
-                # 向服务器发送数据
-                if self.network_sending:
-                    server_data = {
-                        "type": "frequency",
-                        "frequency": f,
-                        "half_frequency": half_f,
-                        "timestamp": int(time.time() * 1000)
-                    }
-                    self.send_data_to_server(json.dumps(server_data))
-                
-                # 阈值判断
-                try:
-                    fmin = float(self.freq_min_edit.text())
-                    fmax = float(self.freq_max_edit.text())
-                except Exception:
-                    fmin, fmax = 0, 10000
-                
-                # 检查是否需要发送报警信号
-                freq_alarm_needed = (f < fmin or f > fmax) != self.freq_alarm_on
-                
-                if self.ser and self.ser.is_open:
-                    # 如果需要发送报警信号，则不回发减半数据
-                    if freq_alarm_needed:
-                        # 频率报警逻辑
-                        if f < fmin or f > fmax:
-                            if not self.freq_alarm_on:
-                                self.send_debug_signal(b'Z')
-                                self.text_area.append("频率超出阈值，已发送'Z'")
-                                self.freq_alarm_on = True
-                        else:
-                            if self.freq_alarm_on:
-                                self.send_debug_signal(b'z')
-                                self.text_area.append("频率恢复正常，已发送'z'")
-                                self.freq_alarm_on = False
-                    else:
-                        # 不需要报警时，回发减半数据（带校验和）
-                        half_data = f"{half_f}"
-                        checksum = self.calculate_checksum(half_data)
-                        self.ser.write(f"{half_data} CHECKSUM:{checksum}\r\n".encode())
+            # 折线图数据更新
+            self.freq_data.append(f)
+            self.freq_x.append(self.freq_x.total + 1)
+            self.plot_scheduler.mark_dirty("freq")
+
+    def on_plot_rendered(self):
+        """折线图刷新后记录这些采样从收到到上图的时延"""
+        if self.plot_pending:
+            self.latency.record_many("plot", self.plot_pending)
+            self.latency.count("plotted", len(self.plot_pending))
+            self.plot_pending = []
+
+    def show_latency_panel(self):
+        if self.latency_panel is None:
+            self.latency_panel = LatencyPanel(self.latency)
+        self.latency_panel.show()
+        self.latency_panel.raise_()
 
     def toggle_network_send(self):
         """切换网络发送状态"""
-        self.text_area.append(f"🔍 点击发送数据按钮，当前状态: network_sending={self.network_sending}")
+        self.text_area.append(f"🔍 点击发送数据按钮，当前状态: network_sending={self.network_sending}", log_console.DEBUG)
         if not self.network_sending:
             # 开始发送
             self.text_area.append("🚀 开始网络发送...")
@@ -825,14 +912,15 @@ class MainWindow(QWidget):
     
     def start_network_send(self):
         """开始网络发送"""
-        self.text_area.append(f"🔧 创建网络线程，服务器URL: {self.server_url}")
+        self.text_area.append(f"🔧 创建网络线程，服务器URL: {self.server_url}", log_console.DEBUG)
         if not self.network_thread:
-            self.network_thread = NetworkThread(self.server_url)
+            self.network_thread = NetworkThread(self.server_url, latency=self.latency, **self.upload_options)
             self.network_thread.send_log.connect(self.on_network_log)
             self.network_thread.start()
             self.text_area.append("✅ 网络线程已启动")
         
         self.network_sending = True
+        self.engine.upload_enabled = not self.rollup_only
         self.network_send_btn.setText("停止发送")
         self.network_send_btn.setStyleSheet("""
             QPushButton {
@@ -856,9 +944,14 @@ class MainWindow(QWidget):
         """停止网络发送"""
         if self.network_thread:
             self.network_thread.stop()
+            stats = self.network_thread.stats()
+            self.text_area.append(f"📊 上传统计: 入队 {stats['queued']}，已发送 {stats['sent']}，"
+                                  f"丢弃 {stats['dropped']}，落盘待补发 {stats['spooled']}，"
+                                  f"每条 {stats['bytes_per_sample']} 字节")
             self.network_thread = None
         
         self.network_sending = False
+        self.engine.upload_enabled = False
         self.network_send_btn.setText("发送数据")
         self.network_send_btn.setStyleSheet("""
             QPushButton {
@@ -878,42 +971,95 @@ class MainWindow(QWidget):
         """)
         self.text_area.append("⏹️ 已停止向服务器发送数据")
     
-    def on_network_log(self, message):
+    def on_network_log(self, message, level):
         """处理网络线程的日志消息"""
-        self.text_area.append(message)
+        self.text_area.append(message, level)
     
-    def send_data_to_server(self, data):
+    def send_data_to_server(self, sample):
         """向服务器发送数据"""
         if self.network_thread and self.network_sending:
-            self.text_area.append(f"📤 准备发送数据: {data[:100]}...")
-            self.network_thread.send_data(data)
+            data = sample.to_server_data()
+            if self.text_area.level <= log_console.DEBUG:
+                self.text_area.append(f"📤 准备发送数据: {json.dumps(data)[:100]}...", log_console.DEBUG)
+            if not self.network_thread.send_data(data, sample.received):
+                self.text_area.append("⚠️ 上传队列已满，数据被丢弃", log_console.WARNING)
         else:
-            self.text_area.append(f"⚠️ 网络发送未启用: network_thread={self.network_thread is not None}, network_sending={self.network_sending}")
+            self.text_area.append(f"⚠️ 网络发送未启用: network_thread={self.network_thread is not None}, network_sending={self.network_sending}", log_console.WARNING)
+
+    def on_rollup(self, rollup):
+        """窗口结束时显示汇总，正在上传时放入上传队列"""
+        self.text_area.append(format_rollup(rollup))
+        if self.live_stream:
+            self.live_stream.publish(rollup)
+        if self.network_thread and self.network_sending:
+            if not self.network_thread.send_data(rollup):
+                self.text_area.append("⚠️ 上传队列已满，汇总被丢弃", log_console.WARNING)
 
     def send_debug_signal(self, sig):
-        if self.ser and self.ser.is_open:
-            # 统一发送带 CMD: 前缀的命令
-            if isinstance(sig, bytes):
-                sig_str = sig.decode(errors='ignore').strip()
-            else:
-                sig_str = str(sig).strip()
-            cmd = f"CMD:{sig_str}\r\n".encode()
-            self.ser.write(cmd)
-            self.text_area.append(f"已发送调试信号: CMD:{sig_str}")
-        else:
+        if not self.engine.send_command(sig):
             QMessageBox.warning(self, "错误", "串口未打开，无法发送调试信号")
     
 
 
     def closeEvent(self, event):
+        # 未满的汇总窗口在停止上传前发出
+        if self.aggregator:
+            self.aggregator.flush()
         # 停止网络发送
         if self.network_sending:
             self.stop_network_send()
         self.close_serial()
+        if self.latency_reporter:
+            self.latency_reporter.stop()
+        if self.latency_endpoint:
+            self.latency_endpoint.stop()
+        if self.live_stream:
+            self.live_stream.stop()
+        if self.latency_panel:
+            self.latency_panel.close()
+        if self.port_scanner is not None:
+            self.port_scanner.wait()
+        if self.background is not None:
+            self.background.stop()
         event.accept()
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    win = MainWindow()
+    parser = argparse.ArgumentParser(description="温湿度/频率监控上位机")
+    parser.add_argument("--history", type=int, default=HISTORY_LEN, help="每个通道保留的采样历史点数")
+    parser.add_argument("--plot-points", type=int, default=PLOT_LEN, help="折线图显示的最近点数")
+    parser.add_argument("--plot-fps", type=int, default=PLOT_FPS, help="折线图最高刷新帧率")
+    parser.add_argument("--record-dir", default=RECORD_DIR, help="本地记录目录，为空字符串时不记录")
+    parser.add_argument("--latency-file", help="每秒把时延统计写入该 JSON 文件")
+    parser.add_argument("--latency-port", type=int, help="在该端口提供 GET /latency 时延统计接口")
+    for rule in RULES:
+        parser.add_argument(f"--{rule.name}-hysteresis", type=float, default=0.0,
+                            help=f"{rule.title}报警回差，回到范围内超过该值才解除报警")
+    parser.add_argument("--alarm-dwell", type=float, default=0.0, help="报警/解除前状态至少持续的秒数")
+    parser.add_argument("--ack-timeout", type=float, default=1.0, help="等待下位机确认回发的超时（秒）")
+    parser.add_argument("--echo-retries", type=int, default=1, help="回发校验出错或超时后的重发次数")
+    parser.add_argument("--binary-baud", type=int, choices=sorted(BINARY_BAUD_CODES),
+                        help="打开串口后协商二进制帧并切换到该波特率，旧固件不支持时继续使用文本帧")
+    parser.add_argument("--light", action="store_true", help="轻量绘制模式：不加标签阴影，数值只在变化时重绘")
+    parser.add_argument("--rollup", nargs="+", type=float, metavar="SECONDS",
+                        help="按这些窗口长度（秒）计算最小/最大/均值/标准差/分位数汇总，显示在日志中并随上传发送")
+    parser.add_argument("--rollup-only", action="store_true", help="只上传汇总，不上传原始采样（需要 --rollup）")
+    parser.add_argument("--stream-port", type=int, help="在该端口提供 GET /stream 实时数据流（server-sent events）")
+    parser.add_argument("--isolated", action="store_true",
+                        help="串口读取、解码、报警和回发在单独的进程中运行，界面卡顿不会耽误串口数据")
+    parser.add_argument("--upload-format", choices=WIRE_FORMATS, default=WIRE_JSON,
+                        help="上传编码：json、columns（列存差分编码）或 auto（服务器不支持列存时退回 JSON）")
+    parser.add_argument("--upload-compression", choices=list(COMPRESSIONS), default="none",
+                        help="上传请求体压缩方式")
+    args, qt_args = parser.parse_known_args()
+    hysteresis = {rule.name: getattr(args, f"{rule.name}_hysteresis") for rule in RULES}
+    app = QApplication(sys.argv[:1] + qt_args)
+    win = MainWindow(history_len=args.history, plot_len=args.plot_points, plot_fps=args.plot_fps,
+                     record_dir=args.record_dir, latency_file=args.latency_file,
+                     latency_port=args.latency_port, alarm_hysteresis=hysteresis,
+                     alarm_dwell=args.alarm_dwell, ack_timeout=args.ack_timeout,
+                     echo_retries=args.echo_retries, binary_baud=args.binary_baud,
+                     lightweight=args.light, rollup_windows=args.rollup, rollup_only=args.rollup_only,
+                     upload_format=args.upload_format, upload_compression=args.upload_compression,
+                     stream_port=args.stream_port, isolated=args.isolated)
     win.show()
     sys.exit(app.exec_())
\ No newline at end of file